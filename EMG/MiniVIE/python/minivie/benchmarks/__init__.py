@@ -0,0 +1,12 @@
+"""
+Benchmarks of the MiniVIE control loop hot path
+
+    fixtures    synthetic inputs with realistic channel counts, rates and window sizes for each input device
+    suite       the timed operations: features, feature extraction, classifier, CPCH parsing, plant and MPL messages
+    runner      times the suite, saves baselines and reports the change against a saved baseline
+
+Run from the minivie folder:
+    python -m benchmarks.runner --save before          # baseline before a change
+    python -m benchmarks.runner --compare before       # after the change, report speedup or slowdown
+
+"""
@@ -0,0 +1,150 @@
+"""
+Synthetic benchmark inputs
+
+Each input device is described by its channel count, sample rate and the number of samples in a feature window
+(the default buffer length of the device driver).  Data is generated from a seeded random generator so every run of
+the benchmarks sees the same inputs.
+
+"""
+import atexit
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+
+class Device(object):
+    def __init__(self, name, num_channels, sample_rate, num_samples, dt=0.02):
+        """
+        :param name: device name used in benchmark names
+        :param num_channels: number of EMG channels
+        :param sample_rate: sample rate, Hz
+        :param num_samples: samples in a feature window
+        :param dt: control loop period, seconds
+        """
+        self.name = name
+        self.num_channels = num_channels
+        self.sample_rate = sample_rate
+        self.num_samples = num_samples
+        self.dt = dt
+
+    @property
+    def samples_per_step(self):
+        """ New samples received each control loop step """
+        return int(round(self.sample_rate * self.dt))
+
+    def __repr__(self):
+        return '{}({} ch, {} Hz, {} samples)'.format(self.name, self.num_channels, self.sample_rate, self.num_samples)
+
+
+DEVICES = {
+    'myo': Device('myo', 8, 200, 50),  # MyoUdp
+    'cpch': Device('cpch', 16, 1000, 150),  # CpchSerial
+    'emg_device': Device('emg_device', 16, 2000, 200),  # EmgSocket
+}
+
+_roc_file = None  # temporary ROC table written by roc_file, deleted at exit
+
+
+def emg_window(device, seed=0):
+    """ Window of EMG-like signal [num_samples, num_channels] with per channel amplitude differences """
+    rng = np.random.default_rng(seed)
+    gain = np.linspace(0.2, 1.0, device.num_channels)
+    return rng.normal(0, 1, (device.num_samples, device.num_channels)) * gain
+
+
+def emg_recording(device, seconds=10.0, seed=0):
+    """ Continuous EMG-like recording [samples, num_channels] """
+    rng = np.random.default_rng(seed)
+    gain = np.linspace(0.2, 1.0, device.num_channels)
+    return rng.normal(0, 1, (int(seconds * device.sample_rate), device.num_channels)) * gain
+
+
+def training_features(num_features, num_classes=8, samples_per_class=200, seed=0):
+    """
+    Labelled feature vectors with a separate mean per class
+
+    :return: features [num_classes * samples_per_class, num_features], class ids [num_classes * samples_per_class]
+    """
+    rng = np.random.default_rng(seed)
+    means = rng.normal(0, 1, (num_classes, num_features))
+    y = np.repeat(np.arange(num_classes), samples_per_class)
+    x = means[y] + rng.normal(0, 0.5, (len(y), num_features))
+    return x, y
+
+
+def training_data(num_features, num_classes=8, samples_per_class=200, seed=0):
+    """ TrainingData filled with training_features, labelled with the first num_classes motion names """
+    from pattern_rec.training_data import TrainingData
+
+    td = TrainingData()
+    x, y = training_features(num_features, num_classes, samples_per_class, seed)
+    for features, class_id in zip(x, y):
+        td.add_data(features, int(class_id), td.motion_names[class_id])
+    return td
+
+
+def cpch_stream(num_messages, num_channels=16, seed=0):
+    """
+    Raw CPCH serial bytes: streaming data messages with valid checksums and sequence numbers
+
+    Message layout is [128, 0, status, sequence, payload length, payload (int16 per channel), crc]
+
+    :param num_messages: number of messages
+    :param num_channels: number of differential channels
+    :return: bytearray of the stream, payload length
+    """
+    from inputs.cpc_headstage import CpcHeadstage
+
+    crc_func = CpcHeadstage().crc_func
+    rng = np.random.default_rng(seed)
+    payload_size = 2 * num_channels
+    stream = bytearray()
+    for i in range(num_messages):
+        msg = bytes([128, 0, 0, i % 256, payload_size])
+        msg += rng.integers(-2000, 2000, num_channels).astype('<i2').tobytes()
+        stream += msg + struct.pack('B', crc_func(msg))
+    return stream, payload_size
+
+
+def percept_message():
+    """ Recorded NFU percept message from the tests folder """
+    filename = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'percepts.bin')
+    return np.fromfile(filename, dtype=np.uint8)[1366:]
+
+
+def roc_file():
+    """
+    ROC table for the plant.  Uses the MPL.roc_table file if found, otherwise writes a two waypoint table of every
+    grasp used by the plant to a temporary file.  The temporary file is written once per process and deleted at exit
+    """
+    global _roc_file
+    from utilities.user_config import get_user_config_var
+
+    filename = get_user_config_var('MPL.roc_table', 'mpl/#VMPL_ROC.xml')
+    if os.path.isfile(filename):
+        return filename
+    if _roc_file is not None:
+        return _roc_file
+
+    grasps = ['Spherical Grasp', 'Tip Grasp', 'Three Finger Pinch Grasp', 'Lateral Grasp', 'Cylindrical Grasp',
+              'Power Grasp', 'Point Grasp']
+    joints = ','.join(str(i) for i in range(8, 28))  # hand joints, 1-based
+    tables = ''
+    for i, name in enumerate(grasps):
+        tables += ('<table><name>{}</name><id>{}</id><joints>{}</joints>'
+                   '<waypoint index="0"><angles>{}</angles></waypoint>'
+                   '<waypoint index="1"><angles>{}</angles></waypoint></table>\n').format(
+            name, i, joints, ','.join(['0'] * 20), ','.join(['1'] * 20))
+    f = tempfile.NamedTemporaryFile('w', suffix='_ROC.xml', delete=False)
+    with f:
+        f.write('<?xml version="1.0"?>\n<root>\n{}</root>\n'.format(tables))
+    _roc_file = f.name
+    atexit.register(_remove_roc_file)
+    return _roc_file
+
+
+def _remove_roc_file():
+    if _roc_file is not None and os.path.isfile(_roc_file):
+        os.remove(_roc_file)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+Run the benchmark suite, save baselines and compare against them
+
+Each benchmark is called in batches sized to take about 0.2s, and the per call time of several batches is recorded.
+The minimum is the most repeatable estimate of the cost of a call; the median shows the typical cost.
+
+Baselines are json files in benchmarks/baselines (or any path given) holding the results and the platform they were
+measured on.  Only compare baselines from the same machine.
+
+Usage (from the minivie folder):
+    python -m benchmarks.runner                               # print results
+    python -m benchmarks.runner --save before                 # save baselines/before.json
+    python -m benchmarks.runner --compare before              # report the change against baselines/before.json
+    python -m benchmarks.runner --filter feature --device myo
+
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from benchmarks import fixtures, suite
+
+BASELINE_FOLDER = os.path.join(os.path.dirname(__file__), 'baselines')
+
+
+def time_function(func, repeat=5, min_time=0.2):
+    """
+    Time a function
+
+    :param func: function with no arguments
+    :param repeat: number of batches
+    :param min_time: minimum duration of a batch, seconds
+    :return: dict of per call 'min', 'median' and 'mean' times (seconds) and the number of 'calls' per batch
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = int(np.ceil(number * min_time / max(elapsed, 1e-9)))
+    times = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return {'min': float(times.min()), 'median': float(np.median(times)), 'mean': float(times.mean()),
+            'calls': number}
+
+
+def collect(devices=None, name_filter=''):
+    """
+    Build the benchmarks
+
+    :param devices: names of the devices in fixtures.DEVICES to run.  Default is all
+    :param name_filter: only include benchmarks with this text in the name
+    :return: dict of {name: function}, with device benchmarks named '<device>/<benchmark>'
+    """
+    if devices is None:
+        devices = list(fixtures.DEVICES)
+    benchmarks = {}
+    for device_name in devices:
+        device = fixtures.DEVICES[device_name]
+        for build in suite.DEVICE_SUITES:
+            for name, func in build(device).items():
+                benchmarks[device_name + '/' + name] = func
+    for build in suite.SUITES:
+        benchmarks.update(build(fixtures.DEVICES[devices[0]]))
+    return {name: func for name, func in benchmarks.items() if name_filter in name}
+
+
+def run(benchmarks, repeat=5, min_time=0.2):
+    """ Time each benchmark, printing results as they complete.  Returns {name: time_function result} """
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = time_function(func, repeat, min_time)
+        print('{:<60} {:>10}'.format(name, format_time(results[name]['min'])))
+        sys.stdout.flush()
+    return results
+
+
+def format_time(seconds):
+    if seconds < 1e-3:
+        return '{:.2f}us'.format(seconds * 1e6)
+    return '{:.3f}ms'.format(seconds * 1e3)
+
+
+def baseline_path(name):
+    # name can be a file path, or the name of a baseline in the baselines folder
+    if os.path.splitext(name)[1] == '.json':
+        return name
+    return os.path.join(BASELINE_FOLDER, name + '.json')
+
+
+def save_baseline(results, name):
+    filename = baseline_path(name)
+    folder = os.path.dirname(filename)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    baseline = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'platform': platform.platform(),
+                'processor': platform.processor(), 'python': platform.python_version(), 'numpy': np.__version__,
+                'results': results}
+    with open(filename, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print('Saved baseline {}'.format(filename))
+
+
+def load_baseline(name):
+    with open(baseline_path(name)) as f:
+        return json.load(f)
+
+
+def compare(baseline, results, tolerance=0.2):
+    """
+    Report the change of each benchmark against a baseline
+
+    :param baseline: baseline dict from load_baseline
+    :param results: results from run
+    :param tolerance: relative change reported as faster / slower, e.g. 0.2 for 20%
+    :return: report text, number of benchmarks slower than the tolerance
+    """
+    old = baseline['results']
+    lines = ['Compared to baseline from {} ({}, python {}, numpy {})'.format(
+        baseline['created'], baseline['platform'], baseline['python'], baseline['numpy']),
+        '{:<60} {:>10} {:>10} {:>8}'.format('benchmark', 'baseline', 'current', 'speedup')]
+    num_slower = 0
+    for name, result in results.items():
+        if name not in old:
+            lines.append('{:<60} {:>10} {:>10} {:>8}'.format(name, '--', format_time(result['min']), 'new'))
+            continue
+        speedup = old[name]['min'] / result['min']
+        if speedup < 1 / (1 + tolerance):
+            note = 'SLOWER'
+            num_slower += 1
+        elif speedup > 1 + tolerance:
+            note = 'faster'
+        else:
+            note = ''
+        lines.append('{:<60} {:>10} {:>10} {:>7.2f}x {}'.format(
+            name, format_time(old[name]['min']), format_time(result['min']), speedup, note))
+    not_run = set(old) - set(results)
+    if not_run:
+        lines.append('{} baseline benchmarks not run'.format(len(not_run)))
+    return '\n'.join(lines), num_slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MiniVIE hot path benchmarks')
+    parser.add_argument('-s', '--save', help='save results as a baseline with this name (or .json path)')
+    parser.add_argument('-c', '--compare', help='compare results to the baseline with this name (or .json path)')
+    parser.add_argument('-f', '--filter', default='', help='only run benchmarks with this text in the name')
+    parser.add_argument('-d', '--device', action='append', choices=sorted(fixtures.DEVICES),
+                        help='input device fixture to run (can be repeated).  Default is all')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of timed batches per benchmark')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2,
+                        help='relative change reported as faster or slower in the comparison')
+    args = parser.parse_args()
+
+    # Keep training and config messages out of the results
+    logging.basicConfig(level=logging.WARNING)
+
+    for name in args.device or sorted(fixtures.DEVICES):
+        print(fixtures.DEVICES[name])
+    results = run(collect(args.device, args.filter), repeat=args.repeat)
+
+    if args.save:
+        save_baseline(results, args.save)
+    if args.compare:
+        report, num_slower = compare(load_baseline(args.compare), results, args.tolerance)
+        print('')
+        print(report)
+        if num_slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
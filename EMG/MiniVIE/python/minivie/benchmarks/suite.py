@@ -0,0 +1,104 @@
+"""
+Timed operations of the control loop hot path
+
+Each function below takes a fixtures.Device and returns a dict of {benchmark name: function with no arguments}.
+Setup (fixtures, fitting, etc) happens when the dict is built, so only the call itself is timed.
+
+"""
+import inspect
+
+import numpy as np
+
+from benchmarks import fixtures
+
+
+def features(device):
+    """ extract_features of each EMGFeatures subclass on one window """
+    from pattern_rec import features as emg_features
+
+    window = fixtures.emg_window(device)
+    benchmarks = {}
+    for cls in emg_features.EMGFeatures.__subclasses__():
+        kwargs = {'fs': device.sample_rate} if 'fs' in inspect.signature(cls).parameters else {}
+        feature = cls(**kwargs)
+        benchmarks['features.' + cls.__name__] = lambda feature=feature: feature.extract_features(window)
+    return benchmarks
+
+
+def feature_extract(device):
+    """ FeatureExtract.feature_extract with the features selected by the user config (mav, curve_len, zc, ssc) """
+    from pattern_rec import feature_extract as fe, features_selected
+
+    extract = fe.FeatureExtract()
+    features_selected.FeaturesSelected(extract).create_instance_list(device.num_channels)
+    window = fixtures.emg_window(device)
+    return {'feature_extract': lambda: extract.feature_extract(window)}
+
+
+def classifier(device):
+    """ Classifier.fit on 8 classes of 200 samples and Classifier.predict of one feature vector """
+    from pattern_rec.classifier import Classifier
+
+    num_features = device.num_channels * 4
+    td = fixtures.training_data(num_features)
+    clf = Classifier(td)
+    clf.fit()
+    x = fixtures.training_features(num_features, samples_per_class=1, seed=1)[0][:1]
+    return {'classifier.fit': clf.fit, 'classifier.predict': lambda: clf.predict(x)}
+
+
+def cpch(device):
+    """ byte_align_fast and validate_messages on the bytes of one loop step, with a partial message at the end """
+    from inputs.cpc_headstage import CpcHeadstage
+
+    if device.name != 'cpch':
+        return {}
+    headstage = CpcHeadstage()
+    stream, payload_size = fixtures.cpch_stream(device.samples_per_step + 1, device.num_channels)
+    msg_size = payload_size + 6
+    stream = stream[:-msg_size // 2]
+    aligned = headstage.byte_align_fast(stream, msg_size)['data_aligned']
+    return {'cpch.byte_align_fast': lambda: headstage.byte_align_fast(stream, msg_size),
+            'cpch.validate_messages': lambda: headstage.validate_messages(aligned, payload_size)}
+
+
+def plant(device):
+    """ Plant.update with an arm joint and a grasp moving """
+    import mpl
+    from controls.plant import Plant
+
+    p = Plant(device.dt, fixtures.roc_file())
+    p.grasp_id = 'Spherical Grasp'
+
+    def update():
+        p.new_step()
+        p.set_joint_velocity(mpl.JointEnum.ELBOW, 0.5)
+        p.set_grasp_velocity(0.5)
+        p.update()
+
+    return {'plant.update': update}
+
+
+def mpl_messages(device):
+    """ Decoding NFU percepts and encoding limb commands """
+    import mpl
+    from mpl import nfu
+    from mpl.open_nfu import open_nfu_protocol
+
+    percepts = fixtures.percept_message()
+    position = np.linspace(0, 1, mpl.JointEnum.NUM_JOINTS)
+    velocity = np.zeros(mpl.JointEnum.NUM_JOINTS)
+    impedance = np.full(mpl.JointEnum.NUM_JOINTS, 40.0)
+    return {
+        'nfu.decode_percept_msg': lambda: nfu.decode_percept_msg(percepts),
+        'nfu.encode_param_update_msg': lambda: nfu.encode_param_update_msg('GAIN', np.eye(4)),
+        'open_nfu.encode_position_velocity_command':
+            lambda: open_nfu_protocol.encode_position_velocity_command(position, velocity),
+        'open_nfu.encode_position_velocity_impedance_command':
+            lambda: open_nfu_protocol.encode_position_velocity_impedance_command(position, velocity, impedance),
+    }
+
+
+# Benchmarks that depend on the input device are run for every device.  The rest are run once
+DEVICE_SUITES = [features, feature_extract, classifier, cpch]
+SUITES = [plant, mpl_messages]
@@ -30,6 +30,7 @@ import numpy as np
 
 import mpl.roc as roc
 from mpl import JointEnum as MplId
+from utilities import instrumentation
 from utilities import user_config
 
 from transforms3d.euler import mat2euler
@@ -209,6 +210,7 @@ class Plant(object):
 
         return
 
+    @instrumentation.probe('plant')
     def update(self):
         # perform time integration based on elapsed time, dt
 
@@ -33,8 +33,8 @@ class AlcUdp(SignalInput):
         self.num_samples_per_packet = 10
 
         # Default data buffer [nSamples by nChannels]
-        # Treat as private.  use get_data to access since it is thread-safe
-        self.__dataEMG = np.zeros((self.num_samples, self.num_channels))
+        # Shared ring buffer from SignalInput.  use get_data to access since it is thread-safe
+        self.init_buffer(self.num_samples, self.num_channels)
 
         # Internal values
         self.__battery_level = -1  # initial value is unknown
@@ -75,9 +75,7 @@ class AlcUdp(SignalInput):
             output = np.array(output)
 
             # Populate EMG Data Buffer (newest on top)
-            for i in range(self.num_samples_per_packet):
-                self.__dataEMG = np.roll(self.__dataEMG, 1, axis=0)
-                self.__dataEMG[:1, :] = output[i * self.num_channels:(i * self.num_channels) + self.num_channels]
+            self.write(output.reshape(self.num_samples_per_packet, self.num_channels))
 
             # count samples toward data rate
             num_emg_samples = self.num_samples_per_packet
@@ -92,7 +90,7 @@ class AlcUdp(SignalInput):
 
     def get_data(self):
         """Return data buffer [nSamples][nChannels]"""
-        return self.__dataEMG
+        return self.read_latest(self.num_samples)[0]
 
     def get_battery(self):
         # Return the battery value (0-100)
@@ -50,7 +50,7 @@ class CpcHeadstage(object):
         self.crc_func = crcmod.mkCrcFun(int('101001101', 2), initCrc=0, rev=False)
 
         # pre-generate the crc table for fast xor checking
-        self.crc_table = [self.crc_func(struct.pack('B', i)) for i in range(256)]
+        self.crc_table = np.array([self.crc_func(struct.pack('B', i)) for i in range(256)], dtype=np.uint8)
 
     def encode_start_msg(self):
         msg = struct.pack('B', self.msg_id_start_streaming)
@@ -83,7 +83,7 @@ class CpcHeadstage(object):
         XOR checksum of msg
 
         Input Arguments:
-        msg -- list of bytearrays to be checksummed
+        msg -- uint8 ndarray [nMsg, nBytes] to be checksummed
 
         Return Arguments:
         crc_result -- ndarray with 0 when good checksum for each message
@@ -95,7 +95,7 @@ class CpcHeadstage(object):
         crc_result = np.zeros(num_messages, dtype=np.uint8) # initialize crc result
         for byte_idx in range(num_bytes):
             xor_result = np.bitwise_xor(crc_result, msg_in[:, byte_idx])
-            crc_result[:] = [self.crc_table[x] for x in xor_result]
+            crc_result = self.crc_table[xor_result]
 
         return crc_result
 
@@ -105,43 +105,62 @@ class CpcHeadstage(object):
 
     @staticmethod
     def byte_align_fast(data_stream, msg_size):
+        """
+        Align a raw byte stream into messages
+
+        Find all start chars ('128') and index the next set of bytes off of these starts.  Starting from the first
+        start char, messages are accepted while start chars repeat every msg_size bytes.  At a break in that chain the
+        search resumes from the next start char after the last accepted message.  This could lead to overlapping data
+        but valid data will be verified using the checksum
 
-        # Find all start chars ('128') and index the next set of bytes
-        # off of these starts.  This could lead to overlapping data
-        # but valid data will be verified using the checksum
+        Return Arguments:
+        dict with 'data_aligned' -- uint8 ndarray [nMsg, msg_size]
+                  'remainder_bytes' -- bytes following the last full message, to prepend to the next read
+        """
         byte_pattern = [128, 0, 0]
-        idx_start_bytes = [i for i, x in enumerate(data_stream) if x == 128]
+        data = np.frombuffer(bytes(data_stream), dtype=np.uint8)
+        is_start = data == 128
+        idx_start_bytes = np.flatnonzero(is_start)
 
-        if not idx_start_bytes:
+        if not len(idx_start_bytes):
             print('No start sequence [' + ' '.join(
                 str(x) for x in byte_pattern) + '] found in data stream of length %d.  Try resetting CPCH' % (
                       len(data_stream)))
 
         # Check if there are too few bytes between the last start
         # character and the end of the buffer
-        idx_start_bytes_in_range = [x for x in idx_start_bytes if x <= len(data_stream) - msg_size]
-        if not idx_start_bytes_in_range:
+        last_start = len(data) - msg_size
+        idx_start_bytes = idx_start_bytes[idx_start_bytes <= last_start]
+        if not len(idx_start_bytes):
             # No full messages found
-            d = {'data_aligned': [], 'remainder_bytes': data_stream}
+            d = {'data_aligned': np.empty((0, msg_size), dtype=np.uint8), 'remainder_bytes': data_stream}
             return d
 
-        # Check start bytes to make sure they are separated by correct message size
-        check_msg_sizes = True
-        while check_msg_sizes:
-            for i, this_start_idx in enumerate(idx_start_bytes_in_range):
-                if i == len(idx_start_bytes_in_range) - 1:
-                    check_msg_sizes = False  # All msg sizes checked
-                    continue
-                if not (idx_start_bytes_in_range[i + 1] - this_start_idx) == msg_size:
-                    del idx_start_bytes_in_range[i + 1]
-                    break  # break for loop to re-enter again now that start byte list has been modified
-
-        remainder_bytes = data_stream[idx_start_bytes_in_range[-1] + msg_size:]
+        # Count the run of start chars spaced msg_size apart beginning at each byte.  Viewed as [nRows, msg_size],
+        # each column holds bytes that are msg_size apart, so a run ends at the next row without a start char
+        num_rows = last_start // msg_size + 1
+        grid = np.zeros(num_rows * msg_size, dtype=bool)
+        grid[:last_start + 1] = is_start[:last_start + 1]
+        grid = grid.reshape(num_rows, msg_size)
+        row = np.arange(num_rows).reshape(-1, 1)
+        next_gap = np.where(grid, num_rows, row)
+        next_gap = np.minimum.accumulate(next_gap[::-1], axis=0)[::-1]
+        run_length = (next_gap - row).ravel()
+
+        # Follow the chains of start bytes, jumping to the next start char after each break
+        idx_chain = []
+        i = 0
+        while i < len(idx_start_bytes):
+            this_start_idx = idx_start_bytes[i]
+            chain_end = this_start_idx + run_length[this_start_idx] * msg_size
+            idx_chain.append(np.arange(this_start_idx, chain_end, msg_size))
+            i = np.searchsorted(idx_start_bytes, chain_end)
+        idx_chain = np.concatenate(idx_chain)
+
+        remainder_bytes = data_stream[idx_chain[-1] + msg_size:]
 
         # Align the data based on the validated start characters
-        data_aligned = []
-        for i in idx_start_bytes_in_range:
-            data_aligned.append(data_stream[i: i + msg_size])
+        data_aligned = data[idx_chain.reshape(-1, 1) + np.arange(msg_size)]
 
         # Return data
         d = {'data_aligned': data_aligned, 'remainder_bytes': remainder_bytes}
@@ -152,11 +171,11 @@ class CpcHeadstage(object):
         Validate a matrix of messages using a criteria of checksum,
         appropriate message length, and status bytes
 
-        Aligned data should be a list of length = numMessages,
-        with each element being bytearray of length = numBytesPerMessage
+        Aligned data should be a uint8 ndarray [numMessages, numBytesPerMessage]
+        (a list of equal length bytearrays is also accepted)
         """
         # Convert input to ndarray to speed things up
-        aligned_data = np.array(aligned_msg, dtype=np.uint8)
+        aligned_data = np.asarray(aligned_msg, dtype=np.uint8)
 
         # Compute CRC
         # t = time.time()
@@ -203,7 +222,8 @@ class CpcHeadstage(object):
 
         # Check sequence bytes in batch operation
         sequence_row = valid_data[:, 3]
-        sequence_expected = np.arange(sequence_row[0], sequence_row[0] + num_valid, dtype=np.uint8)
+        # sequence counter is a single byte, so wrap the expected values
+        sequence_expected = (int(sequence_row[0]) + np.arange(num_valid)).astype(np.uint8)
         is_valid_sequence = sequence_expected == sequence_row
         sum_bad_sequence = np.size(is_valid_sequence) - np.count_nonzero(is_valid_sequence)
 
@@ -215,41 +235,34 @@ class CpcHeadstage(object):
 
     @staticmethod
     def get_signal_data(valid_data, diff_cnt, se_cnt):
-        # Typecast the data to the appropriate data size
+        """
+        Typecast the message payloads to the appropriate data size
 
-        # Get data size
-        num_valid_samples = len(valid_data)
+        Input Arguments:
+        valid_data -- uint8 ndarray [nMsg, msgSize] of validated messages
+        diff_cnt -- number of differential (int16) channels
+        se_cnt -- number of single ended (uint16) channels
 
-        if diff_cnt > 0:
+        Return Arguments:
+        dict with 'diff_data_int16' [nMsg, diff_cnt] and 'se_data_u16' [nMsg, se_cnt], or None if no channels
+        """
+        valid_data = np.asarray(valid_data, dtype=np.uint8)
 
-            # Convert the valid data to Int16int
-            payload_idx_start = 5
-            payload_idx_end = payload_idx_start + 2 * diff_cnt  # Diff data starts after header
-            de_data_u8 = [x[payload_idx_start:payload_idx_end] for x in valid_data]
-            string_num_int16 = str(int((payload_idx_end - payload_idx_start) / 2))
-
-            diff_data_int16 = []
-            for x in de_data_u8:
-                # print('DE Message: ' + str(x))
-                new_val = struct.unpack(string_num_int16 + 'h', x)
-                # print('DE Converted: ' + str(new_val))
-                diff_data_int16.append(new_val)
+        # Diff data starts after header, se data starts after diff data
+        payload_idx_start = 5
+
+        if diff_cnt > 0:
+            payload_idx_end = payload_idx_start + 2 * diff_cnt
+            de_data_u8 = np.ascontiguousarray(valid_data[:, payload_idx_start:payload_idx_end])
+            diff_data_int16 = de_data_u8.view('<i2')
         else:
             diff_data_int16 = None
 
         if se_cnt > 0:
-            payload_idx_start = 5 + 2 * diff_cnt  # se data starts after diff data
+            payload_idx_start += 2 * diff_cnt
             payload_idx_end = payload_idx_start + 2 * se_cnt
-
-            se_data_u8 = [x[payload_idx_start:payload_idx_end] for x in valid_data]
-            string_num_uint16 = str(int((payload_idx_end - payload_idx_start) / 2))
-            # se_data_u16 = [struct.unpack(string_num_uint16 + 'H', x) for x in se_data_u8]
-            se_data_u16 = []
-            for x in se_data_u8:
-                # print('SE Message: ' + str(x))
-                new_val = struct.unpack(string_num_uint16 + 'H', x)
-                # print('SE Converted: ' + str(new_val))
-                se_data_u16.append(new_val)
+            se_data_u8 = np.ascontiguousarray(valid_data[:, payload_idx_start:payload_idx_end])
+            se_data_u16 = se_data_u8.view('<u2')
         else:
             se_data_u16 = None
 
@@ -15,16 +15,16 @@ import struct
 #
 # make sure any connections to COM object are closed, otherwise will get permission denied error
 
-from scipy import signal  # Used for signal filtering
 import numpy as np  # Used for buffer operations
 import serial  # USB serial interface
 import time
 import threading
 import logging
-import h5py
 from datetime import datetime
 from inputs.cpc_headstage import CpcHeadstage
 from inputs.signal_input import SignalInput
+from inputs.signal_filter import FilterChain, HighPass
+from utilities.stream_logger import StreamLogger
 
 
 class CpchSerial(CpcHeadstage, SignalInput):
@@ -40,6 +40,8 @@ class CpchSerial(CpcHeadstage, SignalInput):
     Typical Baud rate for the device is 921600 bps
     """
 
+    newest_first = False  # get_data returns the oldest sample first
+
     def __init__(self, port='/dev/ttyUSB0', bioamp_mask=0xFFFF, gpi_mask=0xFFFF):
         """
         Inits CpchSerial with port information and channel selection parameters.
@@ -54,10 +56,7 @@ class CpchSerial(CpcHeadstage, SignalInput):
         self.enable_data_logging = False  # Enables logging data stream to disk
         t = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         self._h5filename = t + '_CPCH_RAWBYTES.hdf5'
-        self._h5file = None
-        # self._h5file = h5py.File(self._h5filename, 'w')
-        # self._h5file.close()
-        self._rawbytes_log_counter = 1
+        self._data_logger = None  # background writer, created on connect
 
         # Gain values from normalized values (Ref: RPP-700-ICD_-9959)
         self.gain_single_ended = 0.00489  # Range: 0-1023; .00489 Volts / Count; Range is [0, 5)
@@ -73,7 +72,6 @@ class CpchSerial(CpcHeadstage, SignalInput):
 
         # private access variables
         self._serial_obj = None
-        self._data_buffer = []  # list of bytearrays
         self._serial_buffer = bytearray([])  # bytearray
         self._prev_data_frame_id = -1
         self._bioamp_cnt = 0
@@ -129,6 +127,10 @@ class CpchSerial(CpcHeadstage, SignalInput):
         self.sample_frequency = 1000
         self.num_samples = 3000  # number of samples buffered for get_data. Can be changed before calling connect
 
+        # Filter applied to samples as they are received (Inputs.HighPass(20,3,Fs))
+        # 20 Hz break freq, 3rd order 1000Hz.  Can be replaced before calling connect
+        self.filter_chain = FilterChain([HighPass(20, 3, fs=self.sample_frequency)])
+
     def connect(self):
         # Initialize the serial object
 
@@ -136,12 +138,19 @@ class CpchSerial(CpcHeadstage, SignalInput):
         self._gpi_cnt = len(self.se_channel_idx)
 
         # buffer to hold collected data
-        self._data_buffer = np.empty([self.num_samples, self.num_channels], dtype=np.double)
+        self.init_buffer(self.num_samples, self.num_channels)
+        if self.filter_chain is not None:
+            self.filter_chain.reset()
 
-        if self.enable_data_logging:
+        if self.enable_data_logging and self._data_logger is None:
             # moved from init() so files don't get written unless logging enabled
-            self._h5file = h5py.File(self._h5filename, 'w')
-            self._h5file.close()
+            self._data_logger = StreamLogger(self._h5filename, dtype=np.uint8)
+            self._data_logger.name = 'CPCHSerialLog'
+            try:
+                self._data_logger.start()
+            except OSError as e:
+                logging.error('Failed to open data log {}: {}.  Data will not be logged'.format(self._h5filename, e))
+                self._data_logger = None
 
         try:
             self._serial_obj = serial.Serial(
@@ -280,16 +289,12 @@ class CpchSerial(CpcHeadstage, SignalInput):
         if self._serial_obj.closed or not self._is_running:
             self.start()
 
-        # Return data from buffer
-        data = self._data_buffer[-num_samples:, idx_channel]
+        # Return filtered data from buffer (oldest sample first)
+        data = self.read_latest(num_samples)[0][::-1]
+        if list(idx_channel) != list(range(self.num_channels)):
+            data = data[:, idx_channel]
 
-        # Filter data
-        # Inputs.HighPass(20,3,Fs)
-        # 20 Hz break freq, 3rd order 1000Hz
-        sos = signal.butter(3, 20, btype='highpass', output='sos', fs=1000)
-        filtered = signal.sosfiltfilt(sos, data, axis=0)
-
-        return filtered
+        return data
 
     def _stream_data(self):
         # Loop to receive data.  This function runs on the target thread
@@ -322,6 +327,9 @@ class CpchSerial(CpcHeadstage, SignalInput):
         r = bytearray(self._serial_obj.read(num_available))
         raw_bytes = self._serial_buffer + r
 
+        # Log data
+        self._log_data(r)
+
         payload_size = 2 * (self._bioamp_cnt + self._gpi_cnt)
         msg_size = payload_size + 6
 
@@ -332,7 +340,7 @@ class CpchSerial(CpcHeadstage, SignalInput):
         aligned_data = d['data_aligned']
         remainder_bytes = d['remainder_bytes']
 
-        num_aligned_bytes = sum([len(x) for x in aligned_data])
+        num_aligned_bytes = aligned_data.size
         num_remainder_bytes = len(remainder_bytes)
         # DEBUG
         # print('Byte Align Fast Debug:')
@@ -345,7 +353,7 @@ class CpchSerial(CpcHeadstage, SignalInput):
         self._serial_buffer = remainder_bytes
 
         # No new data
-        if not aligned_data:
+        if not len(aligned_data):
             print('No aligned data available from CPC serial buffer, internal buffer not updated.')
             self._set_stream_sleep_time(stream_loop_start_time, 0.02)
             return
@@ -367,12 +375,10 @@ class CpchSerial(CpcHeadstage, SignalInput):
         self._count_adc_error += error_stats['sum_adc_error']
 
         num_valid_samples = len(valid_data)
-        num_valid_bytes_per_message = [len(x) for x in valid_data]
-        num_valid_bytes = sum(num_valid_bytes_per_message)
-        num_aligned_bytes = sum([len(x) for x in aligned_data])
+        num_valid_bytes = valid_data.size
         num_bytes = len(raw_bytes)
 
-        assert num_valid_bytes_per_message == [msg_size] * len(num_valid_bytes_per_message)
+        assert valid_data.shape[1] == msg_size
 
         # Extract the signals
         d = self.get_signal_data(valid_data, self._bioamp_cnt, self._gpi_cnt)
@@ -384,25 +390,13 @@ class CpchSerial(CpcHeadstage, SignalInput):
         de_data_normalized = np.array(diff_data_i16, dtype='float') * self.gain_differential
         se_data_normalized = np.array(se_data_u16, dtype='float') / 1024.0 * self.gain_single_ended
 
-        # Log data
-        self._log_data(raw_bytes)
-
-        if num_valid_samples > self._data_buffer.shape[0]:
-            # Replace entire buffer
-            if any(self.de_channel_idx):
-                self._data_buffer[:, self.de_channel_idx] = de_data_normalized[-self._data_buffer.shape[0]:,
-                                                            self.de_channel_idx]
-            if any(self.se_channel_idx):
-                self._data_buffer[:, self.se_channel_idx] = se_data_normalized[-self._data_buffer.shape[0]:,
-                                                            self.se_channel_idx]
-        else:
-            # Check for buffer overrun
-            self._data_buffer = np.roll(self._data_buffer, -num_valid_samples, axis=0)
-            buffer_sample_idx = range(self._data_buffer.shape[0] - num_valid_samples, self._data_buffer.shape[0])
-            for i, buffer_channel_idx in enumerate(self.de_channel_idx):
-                self._data_buffer[buffer_sample_idx, buffer_channel_idx] = de_data_normalized[:, i]
-            for i, buffer_channel_idx in enumerate(self.se_channel_idx):
-                self._data_buffer[buffer_sample_idx, buffer_channel_idx] = se_data_normalized[:, i]
+        # Populate data buffer with differential channels followed by single-ended channels
+        block = np.empty((num_valid_samples, self.num_channels))
+        if self._bioamp_cnt:
+            block[:, :self._bioamp_cnt] = de_data_normalized
+        if self._gpi_cnt:
+            block[:, self._bioamp_cnt:] = se_data_normalized
+        self.write(block)
 
         # Compute data rate
         if self.__valid_message_count == 0:
@@ -443,7 +437,12 @@ class CpchSerial(CpcHeadstage, SignalInput):
         # return string formatted status message
         # with data rate and battery percentage
         # E.g. 1000Hz
-        return f'CPCH: {self.__valid_message_rate:.0f}Hz {self.__byte_rate/1000*8:.1f}kbps'
+        msg = f'CPCH: {self.__valid_message_rate:.0f}Hz {self.__byte_rate/1000*8:.1f}kbps'
+        if self._data_logger is not None and self._data_logger.error is not None:
+            msg += ' Log stopped'
+        elif self._data_logger is not None and self._data_logger.dropped_blocks:
+            msg += f' Log dropped: {self._data_logger.dropped_blocks}'
+        return msg
 
     def _set_stream_sleep_time(self, stream_loop_start_time, target_dt):
         # Update loop sleep time to account for processing time
@@ -457,21 +456,17 @@ class CpchSerial(CpcHeadstage, SignalInput):
 
     def _log_data(self, raw_bytes):
         # Method to log all raw bytes as hdf5
-        # Should append to file each time
-        if self.enable_data_logging:
-            self._h5file = h5py.File(self._h5filename, 'r+')
-            t = datetime.now()
-            g1 = self._h5file.create_group('ByteRead_{0:05d}'.format(self._rawbytes_log_counter))
-            g1.create_dataset('rawbytes', data=[x for x in raw_bytes], shape=(len(raw_bytes), 1), dtype='uint8')
-            encoded = [a.encode('utf8') for a in str(t)]  # Need to encode strings
-            g1.create_dataset('timestamp', data=encoded, shape=(len(encoded), 1))
-            self._rawbytes_log_counter += 1
-            self._h5file.close()
+        # Bytes are queued and appended to the file on the logger thread
+        if self._data_logger is not None:
+            self._data_logger.log(raw_bytes)
 
     def close(self):
         # Method to disconnect object
         logging.info("Closing CPC Serial comms {}".format(self.serial_port))
         self._serial_obj.close()
+        if self._data_logger is not None:
+            self._data_logger.close()
+            self._data_logger = None
 
     def stop(self):
         self.close()
@@ -23,8 +23,8 @@ class DaqEMGDevice(SignalInput):
         self.id = id
 
         # Default data buffer [nSamples by nChannels]
-        # Treat as private.  use getData to access since it is thread-safe
-        self.__dataEMG = np.zeros((num_samples, 8))
+        # Shared ring buffer from SignalInput.  use getData to access since it is thread-safe
+        self.init_buffer(num_samples, self.num_channels)
 
         # Internal values
         self.__battery_level = -1  # initial value is unknown
@@ -62,14 +62,11 @@ class DaqEMGDevice(SignalInput):
             if self.log_handlers is not None:
                 self.log_handlers(self.output)
 
-            with self.__lock:
-
-                # Populate EMG Data Buffer (newest on top)
-                self.__dataEMG = np.roll(self.__dataEMG, len(self.output[0][:]), axis=0)
-                for i in range(len(self.output[0][:])):
-                    for s in range(len(self.output)):
-                        self.__dataEMG[i:i+1, s:s+1] = self.output[s][i:i+1]# insert into buffer entry
+            # Populate EMG Data Buffer (newest on top)
+            # task.read returns [nChannels][nSamples] in acquisition order
+            self.write(np.transpose(self.output))
 
+            with self.__lock:
                 # compute data rate
                 if self.__count_emg == 0:
                     # mark time
@@ -87,8 +84,7 @@ class DaqEMGDevice(SignalInput):
 
     def get_data(self):
         """ Return data buffer [nSamples][nChannels] """
-        with self.__lock:
-            return self.__dataEMG
+        return self.read_latest(self.num_samples)[0]
 
     def get_angles(self):
         """ Return Euler angles computed from Myo quaternion """
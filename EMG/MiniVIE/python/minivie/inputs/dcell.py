@@ -51,6 +51,7 @@ import logging
 import numpy as np
 from datetime import datetime
 from inputs.signal_input import SignalInput
+from utilities.stream_logger import StreamLogger
 
 
 class DCellSerial(SignalInput):
@@ -67,18 +68,16 @@ class DCellSerial(SignalInput):
         # Initialize object properties, does not actually connect to port
         self.port = port  # port name ex: 'COM4' for windows
         self.ser = None  # placeholder for pySerial object
-        self.__lock = None  # thread lock
         self.__thread = None  # thread
-        self.__dataStrain = np.zeros((num_samples, 1))  # strain data buffer
+        self.num_samples = num_samples
+        self.init_buffer(num_samples, 1)  # strain data buffer
         self.__stream_sleep_time = 0.1
 
         # Set up logging
         self.enable_data_logging = False  # Enables logging data stream to disk
-        # t = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        # self._h5filename = t + '_DCELL_LOG.hdf5'
-        # self._h5file = h5py.File(self._h5filename, 'w')
-        # self._h5file.close()
-        self._log_counter = 1
+        t = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self._h5filename = t + '_DCELL_LOG.hdf5'
+        self._data_logger = None  # background writer, created on connect
 
     def connect(self, start_streaming=True):
         # Method to connect to serial port and optionally start streaming
@@ -116,9 +115,15 @@ class DCellSerial(SignalInput):
         # Might do this if we want to run diagnostics without bogging down communications
         if start_streaming:
 
-            # Create threadsafe lock so that user based reading of values and thread-based
-            # writing of values do not conflict
-            self.__lock = threading.Lock()
+            if self.enable_data_logging and self._data_logger is None:
+                self._data_logger = StreamLogger(self._h5filename, dtype=np.double)
+                self._data_logger.name = 'DCellSerLog'
+                try:
+                    self._data_logger.start()
+                except OSError as e:
+                    logging.error('Failed to open data log {}: {}.  Data will not be logged'.format(
+                        self._h5filename, e))
+                    self._data_logger = None
 
             # Create a thread for processing new incoming data
             self.__thread = threading.Thread(target=self._stream_data)
@@ -193,9 +198,7 @@ class DCellSerial(SignalInput):
             if data != '':  # Returns nothing if serial stream times out
                 # Populate Strain Data Buffer (newest on top)
                 data = float(data)
-                with self.__lock:
-                    self.__dataStrain = np.roll(self.__dataStrain, 1, axis=0)
-                    self.__dataStrain[0] = data  # insert in first buffer entry
+                self.write(data)  # insert in first buffer entry
                 self._log_data(data)
 
             # Update sleep time
@@ -213,24 +216,14 @@ class DCellSerial(SignalInput):
 
     def get_data(self):
         # Method to return current strain buffer
-        with self.__lock:
-            return self.__dataStrain
+        return self.read_latest(self.num_samples)[0]
 
     def _log_data(self, data):
         # Method to log all data values as hdf5
-        # Should append to file each time
-        if self.enable_data_logging:
-            # Armiger 12/3/2017:  Adjusting to simple logging due to possibility of corrupt hdf5
-            logging.info('DCELL: ' + str(data))
-
-            # self._h5file = h5py.File(self._h5filename, 'r+')
-            # t = datetime.now()
-            # g1 = self._h5file.create_group('Log_{0:05d}'.format(self._log_counter))
-            # g1.create_dataset('strain', data=[data], shape=(1, 1))
-            # encoded = [a.encode('utf8') for a in str(t)]  # Need to encode strings
-            # g1.create_dataset('timestamp', data=encoded, shape=(len(encoded), 1))
-            # self._log_counter += 1
-            # self._h5file.close()
+        # Values are queued and appended on the logger thread.  The file is written in SWMR mode so it stays readable
+        # after an unclean exit (the reason for the switch to text logging on 12/3/2017)
+        if self._data_logger is not None:
+            self._data_logger.log(data)
 
     def close(self):
         # Method to disconnect object
@@ -239,6 +232,9 @@ class DCellSerial(SignalInput):
         self.ser.close()
         if self.__thread is not None:
             self.__thread.join()
+        if self._data_logger is not None:
+            self._data_logger.close()
+            self._data_logger = None
 
     def stop(self):
         self.close()
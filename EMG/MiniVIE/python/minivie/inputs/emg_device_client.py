@@ -51,9 +51,7 @@ Revisions
 import asyncio
 import websockets
 import time
-import numpy as np
 import logging
-from collections import deque
 import json
 
 # Ensure that the minivie specific modules can be found on path allowing execution from the 'inputs' folder
@@ -79,6 +77,8 @@ class EmgSocket(SignalInput):
 
         """
 
+    newest_first = False  # get_data returns the oldest sample first
+
     def __init__(self, source='ws://localhost:5678', num_samples=200):
 
         # Initialize superclass
@@ -92,13 +92,8 @@ class EmgSocket(SignalInput):
         self.num_samples_per_packet = 16
         self.num_samples = num_samples
 
-        # Default data packet buffer
-        self.data_buffer = deque([], maxlen=self.num_samples)
-
-        # packet size is 16 channels by 16 samples per packet.  fill buffer with zeros
-        empty_packet = self.num_channels * [0]
-        for x in range(0, self.num_samples):
-            self.data_buffer.append(empty_packet)
+        # Default data buffer, zero filled [nSamples by nChannels]
+        self.init_buffer(self.num_samples, self.num_channels)
 
         # Internal values
         self.num_packets = 0
@@ -150,8 +145,8 @@ class EmgSocket(SignalInput):
                             break
 
                         data = json.loads(msg)
-                        for sample in data['stream_batch']['raw_emg_batch']['samples']:
-                            self.data_buffer.append(sample['raw_emg'])  # add data to internal buffer
+                        samples = data['stream_batch']['raw_emg_batch']['samples']
+                        self.write([sample['raw_emg'] for sample in samples])  # add data to internal buffer
 
                         self.num_packets += 1  # count packets received
 
@@ -178,11 +173,8 @@ class EmgSocket(SignalInput):
                 await asyncio.sleep(3.0)  # wait to reconnect after a few seconds
 
     def get_data(self):
-        """ Return data buffer of stored data [nSamples][nChannels] """
-        # num_samples_per_packet = 16
-        # data = np.reshape(self.data_buffer, [num_samples_per_packet*self.num_samples, self.num_channels])
-        data = np.reshape(self.data_buffer, [self.num_samples, self.num_channels])
-        return data
+        """ Return data buffer of stored data [nSamples][nChannels] with the oldest sample first """
+        return self.read_latest(self.num_samples)[0][::-1]
 
     def get_status_msg(self):
         """ Return a string status message of data source state """
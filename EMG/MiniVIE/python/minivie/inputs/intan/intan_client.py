@@ -39,8 +39,8 @@ class IntanUdp(SignalInput):
         self.num_samples_per_packet = 3
 
         # Default data buffer [nSamples by nChannels]
-        # Treat as private.  use get_data to access since it is thread-safe
-        self.__dataEMG = np.zeros((self.num_samples, self.num_channels))
+        # Shared ring buffer from SignalInput.  use get_data to access since it is thread-safe
+        self.init_buffer(self.num_samples, self.num_channels)
 
         # Internal values
         self.__battery_level = -1  # initial value is unknown
@@ -82,11 +82,7 @@ class IntanUdp(SignalInput):
             output = 0.195 * (output - 32768)
 
             # Populate EMG Data Buffer (newest on top)
-            for i in range(self.num_samples_per_packet):
-                self.__dataEMG = np.roll(self.__dataEMG, 1, axis=0)
-                self.__dataEMG[:1, :] = output[
-                    i * self.num_channels : (i * self.num_channels) + self.num_channels
-                ]
+            self.write(output.reshape(self.num_samples_per_packet, self.num_channels))
 
             # count samples toward data data rate
             num_emg_samples = self.num_samples_per_packet
@@ -101,7 +97,7 @@ class IntanUdp(SignalInput):
 
     def get_data(self):
         """Return data buffer [nSamples][nChannels]"""
-        return self.__dataEMG
+        return self.read_latest(self.num_samples)[0]
 
     def get_battery(self):
         # Return the battery value (0-100)
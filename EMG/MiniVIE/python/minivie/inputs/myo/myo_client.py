@@ -42,8 +42,8 @@ class MyoUdp(SignalInput):
         self.__gyro = (0.0, 0.0, 0.0)
 
         # Default data buffer [nSamples by nChannels]
-        # Treat as private.  use get_data to access since it is thread-safe
-        self.__dataEMG = np.zeros((num_samples, 8))
+        # Shared ring buffer from SignalInput.  use get_data to access since it is thread-safe
+        self.init_buffer(num_samples, self.num_channels)
 
         # Internal values
         self.__battery_level = -1  # initial value is unknown
@@ -56,7 +56,7 @@ class MyoUdp(SignalInput):
         self.transport.name = 'MyoUdpRcv'
         self.transport.local_addr = get_address(local_addr_str)
         self.transport.remote_addr = get_address(remote_addr_str)
-        self.transport.add_message_handler(self.parse_messages)
+        self.transport.add_batch_handler(self.parse_batch)
 
     def connect(self):
         """
@@ -64,6 +64,23 @@ class MyoUdp(SignalInput):
         """
         self.transport.connect()
 
+    def parse_batch(self, packets):
+        """ Handle the packets of one receive.  EMG only packets are added to the buffer in a single write """
+        if any(len(data) == 48 for data in packets):
+            # MyoUdp.exe packets interleave emg with imu data, so keep them in order
+            for data in packets:
+                self.parse_messages(data)
+            return
+
+        emg_packets = [data for data in packets if len(data) == 16]
+        if emg_packets:
+            # 2 samples of 8 channels per packet, oldest first
+            self.write(np.frombuffer(b''.join(emg_packets), dtype=np.int8).reshape(-1, 8))
+            self.__count_emg += 2 * len(emg_packets)
+        for data in packets:
+            if len(data) != 16:
+                self.parse_messages(data)
+
     def parse_messages(self, data):
         """ Convert incoming bytes to emg, quaternion, accel, and ang rate """
 
@@ -80,8 +97,7 @@ class MyoUdp(SignalInput):
                 self.log_handlers(output[0:8])
 
             # Populate EMG Data Buffer (newest on top)
-            self.__dataEMG = np.roll(self.__dataEMG, 1, axis=0)
-            self.__dataEMG[:1, :] = output[:8]  # insert in first buffer entry
+            self.write(output[:8])
             num_emg_samples = 1
 
             # IMU Data Update
@@ -97,10 +113,7 @@ class MyoUdp(SignalInput):
             output = struct.unpack('16b', data)
 
             # Populate EMG Data Buffer (newest on top)
-            self.__dataEMG = np.roll(self.__dataEMG, 1, axis=0)
-            self.__dataEMG[:1, :] = output[0:8]  # insert in first buffer entry
-            self.__dataEMG = np.roll(self.__dataEMG, 1, axis=0)
-            self.__dataEMG[:1, :] = output[8:16]  # insert in first buffer entry
+            self.write(np.reshape(output, (2, 8)))
             num_emg_samples = 2
 
         elif len(data) == 20:  # IMU data only
@@ -134,8 +147,8 @@ class MyoUdp(SignalInput):
             self.__count_emg += num_emg_samples
 
     def get_data(self):
-        """ Return data buffer [nSamples][nChannels] """
-        return self.__dataEMG
+        """ Return data buffer [nSamples][nChannels] with the newest sample first """
+        return self.read_latest(self.num_samples)[0]
 
     def get_angles(self):
         """ Return Euler angles computed from Myo quaternion """
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Run a signal input in a separate process
+
+Device drivers receive and decode samples on threads, which compete with feature extraction and classification for
+the GIL of the control loop process.  ProcessInput moves a driver into its own process: the driver is connected in a
+child process, and its buffer is replaced by a SharedRingBuffer in shared memory, so every sample it writes (after
+its filter chain) is visible to the control loop without copying or messaging.  get_data returns a view of the
+shared buffer, exactly like the driver's own get_data.
+
+Only the sample buffer is shared.  Driver state such as the Myo IMU values stays in the child process, so sources
+that provide IMU data (get_imu, get_angles or get_rotationMatrix) are run in-process instead, see can_run_in_process.
+The status message of the driver is sent to the parent once a second.
+
+Usage:
+    from inputs.myo import myo_client
+    from inputs.process_input import ProcessInput
+    src = ProcessInput(myo_client.MyoUdp())  # not yet connected
+    src.connect()  # starts the child process
+    data = src.get_data()
+
+"""
+import logging
+import multiprocessing
+import pickle
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from inputs.signal_input import RingBuffer, SignalInput
+
+logger = logging.getLogger(__name__)
+
+# Methods of sources whose state (not shared with the parent process) is read by the control loop
+IMU_METHODS = ('get_imu', 'get_angles', 'get_rotationMatrix')
+
+
+class SharedRingBuffer(RingBuffer):
+    """
+    RingBuffer in shared memory, written by one process and read by any number of others
+
+    The sequence number is kept in the shared block and updated after the samples of each write, so readers never see
+    a sequence number ahead of the data.  The lock only serializes writers within the writing process.
+    """
+
+    def __init__(self, num_samples, num_channels, dtype=np.double, capacity=None, name=None):
+        """
+        :param num_samples: default number of samples returned by read_latest
+        :param num_channels: number of channels (columns) per sample
+        :param dtype: numpy data type of the samples
+        :param capacity: number of samples retained.  Defaults to 2*num_samples
+        :param name: name of an existing shared buffer to attach to.  A new one is created if None
+        """
+        import threading
+
+        self.num_samples = num_samples
+        self.num_channels = num_channels
+        self.capacity = max(capacity or 2 * num_samples, num_samples, 1)
+        dtype = np.dtype(dtype)
+
+        # layout: [sequence (int64)] [timestamps (float64) x 2*capacity] [data x 2*capacity x num_channels]
+        num_rows = 2 * self.capacity
+        offset_data = 8 + 8 * num_rows
+        size = offset_data + dtype.itemsize * num_rows * num_channels
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+
+        self._header = np.ndarray((1,), dtype=np.int64, buffer=self._shm.buf)
+        self.timestamps = np.ndarray((num_rows,), dtype=np.double, buffer=self._shm.buf, offset=8)
+        self.data = np.ndarray((num_rows, num_channels), dtype=dtype, buffer=self._shm.buf, offset=offset_data)
+        if self.owner:
+            self._header[0] = 0
+            self.timestamps[:] = 0
+            self.data[:] = 0
+        self.lock = threading.Lock()
+
+    @property
+    def sequence(self):
+        return int(self._header[0])
+
+    @sequence.setter
+    def sequence(self, value):
+        self._header[0] = value
+
+    def spec(self):
+        """ Keyword arguments that attach another SharedRingBuffer to this one """
+        return {'num_samples': self.num_samples, 'num_channels': self.num_channels, 'dtype': self.data.dtype.str,
+                'capacity': self.capacity, 'name': self.name}
+
+    def close(self):
+        """ Detach from the shared memory, and free it if this buffer created it """
+        # drop the views first, the memory can't be released while they exist
+        self._header = self.timestamps = self.data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # a caller still holds a view from read_latest.  The mapping is released when that is freed
+            pass
+        if self.owner:
+            self._shm.unlink()
+
+
+def can_run_in_process(source):
+    """
+    Check whether a source can be run by ProcessInput
+
+    :param source: SignalInput, not yet connected
+    :return: (True, '') or (False, reason)
+    """
+    imu_methods = [name for name in IMU_METHODS if hasattr(source, name)]
+    if imu_methods:
+        return False, 'provides IMU data ({}) that is not shared between processes'.format(', '.join(imu_methods))
+    if multiprocessing.get_start_method() != 'fork':
+        # the source is pickled to start the child process
+        try:
+            pickle.dumps(source)
+        except Exception as e:
+            return False, 'can not be passed to a new process: {}'.format(e)
+    return True, ''
+
+
+class ProcessInput(SignalInput):
+    """
+    Signal input running another (not yet connected) SignalInput in a child process
+    """
+
+    def __init__(self, source, status_interval=1.0, connect_timeout=10.0):
+        """
+        :param source: SignalInput to run.  Must not be connected yet, and must be picklable on platforms that spawn
+            rather than fork processes (Windows, macOS)
+        :param status_interval: seconds between status messages (and get_data calls) in the child process
+        :param connect_timeout: seconds to wait for the source to connect
+        """
+        super(ProcessInput, self).__init__()
+        self.source = source
+        self.name = type(source).__name__
+        self.num_channels = source.num_channels
+        self.num_samples = source.num_samples
+        self.newest_first = source.newest_first
+        self.status_interval = status_interval
+        self.connect_timeout = connect_timeout
+
+        self.process = None
+        self._conn = None
+        self.status_msg = '{}: Not Connected'.format(self.name)
+
+    def connect(self):
+        if self.process is not None:
+            return
+
+        # The buffer matches the source's own buffer, or the default buffer for its sample and channel count
+        buffer = self.source._buffer
+        if buffer is None:
+            self._buffer = SharedRingBuffer(self.num_samples, self.num_channels)
+        else:
+            self._buffer = SharedRingBuffer(buffer.num_samples, buffer.num_channels, buffer.data.dtype,
+                                            buffer.capacity)
+
+        self._conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=run_source, args=(self.source, self._buffer.spec(), child_conn, self.status_interval),
+            name=self.name, daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        # wait for the source to connect
+        if not self._conn.poll(self.connect_timeout):
+            logger.error('{} did not connect in {}s'.format(self.name, self.connect_timeout))
+            return
+        self.__receive()
+
+    def __receive(self):
+        # Handle messages from the child process
+        while self._conn.poll():
+            try:
+                msg_type, value = self._conn.recv()
+            except (EOFError, OSError):
+                self.status_msg = '{}: Process Stopped'.format(self.name)
+                return
+            if msg_type == 'error':
+                logger.error('{} process error: {}'.format(self.name, value))
+                self.status_msg = '{}: Error'.format(self.name)
+            elif msg_type == 'status':
+                self.status_msg = value
+
+    def get_data(self):
+        """ Return the latest num_samples samples (a view of shared memory) in the source's sample order """
+        data = self.read_latest(self.num_samples)[0]
+        return data if self.newest_first else data[::-1]
+
+    def get_status_msg(self):
+        self.__receive()
+        return self.status_msg
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self._conn.send('close')
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5.0)
+        if self.process.is_alive():
+            logger.warning('Terminating {} process'.format(self.name))
+            self.process.terminate()
+        self._conn.close()
+        self.process = None
+        self._buffer.close()
+
+
+def run_source(source, buffer_spec, conn, status_interval=1.0):
+    """
+    Child process: connect a source writing to a shared buffer, and run it until the parent closes it
+
+    :param source: SignalInput, not yet connected
+    :param buffer_spec: SharedRingBuffer.spec() of the buffer created by the parent
+    :param conn: connection to the parent process
+    :param status_interval: seconds between status messages
+    """
+    buffer = SharedRingBuffer(**buffer_spec)
+
+    def shared_buffer(num_samples, num_channels, dtype=np.double, capacity=None):
+        # the source writes to the parent's shared buffer instead of allocating its own.  The buffer was sized before
+        # the source was connected, so it must hold at least as many samples as the source asks for now
+        capacity = max(capacity or 2 * num_samples, num_samples, 1)
+        if (num_channels != buffer.num_channels or np.dtype(dtype) != buffer.data.dtype
+                or capacity > buffer.capacity):
+            raise ValueError('Source buffer of {} samples x {} channels ({}) does not fit the shared buffer of {} '
+                             'samples x {} channels ({})'.format(
+                                 capacity, num_channels, np.dtype(dtype),
+                                 buffer.capacity, buffer.num_channels, buffer.data.dtype))
+        return buffer
+
+    source.buffer_factory = shared_buffer
+    if source._buffer is not None:
+        source._buffer = buffer
+    try:
+        source.connect()
+        conn.send(('status', 'Connected'))
+        while True:
+            if conn.poll(status_interval) and conn.recv() == 'close':
+                break
+            # drivers such as CpchSerial (re)start streaming when data is read
+            source.get_data()
+            if hasattr(source, 'get_status_msg'):
+                conn.send(('status', source.get_status_msg()))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception as e:
+        logger.exception('Error in {} process'.format(type(source).__name__))
+        try:
+            conn.send(('error', repr(e)))
+        except OSError:
+            pass
+    finally:
+        source.close()
+        buffer.close()
+        conn.close()
+
+
+def test_process_input():
+    # Compare reads from a source running in a child process against the samples it wrote
+    # test with: python3 -c "from inputs.process_input import *; test_process_input()"
+    import time
+    from inputs.replay_input import ReplayInput
+
+    fs, num_channels = 1000, 16
+    data = np.random.default_rng(0).normal(0, 1, (3 * fs, num_channels))
+    src = ProcessInput(ReplayInput(data, sample_rate=fs, num_samples=150), status_interval=0.02)
+    src.connect()
+
+    time.sleep(3.5)  # until the whole recording is written
+    print(src.get_status_msg())
+    window = src.get_data()
+    sequence = src.sequence
+    # newest first, so row 0 is the last sample written
+    print('Read {} samples, window matches recording: {}'.format(
+        sequence, np.array_equal(window, data[sequence - 150:sequence][::-1])))
+
+    n = 10000
+    t = time.perf_counter()
+    for _ in range(n):
+        src.get_data()
+    print('get_data: {:.2f} us'.format((time.perf_counter() - t) / n * 1e6))
+    src.close()
+    print('Process closed: {}'.format(src.process is None))
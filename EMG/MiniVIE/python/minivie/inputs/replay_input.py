@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Signal input that plays back a recorded session
+
+Samples are released into the shared buffer as the clock passes their recorded timestamps, so the scenario sees the
+same data it would have seen live.  With a virtual clock (see interface.replay) a session can be replayed
+deterministically and much faster than real time.
+
+Recordings can be numpy arrays, csv files (e.g. EMG_data_*.csv with a time column followed by one column per
+channel) or hdf5 files written by utilities.stream_logger.
+
+Usage:
+    from inputs.replay_input import ReplayInput
+    src = ReplayInput.from_csv('EMG_data_20230622_003542.csv', sample_rate=200, clock=clock.now)
+    src.connect()
+    data = src.get_data()
+
+"""
+import csv
+import time
+
+import h5py
+import numpy as np
+
+from inputs.signal_input import SignalInput
+
+
+class ReplayInput(SignalInput):
+    """
+    Class for playing back recorded EMG (and optionally IMU) data
+    """
+
+    def __init__(self, data, sample_rate=200.0, timestamps=None, imu=None, num_samples=50, clock=time.monotonic,
+                 name='Replay'):
+        """
+        :param data: recorded samples [nSamples, nChannels], oldest first
+        :param sample_rate: sample rate in Hz, used if timestamps aren't given
+        :param timestamps: time of each sample in seconds from the start of the recording [nSamples]
+        :param imu: optional imu samples [nSamples, 10] with columns quat (4), accel (3), gyro (3)
+        :param num_samples: number of samples returned by get_data
+        :param clock: function returning the current time in seconds.  Playback starts at the time of connect()
+        :param name: name used in the status message
+        """
+        super(ReplayInput, self).__init__()
+        self.data = np.atleast_2d(np.asarray(data, dtype=float))
+        if timestamps is None:
+            timestamps = np.arange(len(self.data)) / float(sample_rate)
+        self.timestamps = np.asarray(timestamps, dtype=float)
+        self.imu = None if imu is None else np.atleast_2d(np.asarray(imu, dtype=float))
+        self.num_samples = num_samples
+        self.num_channels = self.data.shape[1]
+        self.clock = clock
+        self.name = name
+
+        self.start_time = None
+        self.next_sample = 0  # index of the next sample to release
+
+    @classmethod
+    def from_csv(cls, filename, sample_rate=None, **kwargs):
+        """
+        Load a csv recording with a header row, a time column (seconds or HH:MM:SS.fff) and one column per channel
+
+        :param filename: csv file
+        :param sample_rate: if given, samples are replayed at this rate instead of the recorded times
+        """
+        times = []
+        rows = []
+        with open(filename, 'rt') as f:
+            reader = csv.reader(f)
+            next(reader)  # header
+            for row in reader:
+                if not row:
+                    continue
+                times.append(row[0])
+                rows.append([float(val) for val in row[1:]])
+        if sample_rate is None:
+            kwargs['timestamps'] = _parse_times(times)
+        else:
+            kwargs['sample_rate'] = sample_rate
+        return cls(np.array(rows), **kwargs)
+
+    @classmethod
+    def from_hdf5(cls, filename, num_channels, sample_rate, dataset='data', **kwargs):
+        """
+        Load samples logged with utilities.stream_logger (or any hdf5 dataset of interleaved samples)
+
+        :param filename: hdf5 file
+        :param num_channels: number of channels per sample
+        :param sample_rate: sample rate in Hz
+        :param dataset: name of the dataset holding the samples
+        """
+        with h5py.File(filename, 'r') as h5:
+            data = h5[dataset][()]
+        num_whole = len(data) // num_channels * num_channels
+        return cls(data[:num_whole].reshape(-1, num_channels), sample_rate=sample_rate, **kwargs)
+
+    def connect(self):
+        self.init_buffer(self.num_samples, self.num_channels)
+        self.start_time = self.clock()
+        self.next_sample = 0
+
+    @property
+    def finished(self):
+        """ True once every recorded sample has been released """
+        return self.next_sample >= len(self.data)
+
+    @property
+    def duration(self):
+        """ Length of the recording in seconds """
+        return self.timestamps[-1] - self.timestamps[0] if len(self.timestamps) else 0.0
+
+    def update(self):
+        """ Release the samples recorded up to the current time into the buffer """
+        if self.start_time is None:
+            self.connect()
+        elapsed = self.clock() - self.start_time + self.timestamps[0]
+        end = int(np.searchsorted(self.timestamps, elapsed, side='right'))
+        if end > self.next_sample:
+            self.write(self.data[self.next_sample:end], self.timestamps[self.next_sample:end])
+            self.next_sample = end
+
+    def get_data(self):
+        """ Return the latest num_samples samples, newest first """
+        self.update()
+        return self.read_latest(self.num_samples)[0]
+
+    def get_imu(self):
+        # latest recorded imu sample, or NaN if the recording has none
+        if self.imu is None or self.next_sample == 0:
+            imu = np.full(10, np.nan)
+        else:
+            imu = self.imu[self.next_sample - 1]
+        return {'quat': imu[0:4], 'accel': imu[4:7], 'gyro': imu[7:10]}
+
+    def get_status_msg(self):
+        return '{}: {:.0f}%'.format(self.name, 100.0 * self.next_sample / max(len(self.data), 1))
+
+    def close(self):
+        pass
+
+
+def _parse_times(times):
+    # Convert a column of times (seconds, or clock times HH:MM:SS.fff) to seconds from the first sample
+    try:
+        seconds = np.array([float(t) for t in times])
+    except ValueError:
+        seconds = []
+        for t in times:
+            h, m, s = t.split(':')
+            seconds.append(int(h) * 3600 + int(m) * 60 + float(s))
+        seconds = np.unwrap(np.array(seconds), period=86400)  # handle recordings that pass midnight
+    return seconds - seconds[0]
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""
+Streaming filters for signal inputs
+
+Filters are applied once to each block of new samples as it is written into a source's buffer, so reading the buffer
+needs no further processing.  Each stage keeps its own filter state between blocks, so the output is identical to
+filtering the whole recording at once with the equivalent causal filter.
+
+Typical usage would be as follows:
+
+    from inputs import signal_filter
+    src.filter_chain = signal_filter.FilterChain([signal_filter.HighPass(20, 3, fs=1000),
+                                                  signal_filter.Notch(60, fs=1000),
+                                                  signal_filter.Rectify()])
+
+"""
+import logging
+
+import numpy as np
+from scipy import signal
+
+from utilities.user_config import get_user_config_var
+
+logger = logging.getLogger(__name__)
+
+
+class FilterStage(object):
+    """
+    Base class for a streaming filter stage
+
+    Stages receive blocks [nSamples, nChannels] ordered oldest to newest and return a filtered block of the same
+    shape
+    """
+
+    def apply(self, block):
+        return block
+
+    def reset(self):
+        pass
+
+
+class SosFilter(FilterStage):
+    """ Causal IIR filter in second order sections with state carried from one block to the next """
+
+    def __init__(self, sos):
+        super(SosFilter, self).__init__()
+        self.sos = sos
+        self.zi = None
+
+    def apply(self, block):
+        if self.zi is None or self.zi.shape[2] != block.shape[1]:
+            # start from the steady state for the first sample to avoid a step transient
+            self.zi = signal.sosfilt_zi(self.sos)[:, :, np.newaxis] * block[0]
+        filtered, self.zi = signal.sosfilt(self.sos, block, axis=0, zi=self.zi)
+        return filtered
+
+    def reset(self):
+        self.zi = None
+
+
+class HighPass(SosFilter):
+    """ Butterworth high pass filter """
+
+    def __init__(self, cutoff=20.0, order=3, fs=1000.0):
+        """
+        :param cutoff: break frequency in Hz
+        :param order: filter order
+        :param fs: sample frequency in Hz
+        """
+        super(HighPass, self).__init__(signal.butter(order, cutoff, btype='highpass', output='sos', fs=fs))
+
+
+class Notch(SosFilter):
+    """ Notch filter to remove power line interference """
+
+    def __init__(self, frequency=60.0, quality=30.0, fs=1000.0):
+        """
+        :param frequency: center frequency in Hz (e.g. 50 or 60)
+        :param quality: quality factor, center frequency / bandwidth
+        :param fs: sample frequency in Hz
+        """
+        b, a = signal.iirnotch(frequency, quality, fs=fs)
+        super(Notch, self).__init__(signal.tf2sos(b, a))
+
+
+class Rectify(FilterStage):
+    """ Full wave rectification """
+
+    def apply(self, block):
+        return np.abs(block)
+
+
+class FilterChain(object):
+    """ Ordered list of filter stages applied to each new block of samples """
+
+    def __init__(self, stages=None):
+        self.stages = list(stages or [])
+
+    def add(self, stage):
+        self.stages.append(stage)
+        return self
+
+    def apply(self, block):
+        """
+        Filter a block of new samples
+
+        :param block: array-like [nSamples, nChannels] ordered oldest to newest.  A 1-D block is a single sample
+        :return: filtered block [nSamples, nChannels]
+        """
+        block = np.atleast_2d(np.asarray(block, dtype=float))
+        for stage in self.stages:
+            block = stage.apply(block)
+        return block
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+
+
+def get_filter_chain(section, fs, highpass_cutoff=0.0, notch_frequency=0.0, rectify=False):
+    """
+    Build a filter chain from the user config
+
+    Reads <section>.highpass_cutoff, <section>.highpass_order, <section>.notch_frequency and <section>.rectify.  A
+    cutoff or notch frequency of 0 disables that stage.
+
+    :param section: user config section, e.g. 'CpchSerial'
+    :param fs: sample frequency of the source in Hz
+    :param highpass_cutoff: default high pass break frequency in Hz
+    :param notch_frequency: default notch frequency in Hz
+    :param rectify: default rectification setting
+    :return: FilterChain, or None if no stages are enabled
+    """
+    chain = FilterChain()
+    highpass_cutoff = get_user_config_var(section + '.highpass_cutoff', float(highpass_cutoff))
+    if highpass_cutoff > 0:
+        chain.add(HighPass(highpass_cutoff, get_user_config_var(section + '.highpass_order', 3), fs))
+    notch_frequency = get_user_config_var(section + '.notch_frequency', float(notch_frequency))
+    if notch_frequency > 0:
+        chain.add(Notch(notch_frequency, fs=fs))
+    if get_user_config_var(section + '.rectify', rectify):
+        chain.add(Rectify())
+
+    if not chain.stages:
+        return None
+    logger.info('{} filter chain: {}'.format(section, [type(stage).__name__ for stage in chain.stages]))
+    return chain
@@ -7,15 +7,124 @@ Will define minimum methods that must be overloaded
 for each child to maintain proper functionality with
 minivie.
 
+Sources also share a common sample buffer (RingBuffer).  A driver calls init_buffer() once the channel and sample
+counts are known, hands each block of new samples to write() as they arrive, and serves get_data() from read_latest().
+If a filter_chain (see signal_filter) is set, new samples are filtered once as they are written.
+
 @author: Connor Pyles
 """
 
+import threading
+import time
 from abc import ABCMeta, abstractmethod
 
+import numpy as np
+
+
+class RingBuffer(object):
+    """
+    Typed circular sample buffer with a timestamp and a sequence number for every sample
+
+    Samples are stored newest first.  Each sample is written twice, capacity rows apart, so any run of up to capacity
+    consecutive samples is a contiguous block of memory and can be returned as a view rather than a copy.  Nothing is
+    shifted as samples arrive.
+
+    Views are not locked against the writer.  A view of the latest n samples stays valid until another capacity - n
+    samples have been written, which is why capacity defaults to twice the window size.  Callers that keep data
+    around longer than that should copy it.
+    """
+
+    def __init__(self, num_samples, num_channels, dtype=np.double, capacity=None):
+        """
+        :param num_samples: default number of samples returned by read_latest
+        :param num_channels: number of channels (columns) per sample
+        :param dtype: numpy data type of the samples
+        :param capacity: number of samples retained.  Defaults to 2*num_samples
+        """
+        self.num_samples = num_samples
+        self.num_channels = num_channels
+        self.capacity = max(capacity or 2 * num_samples, num_samples, 1)
+
+        self.data = np.zeros((2 * self.capacity, num_channels), dtype=dtype)
+        self.timestamps = np.zeros(2 * self.capacity)
+        self.sequence = 0  # total samples written.  The newest sample has sequence number (self.sequence - 1)
+        self.lock = threading.Lock()
+
+    def _row(self, sequence):
+        # Row of the first copy of the sample with the given sequence number
+        return -(sequence + 1) % self.capacity
+
+    def write(self, block, timestamp=None):
+        """
+        Append a block of samples
+
+        :param block: array-like [nSamples, nChannels] ordered oldest to newest.  A 1-D block is a single sample
+        :param timestamp: receive time of each sample, either one value for the whole block or one per sample.
+            Defaults to time.time()
+        :return: sequence number of the newest sample written
+        """
+        block = np.asarray(block, dtype=self.data.dtype).reshape(-1, self.num_channels)
+        if timestamp is None:
+            timestamp = time.time()
+        timestamp = np.broadcast_to(np.asarray(timestamp, dtype=float), block.shape[:1])
+
+        num_new = block.shape[0]
+        if num_new > self.capacity:
+            # only the newest capacity samples survive
+            block = block[-self.capacity:]
+            timestamp = timestamp[-self.capacity:]
+
+        with self.lock:
+            first = self.sequence + num_new - block.shape[0]
+            rows = self._row(first + np.arange(block.shape[0]))
+            for offset in (0, self.capacity):
+                self.data[rows + offset] = block
+                self.timestamps[rows + offset] = timestamp
+            self.sequence += num_new
+            return self.sequence - 1
+
+    def read_latest(self, n=None):
+        """
+        Return the most recent samples
+
+        :param n: number of samples.  Defaults to num_samples
+        :return: (data [n, nChannels], timestamps [n]) views, newest sample first
+        """
+        n = self.num_samples if n is None else min(n, self.capacity)
+        with self.lock:
+            start = self._row(self.sequence - 1)
+        return self.data[start:start + n], self.timestamps[start:start + n]
+
+    def read_since(self, sequence):
+        """
+        Return every sample written since a given point in the stream
+
+        Pass the returned sequence number back in on the next call to receive the following samples.  If more than
+        capacity samples arrived in between, only the newest capacity samples are returned.
+
+        :param sequence: sequence number of the first sample wanted (e.g. the value returned by the previous call)
+        :return: (data [n, nChannels], timestamps [n], sequence) where data and timestamps are views, newest sample
+            first, and sequence is the number to pass to the next call
+        """
+        with self.lock:
+            end = self.sequence
+        n = min(max(end - sequence, 0), self.capacity)
+        start = self._row(end - 1)
+        return self.data[start:start + n], self.timestamps[start:start + n], end
+
 
 class SignalInput(object):
     __metaclass__ = ABCMeta
 
+    # shared sample buffer, created by init_buffer
+    _buffer = None
+    # function creating the sample buffer, called by init_buffer with the RingBuffer parameters
+    buffer_factory = RingBuffer
+    # order of the samples returned by get_data
+    newest_first = True
+    # optional signal_filter.FilterChain applied to each block of new samples before it is buffered
+    filter_chain = None
+
     def __init__(self):
         pass
 
@@ -31,3 +140,26 @@ class SignalInput(object):
     @abstractmethod
     def close(self):
         pass
+
+    def init_buffer(self, num_samples, num_channels, dtype=np.double, capacity=None):
+        """ Allocate the shared sample buffer.  See RingBuffer for parameters """
+        self._buffer = self.buffer_factory(num_samples, num_channels, dtype=dtype, capacity=capacity)
+
+    def write(self, block, timestamp=None):
+        """ Append a block of samples [nSamples, nChannels] ordered oldest to newest """
+        if self.filter_chain is not None:
+            block = self.filter_chain.apply(block)
+        return self._buffer.write(block, timestamp)
+
+    def read_latest(self, n=None):
+        """ Return (data, timestamps) views of the latest n samples, newest first """
+        return self._buffer.read_latest(n)
+
+    def read_since(self, sequence):
+        """ Return (data, timestamps, sequence) with the samples written since sequence, newest first """
+        return self._buffer.read_since(sequence)
+
+    @property
+    def sequence(self):
+        """ Total number of samples written to the buffer """
+        return self._buffer.sequence
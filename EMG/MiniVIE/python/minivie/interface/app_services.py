@@ -25,7 +25,7 @@ message_history = {'sys_status': '', 'output_class': '', 'training_class': '',
                    'motion_test_status': '', 'motion_test_setup': '', 'motion_test_update': '',
                    'TAC_status': '', 'TAC_setup': '', 'TAC_update': '',
                    'joint_cmd': '', 'joint_pos': '', 'joint_torque': '', 'joint_temp': '',
-                   'strNormalizeMyoPosition': '', 'strNormalizeMyoPositionImage': ''}
+                   'strNormalizeMyoPosition': '', 'strNormalizeMyoPositionImage': '', 'timing_stats': ''}
 
 
 class WSHandler(tornado.websocket.WebSocketHandler):
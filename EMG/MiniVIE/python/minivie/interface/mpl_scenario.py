@@ -1,13 +1,15 @@
 import logging
 import time
 import numpy as np
-from collections import Counter, deque
 
 import pattern_rec.classifier
 import pattern_rec.feature_extract
+import pattern_rec.majority_vote
 import pattern_rec.training_data
 import utilities
+import utilities.scheduler
 import utilities.sys_cmd
+from utilities import instrumentation
 from utilities.user_config import get_user_config_var, read_user_config_file
 import mpl
 import controls.plant
@@ -45,11 +47,20 @@ class MplScenario(object):
 
         # Debug socket for streaming Features
         self.DebugSock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.debug_stream = get_user_config_var('MPL.debug_stream', True)
         self.last_features = None
 
         # Loop control parameters
         self.loop_time = time.strftime("%c")  # store the system time for timing status messages
         self.loop_dt_last = 0.0  # store the duration of the last execution loop for monitoring processor load
+        # Runs the control loop on fixed deadlines and records loop jitter and the time taken by each stage.  On
+        # overrun, either 'skip' missed steps or 'catchup' by running them back to back
+        self.scheduler = utilities.scheduler.FixedRateScheduler(
+            0.02, overrun=get_user_config_var('MPL.loop_overrun', 'skip'))
+        # Timing probes around each stage of the loop, see utilities.instrumentation.  The scheduler reports the
+        # probe histograms as its stage timing
+        instrumentation.enabled = get_user_config_var('MPL.enable_probes', True)
+        self.scheduler.stages = instrumentation.get_histograms(['features', 'classify', 'plant', 'sink', 'interface'])
         self.loop_counter = 0  # count the number of loops to distribute messaging rate
 
         # Training parameters
@@ -62,8 +73,12 @@ class MplScenario(object):
         self.num_channels = 0
         self.auto_open = False  # Automatically open hand if in rest state
 
-        # Create a buffer for storing recent class decisions for majority voting
-        self.decision_buffer = deque([], get_user_config_var('PatternRec.num_majority_votes', 25))
+        # Majority vote over recent class decisions.  Votes can be weighted by the classifier confidence and decayed
+        # so recent decisions count more (1.0 is no decay)
+        self.decision_vote = pattern_rec.majority_vote.MajorityVote(
+            get_user_config_var('PatternRec.num_majority_votes', 25),
+            decay=get_user_config_var('PatternRec.vote_decay', 1.0))
+        self.weighted_vote = get_user_config_var('PatternRec.weighted_vote', False)
         self.last_decision = None
 
         self.output = None  # Will contain latest status message
@@ -135,10 +150,12 @@ class MplScenario(object):
             for i in range(0, len(self.Plant.joint_position)):
                 self.Plant.joint_position[i] = self.DataSink.position['last_percept'][i]
 
+        self.scheduler.dt = dt
+        self.scheduler.start()
         while self.loop_counter < loop_counter:
             try:
-                # Fixed rate loop.  get start time, run model, get end time; delay for duration
-                time_begin = time.perf_counter()
+                # Fixed rate loop.  Run model, then delay until the next step deadline
+                self.scheduler.begin()
 
                 # Run the actual model
                 self.update()
@@ -146,16 +163,8 @@ class MplScenario(object):
                 self.update_interface()
                 self.loop_counter += 1
                 #print(self.loop_counter)
-                time_end = time.perf_counter()
-                time_elapsed = time_end - time_begin
+                time_elapsed = self.scheduler.wait()
                 self.loop_dt_last = time_elapsed
-                if dt > time_elapsed:
-                    time.sleep(dt - time_elapsed)
-                    # await asyncio.sleep(dt - time_elapsed)
-                else:
-                    logging.warning("Timing Overload: {}".format(time_elapsed))
-                    # await asyncio.sleep(0.001)
-                    pass
 
                 # print('{0} dt={1:6.3f}'.format(output['decision'],time_elapsed))
 
@@ -165,6 +174,8 @@ class MplScenario(object):
         print("")
         print("Last time_elapsed was: ", time_elapsed)
         print("")
+        print(self.scheduler.get_stage_table())
+        print("")
         print("Cleaning up...")
         print("")
 
@@ -173,6 +184,7 @@ class MplScenario(object):
         print("")
         sys.exit(0)
 
+    @instrumentation.probe('update')
     def update(self):
         """
         Perform forward classification and return a dictionary with status information
@@ -202,7 +214,8 @@ class MplScenario(object):
             # transmit output
             if self.DataSink is not None:
                 # self.Plant.joint_velocity[mpl.JointEnum.MIDDLE_MCP] = self.Plant.grasp_velocity
-                self.DataSink.send_joint_angles(self.Plant.joint_position, self.Plant.joint_velocity)
+                with instrumentation.probe('sink'):
+                    self.DataSink.send_joint_angles(self.Plant.joint_position, self.Plant.joint_velocity)
 
                 # # Adding a hidden feature here to (re-send) commands to the ghost arms while manual control is on.
                 # # At some point this should be on a Unity-specific configuration page
@@ -225,11 +238,10 @@ class MplScenario(object):
         self.output['features'], f, imu, rot_mat = self.FeatureExtract.get_features(self.SignalSource)
 
         # Debug stream:
-        if True:
+        if self.debug_stream:
             values = self.output['features']
             #print(self.output['features'])
-            packer = struct.Struct('64f') # 16 ch times 4 features
-            #packer = struct.Struct('32f')
+            packer = struct.Struct('{}f'.format(len(values)))  # e.g. 16 ch times 4 features
             packed_data = packer.pack(*values)
             self.DebugSock.sendto(packed_data, ('127.0.0.1', 23456))
 
@@ -244,11 +256,11 @@ class MplScenario(object):
         # if simultaneously training the system, add the current results to the data buffer
         if self.add_data and f.any():
             self.TrainingData.add_data(self.output['features'], self.training_id, self.training_motion, imu)
+            self.SignalClassifier.add_sample(self.output['features'], self.training_id)
 
         # save out training data if auto_save is on, data just finished being added
         if self.auto_save and self.add_data_last and not self.add_data:
-            self.TrainingData.delete()  # Let's delete, so we have a clean file to write to
-            self.TrainingData.save()
+            self.TrainingData.save_async()  # new samples are appended on a background thread
         # track previous add_data state
         self.add_data_last = self.add_data
 
@@ -258,14 +270,14 @@ class MplScenario(object):
             return
 
         # perform majority vote
-        # Note Counter used here instead of statistics.mode since that will raise error if equal frequency of values,
-        # which can happen even if the buffer length is odd
-        self.decision_buffer.append(decision_id)
-        counter = Counter(self.decision_buffer)
+        weight = 1.0
+        if self.weighted_vote and self.SignalClassifier.confidence is not None:
+            weight = self.SignalClassifier.confidence
+        vote_id = self.decision_vote.update(decision_id, weight, self.scheduler.clock())
 
         if self.TrainingData.motion_names[decision_id] != 'No Movement':
             # Immediately stop if class is no movement, otherwise use majority vote
-            decision_id = counter.most_common(1)[0][0]
+            decision_id = vote_id
 
         # get decision name
         class_decision = self.TrainingData.motion_names[decision_id]
@@ -320,10 +332,12 @@ class MplScenario(object):
         # transmit output
         if self.DataSink is not None:
             # self.Plant.joint_velocity[mpl.JointEnum.MIDDLE_MCP] = self.Plant.grasp_velocity
-            self.DataSink.send_joint_angles(self.Plant.joint_position, self.Plant.joint_velocity)
+            with instrumentation.probe('sink'):
+                self.DataSink.send_joint_angles(self.Plant.joint_position, self.Plant.joint_velocity)
 
         return
 
+    @instrumentation.probe('interface')
     def update_interface(self):
         # send gui updates
 
@@ -336,13 +350,16 @@ class MplScenario(object):
             self.loop_time = current_time
             msg = '<br>' + self.DataSink.get_status_msg()  # Limb Status
             msg += ' ' + self.output['status']  # Classifier Status
+            msg += ' ' + self.decision_vote.get_status_msg()
             for src in self.SignalSource:
                 msg += '<br>' + src.get_status_msg()
             msg += '<br>' + 'Step Time: {:.0f}'.format(self.loop_dt_last * 1000) + 'ms'
+            msg += '<br>' + self.scheduler.get_status_msg()
             msg += '<br>' + time.strftime("%c")
 
             # Forward status message (voltage, temp, etc) to mobile app
             self.TrainingInterface.send_message("sys_status", msg)
+            self.TrainingInterface.send_message("timing_stats", instrumentation.get_status_msg())
 
             '''
                 Screen time logging (checking new and closed connections)
@@ -537,12 +554,14 @@ class MplScenario(object):
             self.attach_source(src)
 
         elif input_device == 'cpch':
-            from inputs import cpch_serial
+            from inputs import cpch_serial, signal_filter
             port = get_user_config_var('CpchSerial.port', 'COM1')
             diff_analog_channel = get_user_config_var('CpchSerial.diff_analog_channel', 0xFFFF)
             se_analog_channel = get_user_config_var('CpchSerial.se_analog_channel', 0xFFFF)
             src = cpch_serial.CpchSerial(port=port, bioamp_mask=diff_analog_channel, gpi_mask=se_analog_channel)
             src.num_samples = get_user_config_var('CpchSerial.num_samples', 150)
+            src.filter_chain = signal_filter.get_filter_chain('CpchSerial', src.sample_frequency,
+                                                              highpass_cutoff=20.0)
             self.attach_source(src)
 
         elif input_device == 'ctrl':
@@ -558,7 +577,7 @@ class MplScenario(object):
         # Configure Training Data Manager
         ################################################
         self.TrainingData = pattern_rec.training_data.TrainingData()
-        self.TrainingData.load()
+        self.TrainingData.load(lazy=get_user_config_var('TrainingData.lazy_load', True))
         self.TrainingData.num_channels = self.num_channels
 
         ################################################
@@ -571,6 +590,7 @@ class MplScenario(object):
 
         # Classifier parameters
         self.SignalClassifier = pattern_rec.classifier.Classifier(self.TrainingData)
+        self.SignalClassifier.compute_confidence = self.weighted_vote
         self.SignalClassifier.fit()
 
         ################################################
@@ -677,6 +697,16 @@ class MplScenario(object):
     def attach_source(self, input_source):
         # Pass in a list of signal sources and they will be added to the scenario
 
+        # Optionally run each source's reader and decoder in its own process, sharing samples through shared memory.
+        # IMU data is not shared, so this is only for sources used for EMG
+        if get_user_config_var('SignalInput.separate_process', False):
+            from inputs.process_input import ProcessInput, can_run_in_process
+            ok, reason = can_run_in_process(input_source)
+            if ok:
+                input_source = ProcessInput(input_source)
+            else:
+                logging.warning('Running {} in-process: it {}'.format(type(input_source).__name__, reason))
+
         self.SignalSource.append(input_source)
 
         input_source.connect()
@@ -828,10 +858,12 @@ class MplScenario(object):
                 self.add_data = True
             elif cmd_data == 'Stop':
                 self.add_data = False
-                self.SignalClassifier.fit()
+                if not self.SignalClassifier.online:
+                    # an online classifier is already up to date
+                    self.SignalClassifier.fit()
             elif cmd_data == 'ClearClass':
                 self.TrainingData.clear(self.training_id)
-                self.SignalClassifier.fit()
+                self.SignalClassifier.clear_class(self.training_id)
             elif cmd_data == 'ClearAll':
                 self.TrainingData.reset()
                 self.SignalClassifier.fit()
@@ -842,6 +874,9 @@ class MplScenario(object):
                 self.TrainingData.save()
             elif cmd_data == 'Backup':
                 self.TrainingData.copy()
+            elif cmd_data == 'DumpTrace':
+                # write the probe call stacks for a flame graph
+                instrumentation.dump_folded(time.strftime('TIMING_TRACE_%Y-%m-%d_%H-%M-%S.folded'))
 
             elif cmd_data == 'AutoSaveOn':
                 self.auto_save = True
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Headless replay of a recorded session through MplScenario
+
+A recorded session (inputs.replay_input.ReplayInput) is fed through the full feature extraction, classification,
+majority vote and plant pipeline of MplScenario, with every joint command recorded by mpl.capture_sink.CaptureSink.
+The loop runs on a virtual clock, so scheduler sleeps advance time instantly instead of waiting.  A 30 minute session
+replays in seconds, and the same recording and events always give the same decisions, so replays can be used for
+latency / throughput benchmarks and to regression test classifier changes.
+
+Training can be scripted with timed scenario commands, exactly as sent by the app:
+    events = [(1.0, 'Cls:No Movement'), (1.0, 'Cmd:Add'), (5.0, 'Cmd:Stop'),
+              (6.0, 'Cls:Hand Open'), (6.0, 'Cmd:Add'), (10.0, 'Cmd:Stop')]
+
+Usage:
+    from interface.replay import VirtualClock, build_scenario, run_replay
+    clock = VirtualClock()
+    src = ReplayInput.from_csv('EMG_data_20230622_003542.csv', sample_rate=200, clock=clock.now)
+    scenario = build_scenario(src, clock, roc_filename='mpl/#VMPL_ROC.xml')
+    result = run_replay(scenario, events=events)
+    print(result['decision'], result['wall_time'])
+
+"""
+import logging
+import time
+
+import numpy as np
+
+import pattern_rec.classifier
+import pattern_rec.feature_extract
+import pattern_rec.training_data
+import utilities.scheduler
+from controls.plant import Plant
+from interface.mpl_scenario import MplScenario
+from mpl.capture_sink import CaptureSink
+from pattern_rec import features_selected
+from utilities.user_config import get_user_config_var
+
+logger = logging.getLogger(__name__)
+
+
+class VirtualClock(object):
+    """ Clock whose time only moves when sleep() is called """
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.time += seconds
+
+
+def build_scenario(sources, clock, training_data=None, roc_filename=None, dt=None):
+    """
+    Create an MplScenario reading from recorded sources and writing to a CaptureSink, without any network interfaces
+
+    :param sources: ReplayInput, or list of them, reading time from clock.now
+    :param clock: VirtualClock driving the loop
+    :param training_data: TrainingData to start with.  Default is an empty set (nothing is loaded or saved)
+    :param roc_filename: ROC table for the plant.  Default is the MPL.roc_table config value
+    :param dt: loop period, seconds.  Default is the timestep config value
+    :return: MplScenario ready for run_replay
+    """
+    if not isinstance(sources, (list, tuple)):
+        sources = [sources]
+    if roc_filename is None:
+        roc_filename = get_user_config_var('MPL.roc_table', 'mpl/#VMPL_ROC.xml')
+    if dt is None:
+        dt = get_user_config_var('timestep', 0.02)
+
+    scenario = MplScenario()
+    scenario.debug_stream = False
+    scenario.auto_save = False
+    scheduler = utilities.scheduler.FixedRateScheduler(dt, overrun='catchup', clock=clock.now, sleep=clock.sleep)
+    scheduler.stages = scenario.scheduler.stages  # stage timing from the instrumentation probes (wall clock)
+    scenario.scheduler = scheduler
+    for src in sources:
+        scenario.attach_source(src)
+
+    if training_data is None:
+        training_data = pattern_rec.training_data.TrainingData()
+    scenario.TrainingData = training_data
+    scenario.TrainingData.num_channels = scenario.num_channels
+
+    scenario.FeatureExtract = pattern_rec.feature_extract.FeatureExtract(get_user_config_var('Features.scale', 0.01))
+    features_selected.FeaturesSelected(scenario.FeatureExtract).create_instance_list(scenario.num_channels)
+
+    scenario.SignalClassifier = pattern_rec.classifier.Classifier(scenario.TrainingData)
+    scenario.SignalClassifier.compute_confidence = scenario.weighted_vote
+    scenario.SignalClassifier.fit()
+
+    scenario.Plant = Plant(dt, roc_filename)
+    scenario.DataSink = CaptureSink(clock=clock.now)
+    return scenario
+
+
+def run_replay(scenario, duration=None, events=()):
+    """
+    Run the scenario loop until the recording ends (or for a fixed duration) on the scheduler's virtual clock
+
+    :param scenario: MplScenario from build_scenario
+    :param duration: seconds of session time to run.  Default runs until all sources are finished
+    :param events: list of (time, command string) pairs passed to scenario.command_string at that session time
+    :return: dict of per step arrays
+        'time'          session time of each step, seconds
+        'decision'      class decision name of each step ('None' if untrained)
+        'status'        scenario status of each step
+        'step_time'     wall clock time taken by each step, seconds
+        'wall_time'     total wall clock time of the replay, seconds
+        'speed'         session time divided by wall time
+    """
+    scheduler = scenario.scheduler
+    events = sorted(events, key=lambda event: event[0])
+    next_event = 0
+
+    times, decisions, status, step_time = [], [], [], []
+    wall_start = time.perf_counter()
+    scheduler.start()
+    start = scheduler.clock()
+    while True:
+        now = scheduler.clock() - start
+        if duration is None:
+            if all(getattr(s, 'finished', True) for s in scenario.SignalSource):
+                break
+        elif now >= duration:
+            break
+        while next_event < len(events) and events[next_event][0] <= now:
+            scenario.command_string(events[next_event][1])
+            next_event += 1
+
+        wall_step = time.perf_counter()
+        scheduler.begin()
+        scenario.update()
+        scenario.loop_counter += 1
+        step_time.append(time.perf_counter() - wall_step)
+
+        times.append(now)
+        decisions.append(scenario.output['decision'])
+        status.append(scenario.output['status'])
+        scheduler.wait()
+
+    wall_time = time.perf_counter() - wall_start
+    session_time = times[-1] if times else 0.0
+    logger.info('Replayed {:.1f}s in {:.2f}s'.format(session_time, wall_time))
+    return {'time': np.array(times), 'decision': decisions, 'status': status, 'step_time': np.array(step_time),
+            'wall_time': wall_time, 'speed': session_time / wall_time if wall_time else float('inf')}
+
+
+def decision_latency(times, decisions, label_times, labels):
+    """
+    Time from each change of the true class label until the decision first matches it
+
+    :param times: time of each decision
+    :param decisions: decision names
+    :param label_times: time of each label change
+    :param labels: class name from each label change onward
+    :return: latency of each label change, seconds (NaN if the decision never matched before the next change)
+    """
+    times = np.asarray(times)
+    decisions = np.asarray(decisions)
+    latency = np.full(len(labels), np.nan)
+    for i, (t, label) in enumerate(zip(label_times, labels)):
+        t_end = label_times[i + 1] if i + 1 < len(label_times) else np.inf
+        match = np.flatnonzero((times >= t) & (times < t_end) & (decisions == label))
+        if len(match):
+            latency[i] = times[match[0]] - t
+    return latency
+
+
+def test_replay(roc_filename='mpl/#VMPL_ROC.xml'):
+    # Replay a synthetic 2 class recording: train on the first half, then check decisions on the second
+    # test with: python3 -c "from interface.replay import *; test_replay()"
+    from inputs.replay_input import ReplayInput
+
+    rng = np.random.default_rng(0)
+    fs, num_channels, segment = 200, 8, 5.0
+    pattern = [('No Movement', 5.0), ('Hand Open', 60.0)] * 4
+    data = np.vstack([rng.normal(0, amplitude, (int(segment * fs), num_channels)) * np.arange(1, num_channels + 1)
+                      if name == 'Hand Open' else rng.normal(0, amplitude, (int(segment * fs), num_channels))
+                      for name, amplitude in pattern])
+    events = [(0.5, 'Cls:No Movement'), (0.5, 'Cmd:Add'), (4.5, 'Cmd:Stop'),
+              (5.5, 'Cls:Hand Open'), (5.5, 'Cmd:Add'), (9.5, 'Cmd:Stop')]
+
+    results = []
+    for _ in range(2):
+        clock = VirtualClock()
+        src = ReplayInput(data, sample_rate=fs, clock=clock.now)
+        scenario = build_scenario(src, clock, roc_filename=roc_filename)
+        results.append(run_replay(scenario, events=events))
+    result = results[0]
+
+    label_times = np.arange(len(pattern)) * segment
+    labels = [name for name, _ in pattern]
+    latency = decision_latency(result['time'], result['decision'], label_times[2:], labels[2:])
+    t, positions, _ = scenario.DataSink.as_arrays()
+    print('Replayed {:.0f}s in {:.2f}s ({:.0f}x real time), {} commands captured'.format(
+        result['time'][-1], result['wall_time'], result['speed'], len(t)))
+    print('Step time mean/max: {:.2f}/{:.2f}ms'.format(
+        result['step_time'].mean() * 1000, result['step_time'].max() * 1000))
+    print('Decision latency after training (s): {}'.format(np.round(latency, 2)))
+    print('Repeat replay decisions identical: {}'.format(results[0]['decision'] == results[1]['decision']))
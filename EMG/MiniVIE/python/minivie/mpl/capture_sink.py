@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Data sink that records every joint command instead of sending it to a limb
+
+Used for headless replay (interface.replay) and regression tests.  Percepts are reported as the last commanded
+position, as if the limb followed each command exactly.
+
+"""
+import time
+
+import numpy as np
+
+from mpl import JointEnum as MplId
+from mpl.data_sink import DataSink
+
+
+class CaptureSink(DataSink):
+    def __init__(self, clock=time.monotonic):
+        """
+        :param clock: function returning the current time in seconds, recorded with each command
+        """
+        super(CaptureSink, self).__init__()
+        self.clock = clock
+        self.position['last_percept'] = [0.0] * MplId.NUM_JOINTS
+        self.times = []
+        self.positions = []
+        self.velocities = []
+
+    def connect(self):
+        pass
+
+    def data_received(self):
+        return True
+
+    def get_status_msg(self):
+        return 'Capture: {} commands'.format(len(self.times))
+
+    def send_joint_angles(self, values, velocity=None):
+        self.times.append(self.clock())
+        self.positions.append(np.array(values, dtype=float))
+        self.velocities.append(np.zeros(len(values)) if velocity is None else np.array(velocity, dtype=float))
+        self.position['last_percept'] = self.positions[-1]
+
+    def get_percepts(self):
+        return None
+
+    def as_arrays(self):
+        """
+        :return: (times [nCommands], positions [nCommands, nJoints], velocities [nCommands, nJoints])
+        """
+        if not self.times:
+            return np.zeros(0), np.zeros((0, MplId.NUM_JOINTS)), np.zeros((0, MplId.NUM_JOINTS))
+        return np.array(self.times), np.array(self.positions), np.array(self.velocities)
+
+    def close(self):
+        pass
@@ -253,8 +253,7 @@ def encode_param_update_msg(name, value):
     dim = np.array(mat.shape, dtype=np.uint32)
 
     # convert to byte array
-    # bytes = mat.tobytes()
-    data_bytes = mat.tostring()  # compatibility alias for tobytes
+    data_bytes = mat.tobytes()
 
     # format message
     msg_id = 4
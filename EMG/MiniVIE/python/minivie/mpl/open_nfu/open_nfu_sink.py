@@ -53,7 +53,7 @@ class NfuSink(DataSink):
         self.transport.name = 'OpenNfu'
         self.transport.local_addr = get_address(local_addr_str)
         self.transport.remote_addr = get_address(remote_addr_str)
-        self.transport.add_message_handler(self.parse_messages)
+        self.transport.add_batch_handler(self.parse_batch)
 
         self.load_config_parameters()
 
@@ -212,6 +212,21 @@ class NfuSink(DataSink):
     def get_percepts(self):
         return self.percepts
 
+    def parse_batch(self, packets):
+        """Route a batch of messages received together
+
+        Each percept message replaces the last, so only the newest percept message of the batch is decoded.  The
+        older percepts of a batch are dropped without decoding, so their Pos/Torque/Temp lines are not logged
+        """
+        newest_percept = None
+        for data in packets:
+            if len(data) > 2 and data[2] == nfu.NfuUdpMsgId.UDPMSGID_PERCEPTDATA:
+                newest_percept = data
+            else:
+                self.parse_messages(data)
+        if newest_percept is not None:
+            self.parse_messages(newest_percept)
+
     # raw_chars, address = self.sock.recvfrom(8192)  # blocks until timeout or socket closed
     # msg_bytes = bytearray(raw_chars)
     def parse_messages(self, data):
@@ -15,7 +15,6 @@ Revisions:
 import logging
 import xml.etree.cElementTree as xmlTree
 import numpy as np
-from scipy.interpolate import interp1d
 
 
 class RocElement:
@@ -26,6 +25,20 @@ class RocElement:
     angles = {}  # dictionary of angles for each waypoint
     impedance = {}  # dictionary of impedances for each waypoint
 
+    # lookup table built by compile() for get_roc_values
+    lut_x = None  # sorted waypoints [nWaypoints]
+    lut_y = None  # angles at each sorted waypoint [nWaypoints, nJoints]
+    lut_slope = None  # change in angle per unit waypoint over each segment [nWaypoints - 1, nJoints]
+
+    def compile(self):
+        # Precompute the piecewise linear interpolation so that a lookup is one search and a multiply-add
+        order = np.argsort(self.waypoints, kind='stable')
+        self.lut_x = np.asarray(self.waypoints, dtype=float)[order]
+        self.lut_y = np.asarray(self.angles, dtype=float).reshape(len(self.lut_x), -1)[order]
+        dx = np.diff(self.lut_x)[:, np.newaxis]
+        dy = np.diff(self.lut_y, axis=0)
+        self.lut_slope = np.divide(dy, dx, out=np.zeros_like(dy), where=dx > 0)
+
 
 # function to read in ROC xml file and store as dictionary
 def read_roc_table(file):
@@ -65,6 +78,7 @@ def read_roc_table(file):
             angle_array.append([float(val) for val in waypoint.find('angles').text.split(',')])
             # elem.impedance[index] = [float(val) for val in waypoint.find('impedance').text.split(',')]
         elem.angles = np.reshape(np.asarray(angle_array), [-1, len(elem.joints)])
+        elem.compile()
         roc_table[name] = elem
     # return completed dictionary
     return roc_table
@@ -96,9 +110,22 @@ def get_roc_id(roc_table, roc_id):
 
 
 def get_roc_values(roc_elem, val):
-    x = np.array(roc_elem.waypoints)
-    y = roc_elem.angles
-    new_angles = interp1d(x, y, axis=0, kind='linear')(val)
+    # Linearly interpolate the joint angles at a position val along the roc.  Raises ValueError outside the waypoints
+    if roc_elem.lut_x is None:
+        roc_elem.compile()
+    x = roc_elem.lut_x
+    scalar = np.ndim(val) == 0
+    if (val < x[0] or val > x[-1]) if scalar else (np.any(val < x[0]) or np.any(val > x[-1])):
+        raise ValueError('ROC value {} outside of waypoint range [{}, {}]'.format(val, x[0], x[-1]))
+    if len(x) == 1:
+        return roc_elem.lut_y[0] + np.zeros(np.shape(val) + (1,))
+
+    # segment containing val, with val == x[-1] in the last segment
+    if scalar:
+        i = min(int(x.searchsorted(val, side='right')) - 1, len(x) - 2)
+        return roc_elem.lut_y[i] + roc_elem.lut_slope[i] * (val - x[i])
+    i = np.minimum(x.searchsorted(val, side='right') - 1, len(x) - 2)
+    new_angles = roc_elem.lut_y[i] + roc_elem.lut_slope[i] * np.expand_dims(val - x[i], -1)
     return new_angles
 
 
@@ -120,6 +147,24 @@ def main():
     new_values = get_roc_values(get_roc_id(roc_table, 1), 0.1)
     print(['{:6.3f}'.format(i) for i in new_values])
 
+    print("\n\nDEMO Compare to scipy interp1d:")
+    import timeit
+    from scipy.interpolate import interp1d
+    max_error = 0.0
+    for roc_elem in roc_table.values():
+        if len(roc_elem.waypoints) < 2:
+            continue
+        reference = interp1d(np.array(roc_elem.waypoints), roc_elem.angles, axis=0, kind='linear')
+        for val in np.linspace(min(roc_elem.waypoints), max(roc_elem.waypoints), 101):
+            max_error = max(max_error, np.abs(get_roc_values(roc_elem, val) - reference(val)).max())
+    roc_elem = get_roc_id(roc_table, 1)
+    n = 10000
+    t_lut = timeit.timeit(lambda: get_roc_values(roc_elem, 0.37), number=n) / n
+    t_interp = timeit.timeit(lambda: interp1d(np.array(roc_elem.waypoints), roc_elem.angles, axis=0)(0.37),
+                             number=n) / n
+    print('Max difference {:.2e}.  Lookup: {:.1f} us, interp1d: {:.1f} us'.format(max_error, t_lut * 1e6,
+                                                                                 t_interp * 1e6))
+
 
 # Main Function (for demo)
 if __name__ == "__main__":
@@ -145,7 +145,7 @@ class UnityUdp(udp_comms.Udp, DataSink):
         self.command_port = 25010  # integer port for ghost arm position commands
         self.config_port = 27000    # integer port for ghost arm display commands
         self.name = "UnityUdp"
-        self.add_message_handler(self.message_handler)
+        self.add_batch_handler(self.message_batch_handler)
         self.percepts = None
         self.joint_offset = None
         self.load_config_parameters()
@@ -157,6 +157,10 @@ class UnityUdp(udp_comms.Udp, DataSink):
         for i in range(MplId.NUM_JOINTS):
             self.joint_offset[i] = np.deg2rad(get_user_config_var(MplId(i).name + '_OFFSET', 0.0))
 
+    def message_batch_handler(self, packets):
+        # Each percept packet replaces the last, so only decode the newest of a batch
+        self.message_handler(packets[-1])
+
     def message_handler(self, data):
 
         self.percepts = extract_percepts(data)
@@ -1,38 +1,311 @@
 import logging
 
 import numpy as np
-from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from scipy.special import softmax
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis, QuadraticDiscriminantAnalysis
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import LinearSVC
+
+from utilities import instrumentation
+from utilities.user_config import get_user_config_var
+
+# Classifier backends selectable with the Classifier.backend user config setting.  Each entry is a function returning
+# a new, unfitted sklearn style model with fit, predict, predict_proba and classes_.  Add entries with
+# register_backend()
+BACKENDS = {
+    'LDA': lambda: LinearDiscriminantAnalysis(),
+    'QDA': lambda: QuadraticDiscriminantAnalysis(reg_param=0.01),
+    # regularized LDA, shrinkage of the covariance estimate chosen automatically (Ledoit-Wolf)
+    'rLDA': lambda: LinearDiscriminantAnalysis(solver='lsqr', shrinkage='auto'),
+    # linear SVM, with probabilities from cross validated calibration
+    'SVM': lambda: make_pipeline(StandardScaler(), CalibratedClassifierCV(LinearSVC(), cv=3)),
+    'MLP': lambda: make_pipeline(StandardScaler(), MLPClassifier(hidden_layer_sizes=(32,), max_iter=500)),
+    'OnlineLDA': lambda: OnlineLDA(),
+}
+
+
+def register_backend(name, factory):
+    """
+    Add a classifier backend
+
+    :param name: name used to select the backend (Classifier.backend)
+    :param factory: function returning a new, unfitted model
+    """
+    BACKENDS[name] = factory
+
+
+class OnlineLDA(object):
+    """
+    Linear discriminant analysis that can be updated one sample (or one class) at a time
+
+    Keeps the sample count, mean and scatter matrix of each class and the pooled (within class) scatter.  Adding a
+    sample or removing a class updates these in O(num_features^2), and the discriminant weights are recomputed from
+    them with one linear solve the next time a prediction is made.
+
+    Follows the sklearn interface (fit, predict, decision_function, classes_, coef_, intercept_).  Class priors are
+    the class proportions of the training data, as in LinearDiscriminantAnalysis.  Unlike sklearn, coef_ has one row
+    per class even when there are only two classes.
+    """
+
+    def __init__(self, reg=1e-6):
+        """
+        :param reg: ridge added to the diagonal of the pooled covariance, relative to its mean variance, so that it
+            stays invertible with few samples or constant features
+        """
+        self.reg = reg
+        self.reset()
+
+    def reset(self):
+        self.counts = np.zeros(0, dtype=int)  # samples per class id
+        self.means = None  # [num_ids, num_features]
+        self.scatter = None  # per class scatter [num_ids, num_features, num_features]
+        self.pooled_scatter = None  # sum of the class scatter matrices [num_features, num_features]
+        self.classes_ = np.zeros(0, dtype=int)
+        self.coef_ = None
+        self.intercept_ = None
+        self._dirty = False
+
+    @property
+    def num_samples(self):
+        return int(self.counts.sum())
+
+    def __allocate(self, num_ids, num_features):
+        # grow the class statistics to hold class ids up to num_ids - 1
+        if self.means is None:
+            self.means = np.zeros((0, num_features))
+            self.scatter = np.zeros((0, num_features, num_features))
+            self.pooled_scatter = np.zeros((num_features, num_features))
+        elif num_features != self.means.shape[1]:
+            raise ValueError('X has {} features, but OnlineLDA is expecting {} features as input'.format(
+                num_features, self.means.shape[1]))
+        num_new = num_ids - len(self.counts)
+        if num_new > 0:
+            self.counts = np.append(self.counts, np.zeros(num_new, dtype=int))
+            self.means = np.append(self.means, np.zeros((num_new, num_features)), axis=0)
+            self.scatter = np.append(self.scatter, np.zeros((num_new, num_features, num_features)), axis=0)
+
+    def fit(self, X, y):
+        """ Compute the class statistics from scratch """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        y = np.asarray(y, dtype=int).ravel()
+        self.reset()
+        self.__allocate(y.max() + 1, X.shape[1])
+        self.counts = np.bincount(y, minlength=len(self.counts))
+        for class_id in np.flatnonzero(self.counts):
+            x = X[y == class_id]
+            self.means[class_id] = x.mean(axis=0)
+            centered = x - self.means[class_id]
+            self.scatter[class_id] = centered.T @ centered
+        self.pooled_scatter = self.scatter.sum(axis=0)
+        self._dirty = True
+        return self
+
+    def partial_fit(self, X, y):
+        """ Add samples to the class statistics, one running (Welford) update per sample """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        y = np.asarray(y, dtype=int).ravel()
+        self.__allocate(y.max() + 1, X.shape[1])
+        for x, class_id in zip(X, y):
+            self.counts[class_id] += 1
+            delta = x - self.means[class_id]
+            self.means[class_id] += delta / self.counts[class_id]
+            update = np.outer(delta, x - self.means[class_id])
+            self.scatter[class_id] += update
+            self.pooled_scatter += update
+        self._dirty = True
+        return self
+
+    def remove_class(self, class_id):
+        """ Remove all samples of a class """
+        if class_id >= len(self.counts) or not self.counts[class_id]:
+            return
+        self.pooled_scatter -= self.scatter[class_id]
+        self.scatter[class_id] = 0
+        self.means[class_id] = 0
+        self.counts[class_id] = 0
+        self._dirty = True
+
+    def update_weights(self):
+        """ Recompute coef_ and intercept_ from the class statistics """
+        self.classes_ = np.flatnonzero(self.counts)
+        self._dirty = False
+        if not len(self.classes_):
+            self.coef_ = self.intercept_ = None
+            return
+        num_samples = self.num_samples
+        num_features = self.pooled_scatter.shape[0]
+        covariance = self.pooled_scatter / max(num_samples - len(self.classes_), 1)
+        covariance[np.diag_indices(num_features)] += self.reg * max(np.trace(covariance) / num_features, 1e-12)
+        means = self.means[self.classes_]
+        self.coef_ = np.linalg.solve(covariance, means.T).T
+        self.intercept_ = -0.5 * np.sum(self.coef_ * means, axis=1) + np.log(self.counts[self.classes_] / num_samples)
+
+    def decision_function(self, X):
+        if self._dirty:
+            self.update_weights()
+        if self.coef_ is None:
+            raise ValueError('OnlineLDA has no training samples')
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if X.shape[1] != self.coef_.shape[1]:
+            raise ValueError('X has {} features, but OnlineLDA is expecting {} features as input'.format(
+                X.shape[1], self.coef_.shape[1]))
+        return X @ self.coef_.T + self.intercept_
+
+    def predict(self, X):
+        scores = self.decision_function(X)  # refreshes classes_
+        return self.classes_[np.argmax(scores, axis=1)]
+
+    def predict_proba(self, X):
+        """ Posterior probability of each class in classes_ """
+        return softmax(self.decision_function(X), axis=1)
+
+
+class LinearPredictor(object):
+    """
+    Fast single sample prediction from the weights of a fitted linear classifier
+
+    The weights (coef_, intercept_, classes_) are copied out of the model once, after fitting.  Each prediction is
+    then one matrix-vector product into a preallocated buffer, avoiding the input validation and allocation that
+    sklearn performs on every predict call.  Decisions are the same as the model's predict.
+    """
+
+    def __init__(self, coef, intercept, classes):
+        self.coef_ = np.ascontiguousarray(coef, dtype=float)
+        self.intercept_ = np.ascontiguousarray(intercept, dtype=float).ravel()
+        self.classes_ = np.asarray(classes)
+        self._scores = np.zeros(self.coef_.shape[0])
+        self._proba = np.zeros(len(self.classes_))
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Extract the weights of a fitted model
+
+        :param model: fitted LinearDiscriminantAnalysis, OnlineLDA or other linear sklearn classifier
+        :return: LinearPredictor, or None if the model has no linear weights
+        """
+        if isinstance(model, OnlineLDA) and model._dirty:
+            model.update_weights()
+        if getattr(model, 'coef_', None) is None or getattr(model, 'intercept_', None) is None:
+            return None
+        return cls(model.coef_, model.intercept_, model.classes_)
+
+    def predict(self, features):
+        """
+        :param features: a single sample, [num_features] or [1, num_features]
+        :return: class id
+        """
+        np.matmul(self.coef_, features.reshape(-1), out=self._scores)
+        self._scores += self.intercept_
+        if len(self._scores) == 1:
+            # binary sklearn models have a single decision function, positive for the second class
+            return self.classes_[int(self._scores[0] > 0)]
+        return self.classes_[self._scores.argmax()]
+
+    def predict_proba(self, features):
+        """
+        Posterior probability of each class, as LinearDiscriminantAnalysis.predict_proba
+
+        :param features: a single sample, [num_features] or [1, num_features]
+        :return: probability of each class in classes_ [num_classes] (view of an internal buffer)
+        """
+        np.matmul(self.coef_, features.reshape(-1), out=self._scores)
+        self._scores += self.intercept_
+        if len(self._scores) == 1:
+            p = 1.0 / (1.0 + np.exp(-self._scores[0]))
+            self._proba[0], self._proba[1] = 1.0 - p, p
+            return self._proba
+        self._scores -= self._scores.max()
+        np.exp(self._scores, out=self._proba)
+        self._proba /= self._proba.sum()
+        return self._proba
 
 
 class Classifier:
     def __init__(self, training_data=None):
         self.TrainingData = training_data
         self.classifier = None
-        pass
+        # LinearPredictor with the weights of the fitted classifier (None if the classifier isn't linear).  Updated
+        # from the classifier when it changes
+        self.predictor = None
+        self._predictor_stale = True
+        # Model type, one of the names in BACKENDS
+        self.backend = get_user_config_var('Classifier.backend', 'LDA')
+        if self.backend not in BACKENDS:
+            logging.error('Unknown classifier backend "{}", using LDA.  Options are: {}'.format(
+                self.backend, ', '.join(BACKENDS)))
+            self.backend = 'LDA'
+        # With online updates, an OnlineLDA model is updated as each training sample is added and as classes are
+        # cleared, rather than refit from all of the training data.  Overrides the backend setting
+        self.online = get_user_config_var('Classifier.online', False)
+        # Decisions with a posterior probability below this threshold are rejected and reported as 'No Movement'.
+        # 0 disables rejection
+        self.rejection_threshold = get_user_config_var('Classifier.rejection_threshold', 0.0)
+        # Compute the posterior probability of each decision (self.confidence) even when rejection is disabled, e.g.
+        # for weighted voting
+        self.compute_confidence = False
+        self.confidence = None  # posterior probability of the last decision, when computed
 
     def fit(self):
         """
-        Fit data currently stored in self.TrainingData and self.TrainingClass to LDA or QDA model
+        Fit data currently stored in self.TrainingData and self.TrainingClass to the selected backend model
 
         """
 
         if self.TrainingData.num_samples == 0:
             logging.info('No Data')
             self.classifier = None
+            self._predictor_stale = True
             return
             # raise ValueError('Training Data or Class array(s) is empty. Did you forget to save training data?')
 
-        f_ = np.array(self.TrainingData.data)
+        f_, y = self.TrainingData.as_arrays()
         logging.info(f_)
-        y = np.array(self.TrainingData.id)
         logging.info('Training data Numpy arrays')
         logging.info('shape of X: ' + str(f_.shape))
         logging.info('shape of y: ' + str(y.shape))
 
-        # self.classifier = QuadraticDiscriminantAnalysis()
-        self.classifier = LinearDiscriminantAnalysis()
-        self.classifier.fit(f_, y)
+        if self.online:
+            self.classifier = OnlineLDA()
+        else:
+            self.classifier = BACKENDS[self.backend]()
+        try:
+            self.classifier.fit(f_, y)
+        except ValueError as e:
+            # e.g. a single class, or too few samples of a class for cross validation
+            logging.warning('Unable to fit classifier. Error was: ' + str(e))
+            self.classifier = None
+        self._predictor_stale = True
+
+    def add_sample(self, features, class_id):
+        """
+        Update an online classifier with a new training sample.  Does nothing unless online updates are enabled
+
+        :param features: feature vector of the sample
+        :param class_id: class index of the sample
+        """
+        if not self.online:
+            return
+        if self.classifier is None:
+            self.classifier = OnlineLDA()
+        try:
+            self.classifier.partial_fit(np.ravel(features), [class_id])
+            self._predictor_stale = True
+        except ValueError as e:
+            logging.warning('Unable to update classifier. Error was: ' + str(e))
 
+    def clear_class(self, class_id):
+        """ Remove a class from an online classifier, or refit from the training data """
+        if self.online and self.classifier is not None:
+            self.classifier.remove_class(class_id)
+            self._predictor_stale = True
+        else:
+            self.fit()
+
+    @instrumentation.probe('classify')
     def predict(self, features):
         """
 
@@ -56,10 +329,29 @@ class Classifier:
             return decision_id, status_msg
 
         try:
-            # run sklearn prediction, returns array, but with one sample in we just want the first value
-            prediction = self.classifier.predict(features)
+            if self._predictor_stale:
+                self.predictor = LinearPredictor.from_model(self.classifier)
+                self._predictor_stale = False
+
+            if self.rejection_threshold > 0 or self.compute_confidence:
+                if self.predictor is not None:
+                    proba, classes = self.predictor.predict_proba(features), self.predictor.classes_
+                else:
+                    proba, classes = self.classifier.predict_proba(features)[0], self.classifier.classes_
+                best = proba.argmax()
+                decision_id = classes[best]
+                self.confidence = proba[best]
+            elif self.predictor is not None:
+                decision_id = self.predictor.predict(features)
+            else:
+                # run sklearn prediction, returns array, but with one sample in we just want the first value
+                decision_id = self.classifier.predict(features)[0]
             status_msg = 'RUNNING'
-            decision_id = prediction[0]
+
+            if self.rejection_threshold > 0 and self.confidence < self.rejection_threshold:
+                # low confidence, hold still rather than act on a likely misclassification
+                decision_id = self.__rest_id()
+                status_msg = 'REJECTED'
 
         except ValueError as e:
             logging.warning('Unable to classify. Error was: ' + str(e))
@@ -67,3 +359,72 @@ class Classifier:
             decision_id = None
 
         return decision_id, status_msg
+
+    def __rest_id(self):
+        # class id of 'No Movement', or None if it isn't a class
+        try:
+            return self.TrainingData.motion_names.index('No Movement')
+        except (AttributeError, ValueError):
+            return None
+
+
+def test_online_lda():
+    # Offline test code comparing the online LDA to sklearn
+    # test with: python3 -c "from pattern_rec.classifier import *; test_online_lda()"
+    import timeit
+
+    rng = np.random.default_rng(0)
+    num_features, num_classes, num_samples = 64, 8, 4000
+    centers = rng.standard_normal((num_classes, num_features))
+    y = rng.integers(0, num_classes, num_samples)
+    X = centers[y] + rng.standard_normal((num_samples, num_features))
+
+    reference = LinearDiscriminantAnalysis().fit(X, y)
+    batch = OnlineLDA().fit(X, y)
+    online = OnlineLDA()
+    for x, class_id in zip(X, y):
+        online.partial_fit(x, [class_id])
+    print('Batch agrees with sklearn: {:.4f}'.format(np.mean(batch.predict(X) == reference.predict(X))))
+    print('Online agrees with sklearn: {:.4f}'.format(np.mean(online.predict(X) == reference.predict(X))))
+    print('Max scatter difference: {:.2e}'.format(np.abs(online.pooled_scatter - batch.pooled_scatter).max()))
+
+    keep = y != 3
+    online.remove_class(3)
+    reference.fit(X[keep], y[keep])
+    print('After clear agrees with sklearn: {:.4f}'.format(np.mean(online.predict(X) == reference.predict(X))))
+
+    n = 200
+    t = timeit.timeit(lambda: online.partial_fit(X[0], [y[0]]), number=n)
+    print('partial_fit: {:.1f} us'.format(t / n * 1e6))
+    t = timeit.timeit(online.update_weights, number=n)
+    print('update_weights: {:.1f} us'.format(t / n * 1e6))
+    t = timeit.timeit(lambda: reference.fit(X, y), number=10)
+    print('sklearn fit: {:.1f} ms'.format(t / 10 * 1e3))
+
+
+def test_linear_predictor():
+    # Offline benchmark comparing the LinearPredictor fast path to sklearn predict, one sample at a time
+    # test with: python3 -c "from pattern_rec.classifier import *; test_linear_predictor()"
+    import timeit
+
+    rng = np.random.default_rng(0)
+    num_features, num_samples = 64, 5000
+    for num_classes in (2, 8):
+        centers = rng.standard_normal((num_classes, num_features))
+        y = rng.integers(0, num_classes, num_samples)
+        X = centers[y] + 2 * rng.standard_normal((num_samples, num_features))
+
+        for model in (LinearDiscriminantAnalysis().fit(X, y), OnlineLDA().fit(X, y)):
+            predictor = LinearPredictor.from_model(model)
+            fast = np.array([predictor.predict(X[i:i + 1]) for i in range(num_samples)])
+            print('{} with {} classes: {} of {} decisions match'.format(
+                type(model).__name__, num_classes, np.count_nonzero(fast == model.predict(X)), num_samples))
+
+        model = LinearDiscriminantAnalysis().fit(X, y)
+        predictor = LinearPredictor.from_model(model)
+        x = X[:1]
+        n = 10000
+        t_sklearn = timeit.timeit(lambda: model.predict(x), number=n) / n
+        t_fast = timeit.timeit(lambda: predictor.predict(x), number=n) / n
+        print('sklearn predict: {:.1f} us, LinearPredictor: {:.1f} us ({:.0f}x)'.format(
+            t_sklearn * 1e6, t_fast * 1e6, t_sklearn / t_fast))
@@ -1,4 +1,6 @@
 import numpy as np
+from pattern_rec.features import FeatureWindow, FeatureBatch
+from utilities import instrumentation
 
 
 class FeatureExtract(object):
@@ -29,7 +31,12 @@ class FeatureExtract(object):
         self.attached_features = []
         self.data_scale_factor = data_scale_factor
         self.num_data_samples = num_data_samples
+        # preallocated [1, nChan*nFeat] output, reused on every call to feature_extract
+        self.features_out = None
+        # preallocated [nSamples, nChan] input gathered from all signal sources, reused on every call to get_features
+        self.data_in = None
 
+    @instrumentation.probe('features')
     def get_features(self, data_input):
         """
         perform feature extraction
@@ -51,8 +58,7 @@ class FeatureExtract(object):
             # input is a data source so call it's get_data method
 
             # Get features from emg data
-            data = np.concatenate([s.get_data() for s in data_input], axis=1)
-            f = np.squeeze(self.feature_extract(data * self.data_scale_factor))
+            f = np.squeeze(self.feature_extract(self.gather_data(data_input)))
 
             # TODO: The imu functions below have the potential to be very slow
             imu = None
@@ -86,6 +92,68 @@ class FeatureExtract(object):
 
         return feature_list, feature_learn, imu, rot_mat
 
+    def get_features_batch(self, data_input, window_size, window_slide, newest_first=True):
+        """
+        perform feature extraction over an entire recording (e.g. to re-featurize saved data offline)
+
+        Windows are taken every window_slide samples, beginning with the first full window, and features are
+        identical to those computed online by get_features on the same buffered samples.  As with signal sources,
+        data_scale_factor is applied to the data before features are computed.
+
+        :param data_input: recorded samples in chronological order [numSamples, numChannels]
+        :param window_size: number of samples in each window (see FeaturesSelected.get_window_params)
+        :param window_slide: number of samples between successive windows
+        :param newest_first: present each window with the newest sample first, as buffered by signal sources
+        :return: features [nWindows, nChan*nFeat] with the same ordering as feature_extract
+        """
+        num_features = len(self.attached_features)
+        if data_input is None or num_features == 0:
+            return None
+
+        data = np.asarray(data_input) * self.data_scale_factor
+        batch = FeatureBatch(data, window_size, window_slide, newest_first)
+
+        num_channels = data.shape[1]
+        features_out = np.zeros((batch.num_windows, num_channels * num_features))
+        if batch.num_windows == 0:
+            return features_out
+
+        if self.normalized_orientation is not None:
+            # orientation roll is applied per window, so extract each window in turn
+            for i, window in enumerate(batch.windows()):
+                self.input_source = 0
+                features_out[i] = self.feature_extract(window)
+            return features_out
+
+        # view output as [nWindows, nChan, nFeat] so each feature fills one column
+        features_view = features_out.reshape(batch.num_windows, num_channels, num_features)
+        for i, feature in enumerate(self.attached_features):
+            features_view[:, :, i] = feature.extract_batch(batch)
+
+        return features_out
+
+    def gather_data(self, data_input):
+        """
+        Collect the latest samples from each signal source side by side in one scaled [nSamples, nChan] array
+
+        Each source's buffer is scaled directly into its columns of a preallocated array, so no intermediate
+        concatenated copy is made.  The array is overwritten on the next call.
+
+        :param data_input: list of SignalInput sources
+        :return: data_scale_factor * [source_1 data, source_2 data, ...]
+        """
+        data = [s.get_data() for s in data_input]
+        shape = (data[0].shape[0], sum([d.shape[1] for d in data]))
+        if self.data_in is None or self.data_in.shape != shape:
+            self.data_in = np.zeros(shape)
+
+        channel = 0
+        for d in data:
+            np.multiply(d, self.data_scale_factor, out=self.data_in[:, channel:channel + d.shape[1]])
+            channel += d.shape[1]
+
+        return self.data_in
+
     def normalize_orientation(self, orientation):
         self.normalized_orientation = orientation
 
@@ -134,6 +202,9 @@ class FeatureExtract(object):
         # Output: feature vector should be [1,nChan*nFeat]
         # data ordering is as follows
         # [ch1f1, ch1f2, ch1f3, ch1f4, ch2f1, ch2f2, ch2f3, ch2f4, ... chNf4]
+        #
+        # Shared intermediates (diff, abs, sign) are computed once per window and reused by all attached features.
+        # Results are written in place to a preallocated output buffer, which is overwritten on the next call.
         """
 
         # normalize features
@@ -144,24 +215,24 @@ class FeatureExtract(object):
         # update input source (ex. myo)
         self.input_source += 1
 
-        features_array = []
+        num_features = len(self.attached_features)
+        if num_features == 0:
+            return None
 
-        # loops through instances and extracts features
-        for feature in self.attached_features:
-            new_feature = feature.extract_features(y)
-            features_array.append(new_feature)
+        num_channels = y.shape[1]
+        size = num_channels * num_features
+        if self.features_out is None or self.features_out.shape[1] != size:
+            self.features_out = np.zeros((1, size))
 
-        if len(features_array) > 0:
-            vstack_features_array = np.vstack(features_array)
+        # view output as [nChan, nFeat] so each feature fills one column
+        features_view = self.features_out.reshape(num_channels, num_features)
 
-            # determines total number of elements in array
-            size = 1
-            for dim in np.shape(vstack_features_array):
-                size *= dim
+        # loops through instances and extracts features
+        window = FeatureWindow(y)
+        for i, feature in enumerate(self.attached_features):
+            features_view[:, i] = feature.extract_window(window)
 
-            return vstack_features_array.T.reshape(1, size)
-        else:
-            return None
+        return self.features_out
 
 
 def test_feature_extract():
@@ -223,6 +294,8 @@ def test_feature_extract():
         except TypeError:
             pass
 
+    test_feature_extract_batch()
+
     # separate the signals for visual reference  and save plot
     for i in range(num_channels):
         offset = i * num_channels
@@ -231,3 +304,42 @@ def test_feature_extract():
     # for signal in
     plt.plot(t, emg_buffer)
     plt.savefig('emg_profile.png')
+
+
+def test_feature_extract_batch():
+    # Offline test code comparing batch extraction to the online (window by window) path
+    # test with: python3 -c "from pattern_rec.feature_extract import *; test_feature_extract_batch()"
+    import timeit
+    from pattern_rec import features
+
+    print('Testing Batch Feature extraction')
+
+    sample_rate = 1000
+    window_slide = 20
+    window_size = 150
+    num_channels = 16
+    emg_data = np.random.default_rng(0).standard_normal((33000, num_channels))
+
+    fe = FeatureExtract(data_scale_factor=0.5)
+    fe.attach_feature(features.Mav())
+    fe.attach_feature(features.CurveLen(fs=sample_rate))
+    fe.attach_feature(features.Zc(fs=sample_rate))
+    fe.attach_feature(features.Ssc(fs=sample_rate))
+    fe.attach_feature(features.Wamp(fs=sample_rate))
+    fe.attach_feature(features.Var())
+
+    batch_features = fe.get_features_batch(emg_data, window_size, window_slide)
+
+    # online path sees a newest-first buffer ending at each window step
+    online_features = []
+    for end in range(window_size, emg_data.shape[0] + 1, window_slide):
+        window = emg_data[end - window_size:end][::-1] * fe.data_scale_factor
+        online_features.append(fe.feature_extract(window)[0].copy())
+    online_features = np.array(online_features)
+
+    identical = np.array_equal(batch_features, online_features)
+    print(f'Batch shape: {batch_features.shape}  Identical to online: {identical}')
+    assert identical
+
+    py_time = timeit.timeit(lambda: fe.get_features_batch(emg_data, window_size, window_slide), number=10) / 10
+    print(f'Time to complete batch: {py_time:.5f}')
@@ -1,8 +1,59 @@
 from abc import ABCMeta, abstractmethod
 import numpy as np
 import math
-from spectrum import aryule
-from collections import deque
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def levinson(r):
+    """ Levinson-Durbin recursion, batched over any number of channels
+
+    Vectorized equivalent of spectrum.LEVINSON for real data, applied to every channel at once.
+
+    :param r: autocorrelation [order + 1, ...] with lag along the first axis (e.g. [order + 1, numChannels])
+    :return: (A, P, k) autoregressive coefficients [order, ...], prediction error [...],
+        reflection coefficients [order, ...]
+    """
+    order = r.shape[0] - 1
+    a = np.zeros((order,) + r.shape[1:])
+    ref = np.zeros_like(a)
+    p = r[0].copy()
+
+    for k in range(order):
+        # r[k:0:-1] is lags k..1, matched with coefficients 0..k-1
+        save = r[k + 1] + np.sum(a[:k] * r[k:0:-1], axis=0)
+        temp = -save / p
+        p = p * (1. - temp ** 2.)
+        if k > 0:
+            previous = a[:k].copy()
+            a[:k] = previous + temp * previous[::-1]
+        a[k] = temp
+        ref[k] = temp
+
+    return a, p, ref
+
+
+def aryule(data_input, order):
+    """ Yule-Walker autoregressive model for every channel at once
+
+    Vectorized equivalent of spectrum.aryule (norm='biased') applied to each column of data_input.  A channel with
+    no signal has zero autocorrelation and returns nan coefficients, as spectrum.aryule does.
+
+    :param data_input: input samples [numSamples, numChannels]
+    :param order: autoregressive model order
+    :return: (A, P, k) autoregressive coefficients [order, numChannels], prediction error [numChannels],
+        reflection coefficients [order, numChannels]
+    """
+    n = data_input.shape[0]
+
+    # biased autocorrelation, one product-sum over all channels per lag
+    r = np.empty((order + 1,) + data_input.shape[1:])
+    for lag in range(order + 1):
+        r[lag] = np.sum(data_input[lag:] * data_input[:n - lag], axis=0) / n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return levinson(r)
 
 
 # Abstract base class
@@ -21,14 +72,241 @@ class EMGFeatures(object):
     def extract_features(self, data_input):
         pass
 
+    def extract_window(self, window):
+        """ Compute feature from a FeatureWindow
+
+        Features that can reuse the intermediates cached on the window (diff, abs, etc) overload this method.
+        The default simply computes the feature from the raw window data.
+
+        :param window: FeatureWindow wrapping the input samples
+        :return: feature value
+        """
+        return self.extract_features(window.data)
+
+    def extract_batch(self, batch):
+        """ Compute feature for every window of a FeatureBatch
+
+        Features that can be computed directly from the recording-wide intermediates overload this method.
+        The default extracts each window in turn, which also advances the state of incremental features exactly
+        as the online path would.
+
+        :param batch: FeatureBatch wrapping a recording
+        :return: feature values [nWindows, nChannels]
+        """
+        # copy each result since incremental features return their (mutable) running total
+        return np.array([np.array(self.extract_features(window)) for window in batch.windows()])
+
+
+class FeatureWindow(object):
+    """
+    Shared intermediates for a single data window.
+
+    Each intermediate is computed the first time a feature requests it and then reused by every other feature
+    extracted from the same window, so the diff, abs and sign terms are only computed once per timestep.
+    """
+
+    def __init__(self, data_input):
+        """ Constructor
+
+        :param data_input: input samples [numSamples, numChannels]
+        """
+        self.data = data_input
+        self.num_samples = data_input.shape[0]
+        self._abs = None
+        self._diff = None
+        self._abs_diff = None
+        self._rising = None
+        self._falling = None
+        self._square = None
+        self._sum_square = None
+        self._above = {}
+        self._below = {}
+        self._aryule = {}
+
+    def head(self, num_samples):
+        """ Return a window over the first num_samples of this window (used by incremental features)
+
+        :param num_samples: number of samples to keep.  None keeps the entire window
+        :return: FeatureWindow
+        """
+        if num_samples is None or num_samples >= self.num_samples:
+            return self
+        return FeatureWindow(self.data[:num_samples])
+
+    @property
+    def abs(self):
+        if self._abs is None:
+            self._abs = abs(self.data)
+        return self._abs
+
+    @property
+    def diff(self):
+        if self._diff is None:
+            # equivalent to np.diff(data, axis=0) without the generic axis handling
+            self._diff = self.data[1:] - self.data[:-1]
+        return self._diff
+
+    @property
+    def abs_diff(self):
+        if self._abs_diff is None:
+            self._abs_diff = abs(self.diff)
+        return self._abs_diff
+
+    @property
+    def rising(self):
+        if self._rising is None:
+            self._rising = self.diff > 0
+        return self._rising
+
+    @property
+    def falling(self):
+        if self._falling is None:
+            self._falling = self.diff < 0
+        return self._falling
+
+    @property
+    def square(self):
+        if self._square is None:
+            self._square = np.square(self.data)
+        return self._square
+
+    @property
+    def sum_square(self):
+        if self._sum_square is None:
+            self._sum_square = np.sum(self.square, axis=0)
+        return self._sum_square
+
+    def above(self, value):
+        """ Boolean mask of samples strictly greater than value, cached per value """
+        result = self._above.get(value)
+        if result is None:
+            result = self._above[value] = self.data > value
+        return result
+
+    def below(self, value):
+        """ Boolean mask of samples strictly less than value, cached per value """
+        result = self._below.get(value)
+        if result is None:
+            result = self._below[value] = self.data < value
+        return result
+
+    @staticmethod
+    def count(mask):
+        """ Count True values down each channel (axis=0) of a boolean mask """
+        return np.count_nonzero(mask, axis=0)
+
+    def aryule(self, order):
+        """ Yule-Walker autoregressive model of every channel, cached per order (shared by AR and Ceps)
+
+        :param order: autoregressive model order
+        :return: (A, P, k) see features.aryule
+        """
+        result = self._aryule.get(order)
+        if result is None:
+            result = self._aryule[order] = aryule(self.data, order)
+        return result
+
+
+class FeatureBatch(FeatureWindow):
+    """
+    Shared intermediates for every window of a recording, used for offline (batch) feature extraction.
+
+    Intermediates (abs, diff, threshold masks) are computed once over the whole recording.  Windows are exposed as
+    strided views into these arrays, so reductions over each window run in the same order as the online path and
+    return identical values.  Count based features use cumulative sums, which are exact for integer counts.
+
+    Signal sources buffer samples with the newest sample on top, so by default each window is presented
+    newest-first, exactly as FeatureExtract.feature_extract would see it during a live session.
+    """
+
+    def __init__(self, data_input, window_size, window_slide, newest_first=True):
+        """ Constructor
+
+        :param data_input: recorded samples in chronological order [numSamples, numChannels]
+        :param window_size: number of samples in each window
+        :param window_slide: number of samples between the start of successive windows
+        :param newest_first: present each window with the newest sample first (as buffered by signal sources)
+        """
+        total_samples = data_input.shape[0]
+        self.num_windows = max((total_samples - window_size) // window_slide + 1, 0)
+        self.window_size = window_size
+        self.window_slide = window_slide
+
+        if newest_first:
+            # reverse the recording so every window is a forward slice, starting from the first full window
+            super(FeatureBatch, self).__init__(data_input[::-1])
+            self.start = total_samples - window_size
+            self.step = -window_slide
+        else:
+            super(FeatureBatch, self).__init__(data_input)
+            self.start = 0
+            self.step = window_slide
+
+        # Number of samples in each window
+        self.num_samples = window_size
+
+        # row offsets of each window into self.data, in chronological order
+        self.starts = self.start + self.step * np.arange(self.num_windows)
+
+    def windows(self):
+        """ Generator for each window of data, in chronological order [window_size, numChannels] """
+        for start in self.starts:
+            yield self.data[start:start + self.window_size]
+
+    def window_view(self, values, length):
+        """ Strided view over each window of an intermediate aligned with self.data
+
+        :param values: intermediate array with rows aligned to self.data (e.g. abs, abs_diff)
+        :param length: number of rows of values that fall within a single window
+        :return: read only view [nWindows, length, numChannels]
+        """
+        view = np.lib.stride_tricks.sliding_window_view(values, length, axis=0)
+        return view[self.start::self.step][:self.num_windows].swapaxes(1, 2)
+
+    def window_count(self, mask, length):
+        """ Count True values of a mask within each window using a cumulative sum
+
+        :param mask: boolean array with rows aligned to self.data
+        :param length: number of rows of mask that fall within a single window
+        :return: counts [nWindows, numChannels]
+        """
+        cumulative = np.zeros((mask.shape[0] + 1, mask.shape[1]), dtype=np.intp)
+        np.cumsum(mask, axis=0, out=cumulative[1:])
+        return cumulative[self.starts + length] - cumulative[self.starts]
+
+    def aryule(self, order):
+        """ Yule-Walker autoregressive model of every channel in every window, cached per order
+
+        Lagged products are formed once over the recording and summed over each window.
+
+        :param order: autoregressive model order
+        :return: (A, P, k) as features.aryule, with an additional window axis: A [order, nWindows, numChannels]
+        """
+        result = self._aryule.get(order)
+        if result is None:
+            n = self.num_samples
+            r = np.empty((order + 1, self.num_windows, self.data.shape[1]))
+            for lag in range(order + 1):
+                lagged = self.data[lag:] * self.data[:self.data.shape[0] - lag]
+                r[lag] = np.sum(self.window_view(lagged, n - lag), axis=1) / n
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = self._aryule[order] = levinson(r)
+        return result
+
 
 class IncrementalFeature(object):
     """
     Helper class for computing (linear) features incrementally.
-    Maintains a cache of feature increments and a running total of the feature. 
+    Maintains a ring buffer of feature increments and a running total of the feature.
+
+    Each update computes a feature kernel over only the newest 'window_slide' samples (plus any overlap needed by
+    differences), so the cost of a step no longer depends on the window size.  The kernel must be additive, i.e.
+    the kernel of a full window equals the sum of the kernels of the slices that tile it.
     """
 
-    def __init__(self, window_size, window_slide, channels):
+    def __init__(self, window_size, window_slide, channels, overlap=0, scale=1.0, self_check=False,
+                 tolerance=1e-6):
         """ Constructor
 
         Initializes cache and feature total.
@@ -39,6 +317,10 @@ class IncrementalFeature(object):
         :param window_size: size of feature window, in samples
         :param window_slide: size of feature slide, in samples
         :param channels: number of channels computed for feature
+        :param overlap: extra samples past window_slide needed by the kernel (1 for diff, 2 for double diff)
+        :param scale: factor applied to each kernel value before it is added to the total
+        :param self_check: if True, compare the running total against a full recomputation on every update
+        :param tolerance: relative and absolute tolerance used by the self check
         :raises ValueError: checks if window_slide is a factor of window_size
         """
 
@@ -46,10 +328,22 @@ class IncrementalFeature(object):
             raise ValueError('window_size must be an integer multiple of window_slide')
 
         self.channels = channels
+        self.window_size = window_size
+        self.window_slide = window_slide
+        self.slice = window_slide + overlap
+        self.scale = scale
         self.cache_length = window_size // window_slide
-        self.cache = deque(np.zeros(self.channels) for i in range(self.cache_length))
+        self.cache = np.zeros((self.cache_length, self.channels))
+        self.cache_index = 0
+        self.num_updates = 0
         self.feature = np.zeros(self.channels)
 
+        # number of samples covered by all the cached slices
+        self.span = window_size + overlap
+        self.self_check = self_check
+        self.tolerance = tolerance
+        self.check_failures = 0
+
     def update(self, increment):
         """ Update running total for feature
 
@@ -58,35 +352,81 @@ class IncrementalFeature(object):
         :param increment: feature increment to add to total and cache
         :return: running total feature value
         """
-        self.feature += (increment - self.cache.popleft())
-        self.cache.append(increment)
+        self.feature += (increment - self.cache[self.cache_index])
+        self.cache[self.cache_index] = increment
+        self.cache_index = (self.cache_index + 1) % self.cache_length
+        self.num_updates += 1
         return self.feature
 
+    def update_window(self, window, kernel):
+        """ Update running total from the newest samples of a window
+
+        :param window: FeatureWindow with the newest sample first
+        :param kernel: function computing the (unscaled) feature kernel of a FeatureWindow
+        :return: running total feature value
+        """
+        self.update(kernel(window.head(self.slice)) * self.scale)
+
+        if self.self_check:
+            self.check(window, kernel)
+
+        return self.feature
+
+    def check(self, window, kernel, reference=None, offset=0.0):
+        """ Compare running total against the kernel recomputed over the full window
+
+        On a mismatch (e.g. samples dropped between steps, or accumulated rounding) a warning is logged and the
+        running total is reset to the recomputed value.  The check is skipped until the cache has filled and when
+        the window holds fewer than window_size + overlap samples (window_size samples with a reference).
+
+        :param window: FeatureWindow with the newest sample first
+        :param kernel: function computing the (unscaled) feature kernel of a FeatureWindow
+        :param reference: optional function computing the full (not incremental) feature of a window_size sample
+            FeatureWindow.  If given, the running total less offset is compared against it instead of the kernel
+        :param offset: part of the running total that the reference feature does not include
+        :return: False if the running total did not match, otherwise True
+        """
+        if self.num_updates < self.cache_length:
+            return True
+        if reference is None:
+            if window.num_samples < self.span:
+                return True
+            expected = kernel(window.head(self.span)) * self.scale
+        else:
+            if window.num_samples < self.window_size:
+                return True
+            expected = reference(window.head(self.window_size))
+        if np.allclose(self.feature - offset, expected, rtol=self.tolerance, atol=self.tolerance):
+            return True
+
+        self.check_failures += 1
+        logger.warning(f'Incremental feature mismatch ({self.check_failures}): '
+                       f'max error {np.max(np.abs(self.feature - offset - expected)):.3g}')
+        self.feature[:] = expected + offset
+        return False
+
     def clear(self):
         """ Reset increment cache and feature value to 0 
 
         :return: none
         """
         self.feature = np.zeros(self.channels)
-        self.cache = deque(np.zeros(self.channels) for i in range(self.cache_length))
+        self.cache = np.zeros((self.cache_length, self.channels))
+        self.cache_index = 0
+        self.num_updates = 0
 
 
 class Mav(EMGFeatures):
-    def __init__(self, incremental=False, window_size=None, window_slide=None, channels=None):
+    def __init__(self, incremental=False, window_size=None, window_slide=None, channels=None, self_check=False):
         super(Mav, self).__init__()
 
         self.name = "Mav"
 
-        # For feature computation, use a slice of input data. 
-        # In non-incremental mode, slice is entire passed in input
         # In incremental mode, only use most recent 'window_slide' samples
-        self.slice = None
-
         self.incremental = incremental
         if self.incremental:
-            self.slice = window_slide
-            self.scale = window_slide / window_size
-            self.inc_feature = IncrementalFeature(window_size, window_slide, channels)
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, scale=1 / window_size,
+                                                  self_check=self_check)
 
     def get_name(self):
         return self.name
@@ -100,31 +440,42 @@ class Mav(EMGFeatures):
         :return: scalar feature value
         """
 
-        mav_feature = np.mean(abs(data_input[:self.slice]), 0)
+        return self.extract_window(FeatureWindow(data_input))
 
+    def extract_window(self, window):
         if self.incremental:
-            return self.inc_feature.update(mav_feature * self.scale)
+            return self.inc_feature.update_window(window, self.increment)
+
+        mav_feature = np.mean(window.abs, 0)
 
         return mav_feature
 
+    @staticmethod
+    def increment(window):
+        # sum of absolute values, scaled by 1/window_size in incremental mode
+        return np.sum(window.abs, 0)
+
+    def extract_batch(self, batch):
+        if self.incremental:
+            return super(Mav, self).extract_batch(batch)
+
+        return np.mean(batch.window_view(batch.abs, batch.num_samples), 1)
+
 
 class CurveLen(EMGFeatures):
-    def __init__(self, fs=200, incremental=False, window_size=None, window_slide=None, channels=None):
+    def __init__(self, fs=200, incremental=False, window_size=None, window_slide=None, channels=None,
+                 self_check=False):
         super(CurveLen, self).__init__()
 
         self.fs = fs
         self.name = "Curve_len"
 
-        # For feature computation, use a slice of input data. 
-        # In non-incremental mode, slice is entire passed in input
         # In incremental mode, only use most recent 'window_slide + 1' samples
-        self.slice = None
-
+        # (+1 from sample difference used in calculation)
         self.incremental = incremental
         if self.incremental:
-            self.slice = window_slide + 1  # +1 from sample difference used in calculation
-            self.scale = 1 / window_size
-            self.inc_feature = IncrementalFeature(window_size, window_slide, channels)
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, overlap=1,
+                                                  scale=1 / window_size, self_check=self_check)
 
     def get_name(self):
         return self.name
@@ -138,21 +489,37 @@ class CurveLen(EMGFeatures):
         :return: scalar feature value
         """
 
-        data_input = data_input[:self.slice]
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        if self.incremental:
+            return self.inc_feature.update_window(window, self.increment)
 
         # Number of Samples
-        n = data_input.shape[0]
+        n = window.num_samples
+
+        curve_len_feature = self.increment(window)
+
+        return curve_len_feature / n
 
-        curve_len_feature = np.sum(abs(np.diff(data_input, axis=0)), axis=0) * self.fs
+    def increment(self, window):
+        return np.sum(window.abs_diff, axis=0) * self.fs
 
+    def extract_batch(self, batch):
         if self.incremental:
-            return self.inc_feature.update(curve_len_feature * self.scale)
+            return super(CurveLen, self).extract_batch(batch)
+
+        # Number of Samples
+        n = batch.num_samples
+
+        curve_len_feature = np.sum(batch.window_view(batch.abs_diff, n - 1), axis=1) * self.fs
 
         return curve_len_feature / n
 
 
 class Zc(EMGFeatures):
-    def __init__(self, fs=200, zc_thresh=0.05, cross_val=0.0, incremental=False, window_size=None, window_slide=None, channels=None):
+    def __init__(self, fs=200, zc_thresh=0.05, cross_val=0.0, incremental=False, window_size=None, window_slide=None,
+                 channels=None, self_check=False):
         super(Zc, self).__init__()
 
         self.fs = fs
@@ -160,16 +527,12 @@ class Zc(EMGFeatures):
         self.cross_val = cross_val
         self.name = "Zc"
 
-        # For feature computation, use a slice of input data. 
-        # In non-incremental mode, slice is entire passed in input
         # In incremental mode, only use most recent 'window_slide + 1' samples
-        self.slice = None
-
+        # (+1 from sample difference used in calculation)
         self.incremental = incremental
         if self.incremental:
-            self.slice = window_slide + 1  # +1 from sample difference used in calculation
-            self.scale = 1 / window_size
-            self.inc_feature = IncrementalFeature(window_size, window_slide, channels)
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, overlap=1,
+                                                  scale=1 / window_size, self_check=self_check)
 
     def get_name(self):
         return self.name
@@ -187,41 +550,59 @@ class Zc(EMGFeatures):
         :return: scalar feature value
         """
 
-        data_input = data_input[:self.slice]
+        return self.extract_window(FeatureWindow(data_input))
 
+    def extract_window(self, window):
+        if self.incremental:
+            return self.inc_feature.update_window(window, self.increment)
+
+        # Number of Samples
+        n = window.num_samples
+
+        zc_feature = self.increment(window)
+
+        return zc_feature / n
+
+    def increment(self, window):
         # Number of Samples
-        n = data_input.shape[0]
+        n = window.num_samples
 
-        zc_feature = np.sum(
-            ((data_input[0:n - 1, :] > self.cross_val) & (data_input[1:n, :] < self.cross_val) |
-             (data_input[0:n - 1, :] < self.cross_val) & (data_input[1:n, :] > self.cross_val)) &
-            (abs(np.diff(data_input, axis=0)) > self.zc_thresh),
-            axis=0) * self.fs
+        above = window.above(self.cross_val)
+        below = window.below(self.cross_val)
+        return window.count(
+            ((above[0:n - 1, :] & below[1:n, :]) | (below[0:n - 1, :] & above[1:n, :])) &
+            (window.abs_diff > self.zc_thresh)) * self.fs
 
+    def extract_batch(self, batch):
         if self.incremental:
-            return self.inc_feature.update(zc_feature * self.scale)
+            return super(Zc, self).extract_batch(batch)
+
+        # Number of Samples
+        n = batch.num_samples
+
+        above = batch.above(self.cross_val)
+        below = batch.below(self.cross_val)
+        zc_mask = ((above[:-1, :] & below[1:, :]) | (below[:-1, :] & above[1:, :])) & (batch.abs_diff > self.zc_thresh)
+        zc_feature = batch.window_count(zc_mask, n - 1) * self.fs
 
         return zc_feature / n
 
 
 class Ssc(EMGFeatures):
-    def __init__(self, fs=200, ssc_thresh=0.15, incremental=False, window_size=None, window_slide=None, channels=None):
+    def __init__(self, fs=200, ssc_thresh=0.15, incremental=False, window_size=None, window_slide=None, channels=None,
+                 self_check=False):
         super(Ssc, self).__init__()
 
         self.fs = fs
         self.ssc_thresh = ssc_thresh
         self.name = "Ssc"
 
-        # For feature computation, use a slice of input data. 
-        # In non-incremental mode, slice is entire passed in input
         # In incremental mode, only use most recent 'window_slide + 2' samples
-        self.slice = None
-
+        # (+2 from double difference used in calculation)
         self.incremental = incremental
         if self.incremental:
-            self.slice = window_slide + 2  # +2 from double difference used in calculation
-            self.scale = 1 / window_size
-            self.inc_feature = IncrementalFeature(window_size, window_slide, channels)
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, overlap=2,
+                                                  scale=1 / window_size, self_check=self_check)
 
     def get_name(self):
         return self.name
@@ -244,32 +625,68 @@ class Ssc(EMGFeatures):
         :return: scalar feature value
         """
 
-        data_input = data_input[:self.slice]
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        if self.incremental:
+            return self.inc_feature.update_window(window, self.increment)
 
         # Number of Samples
-        n = data_input.shape[0]
+        n = window.num_samples
 
-        ssc_feature = np.sum(
-            ((data_input[1:n - 1, :] > data_input[0:n - 2, :]) & (data_input[1:n - 1, :] > data_input[2:n, :]) |
-             (data_input[1:n - 1, :] < data_input[0:n - 2, :]) & (data_input[1:n - 1, :] < data_input[2:n, :])) &
-            ((abs(data_input[1:n - 1, :] - data_input[2:n, :]) > self.ssc_thresh) |
-             (abs(data_input[1:n - 1, :] - data_input[0:n - 2, :]) > self.ssc_thresh)), axis=0
+        ssc_feature = self.increment(window)
+
+        return ssc_feature / n
+
+    def increment(self, window):
+        # Number of Samples
+        n = window.num_samples
+
+        # a local peak rises then falls, a local valley falls then rises
+        rising = window.rising
+        falling = window.falling
+        abs_diff = window.abs_diff
+        return window.count(
+            ((rising[0:n - 2, :] & falling[1:n - 1, :]) | (falling[0:n - 2, :] & rising[1:n - 1, :])) &
+            ((abs_diff[1:n - 1, :] > self.ssc_thresh) | (abs_diff[0:n - 2, :] > self.ssc_thresh))
         ) * self.fs
 
+    def extract_batch(self, batch):
         if self.incremental:
-            return self.inc_feature.update(ssc_feature * self.scale)
+            return super(Ssc, self).extract_batch(batch)
+
+        # Number of Samples
+        n = batch.num_samples
+
+        rising = batch.rising
+        falling = batch.falling
+        abs_diff = batch.abs_diff
+        ssc_mask = ((rising[:-1, :] & falling[1:, :]) | (falling[:-1, :] & rising[1:, :])) & \
+                   ((abs_diff[1:, :] > self.ssc_thresh) | (abs_diff[:-1, :] > self.ssc_thresh))
+        ssc_feature = batch.window_count(ssc_mask, n - 2) * self.fs
 
         return ssc_feature / n
 
 
 class Wamp(EMGFeatures):
-    def __init__(self, fs=200, wamp_thresh=0.05):
+    def __init__(self, fs=200, wamp_thresh=0.05, incremental=False, window_size=None, window_slide=None,
+                 channels=None, self_check=False):
         super(Wamp, self).__init__()
 
         self.fs = fs
         self.wamp_thresh = wamp_thresh
         self.name = "Wamp"
 
+        # In incremental mode, only use most recent 'window_slide + 1' samples
+        # (+1 from sample difference used in calculation)
+        # The running total counts every difference in the cached slices, but the full window computation omits the
+        # two oldest, so the threshold test of each cached difference is kept to subtract them
+        self.incremental = incremental
+        if self.incremental:
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, overlap=1,
+                                                  scale=1 / window_size, self_check=self_check)
+            self.exceed = np.zeros((self.inc_feature.cache_length, window_slide, channels), dtype=bool)
+
     def get_name(self):
         return self.name
 
@@ -287,20 +704,71 @@ class Wamp(EMGFeatures):
         :return: scalar feature value
         """
 
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        if self.incremental:
+            return self.extract_incremental(window)
+
+        return self.extract_full(window)
+
+    def extract_incremental(self, window):
+        inc = self.inc_feature
+        exceed = window.head(inc.slice).abs_diff > self.wamp_thresh
+        self.exceed[inc.cache_index] = False
+        self.exceed[inc.cache_index, :len(exceed)] = exceed
+        inc.update(window.count(exceed) * self.fs * inc.scale)
+
+        # remove the two oldest differences, once the cache covers a whole window
+        offset = 0.0
+        if inc.num_updates >= inc.cache_length:
+            offset = self.oldest_count(2) * self.fs * inc.scale
+        if inc.self_check:
+            inc.check(window, self.increment, reference=self.extract_full, offset=offset)
+        return inc.feature - offset
+
+    def oldest_count(self, num_differences):
+        """ Count of threshold crossings among the oldest differences in the cache (per channel) """
+        inc = self.inc_feature
+        count = np.zeros(inc.channels, dtype=int)
+        for age in range(num_differences):
+            # cache_index is the slot of the oldest slice, and each slice is stored newest difference first
+            slot, i = divmod(age, inc.window_slide)
+            count += self.exceed[(inc.cache_index + slot) % inc.cache_length, inc.window_slide - 1 - i]
+        return count
+
+    def extract_full(self, window):
         # Number of Samples
-        n = data_input.shape[0]
+        n = window.num_samples
+        return window.count(window.abs_diff[0:n - 2, :] > self.wamp_thresh) * self.fs / n
+
+    def increment(self, window):
+        # count every sample difference in the slice
+        return window.count(window.abs_diff > self.wamp_thresh) * self.fs
+
+    def extract_batch(self, batch):
+        if self.incremental:
+            return super(Wamp, self).extract_batch(batch)
 
-        wamp_feature = np.sum(
-            ((abs(data_input[1:n - 1, :] - data_input[0:n - 2, :])) > self.wamp_thresh), axis=0) * self.fs / n
+        # Number of Samples
+        n = batch.num_samples
+
+        wamp_feature = batch.window_count(batch.abs_diff > self.wamp_thresh, n - 2) * self.fs / n
         return wamp_feature
 
 
 class Var(EMGFeatures):
-    def __init__(self):
+    def __init__(self, incremental=False, window_size=None, window_slide=None, channels=None, self_check=False):
         super(Var, self).__init__()
 
         self.name = "Var"
 
+        # In incremental mode, only use most recent 'window_slide' samples
+        self.incremental = incremental
+        if self.incremental:
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, scale=1 / (window_size - 1),
+                                                  self_check=self_check)
+
     def get_name(self):
         return self.name
 
@@ -314,19 +782,45 @@ class Var(EMGFeatures):
         :return: scalar feature value
         """
 
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        if self.incremental:
+            return self.inc_feature.update_window(window, self.increment)
+
+        # Number of Samples
+        n = window.num_samples
+
+        var_feature = window.sum_square / (n-1)
+        return var_feature
+
+    @staticmethod
+    def increment(window):
+        return window.sum_square
+
+    def extract_batch(self, batch):
+        if self.incremental:
+            return super(Var, self).extract_batch(batch)
+
         # Number of Samples
-        n = data_input.shape[0]
+        n = batch.num_samples
 
-        var_feature = np.sum(np.square(data_input), axis=0) / (n-1)
+        var_feature = np.sum(batch.window_view(batch.square, n), axis=1) / (n-1)
         return var_feature
 
 
 class Vorder(EMGFeatures):
-    def __init__(self):
+    def __init__(self, incremental=False, window_size=None, window_slide=None, channels=None, self_check=False):
         super(Vorder, self).__init__()
 
         self.name = "Vorder"
 
+        # In incremental mode, only use most recent 'window_slide' samples.  The running total is the variance
+        self.incremental = incremental
+        if self.incremental:
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, scale=1 / (window_size - 1),
+                                                  self_check=self_check)
+
     def get_name(self):
         return self.name
 
@@ -349,19 +843,46 @@ class Vorder(EMGFeatures):
         :return: scalar feature value
         """
 
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        if self.incremental:
+            # guard against a running total drifting slightly below zero
+            return np.sqrt(np.maximum(self.inc_feature.update_window(window, self.increment), 0.0))
+
+        # Number of Samples
+        n = window.num_samples
+
+        vorder_feature = np.sqrt(window.sum_square / (n-1))
+        return vorder_feature
+
+    @staticmethod
+    def increment(window):
+        return window.sum_square
+
+    def extract_batch(self, batch):
+        if self.incremental:
+            return super(Vorder, self).extract_batch(batch)
+
         # Number of Samples
-        n = data_input.shape[0]
+        n = batch.num_samples
 
-        vorder_feature = np.sqrt(np.sum(np.square(data_input), axis=0) / (n-1))
+        vorder_feature = np.sqrt(np.sum(batch.window_view(batch.square, n), axis=1) / (n-1))
         return vorder_feature
 
 
 class LogDetect(EMGFeatures):
-    def __init__(self):
+    def __init__(self, incremental=False, window_size=None, window_slide=None, channels=None, self_check=False):
         super(LogDetect, self).__init__()
 
         self.name = "Logdetect"
 
+        # In incremental mode, only use most recent 'window_slide' samples.  The running total is the mean log value
+        self.incremental = incremental
+        if self.incremental:
+            self.inc_feature = IncrementalFeature(window_size, window_slide, channels, scale=1 / window_size,
+                                                  self_check=self_check)
+
     def get_name(self):
         return self.name
 
@@ -375,10 +896,18 @@ class LogDetect(EMGFeatures):
         :return: scalar feature value
         """
 
+        if self.incremental:
+            return math.e**self.inc_feature.update_window(FeatureWindow(data_input), self.increment)
+
         # TODO: log detect function needs to protect against log(0) (-INF) occuring
         logdetect_feature = math.e**(np.mean(np.log(abs(data_input)), axis=0))
         return logdetect_feature
 
+    @staticmethod
+    def increment(window):
+        # A single log(0) = -INF would corrupt the running total permanently, so floor at the smallest float
+        return np.sum(np.log(np.maximum(window.abs, np.finfo(float).tiny)), axis=0)
+
 
 class EmgHist(EMGFeatures):
     def __init__(self):
@@ -399,7 +928,7 @@ class EmgHist(EMGFeatures):
         data bins.
 
         This feature would result in multiple values for each channel, this would cause
-        problems since an array with more than 8 values would be returned.  Rather than returning
+        problems since an array with more than one value per channel would be returned.  Rather than returning
         the number of frequencies with amplitudes in each equally spaced bin, it returns the range
         in between the max and min amplitude for each channel
 
@@ -407,14 +936,18 @@ class EmgHist(EMGFeatures):
         :return: feature value
         """
 
-        emghist_feature = []
-        for channel in range(8):
-            emghist_range = (np.amax(np.hstack(data_input[:, channel:channel+1]))) - \
-                            (np.amin(np.hstack(data_input[:, channel:channel+1])))
-            emghist_feature.append(emghist_range)
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        emghist_feature = np.amax(window.data, axis=0) - np.amin(window.data, axis=0)
 
         return emghist_feature
 
+    def extract_batch(self, batch):
+        view = batch.window_view(batch.data, batch.num_samples)
+
+        return np.amax(view, axis=1) - np.amin(view, axis=1)
+
 
 class AR(EMGFeatures):
     def __init__(self):
@@ -431,23 +964,27 @@ class AR(EMGFeatures):
         autoregressive time series and provides information
         about the muscle's contraction state" (Tkach et. al 5)
 
-        uses time-series analysis library spectrum to compute single
-        order autoregressive model coefficients using Yule-Walker equations for each
-        channel and contructs an array made up of the autoregressive coeffcients (a sub 1 since only first order)
-        for each channel
+        computes single order autoregressive model coefficients using Yule-Walker equations for all
+        channels at once and contructs an array made up of the autoregressive coeffcients (a sub 1 since only
+        first order) for each channel
 
         :param data_input: input samples to compute feature
         :return: feature value
         """
 
-        ar_feature = []
-        for channel in range(8):
-            ar_coefficient_array, noise, reflection = aryule(np.hstack(data_input[:, channel:channel+1]), 1)
-            ar_coefficient = ar_coefficient_array[0]
-            ar_feature.append(ar_coefficient)
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        ar_coefficient_array, noise, reflection = window.aryule(1)
+        ar_feature = ar_coefficient_array[0]
 
         return ar_feature
 
+    def extract_batch(self, batch):
+        ar_coefficient_array, noise, reflection = batch.aryule(1)
+
+        return ar_coefficient_array[0]
+
 
 class Ceps(EMGFeatures):
     def __init__(self):
@@ -464,21 +1001,24 @@ class Ceps(EMGFeatures):
         change in different frequency spectrum bands of a signal." (Tkach et. al 5)
 
         since c sub 1 = -a sub 1, this will be the case for all channels since first order
-        uses time-series analysis library spectrum to compute single
-        order autoregressive model coefficients using Yule-Walker equations for each
-        channel and contructs an array made up of the cepstrum coeffcients (-a sub 1 since only first order)
-        for each channel
+        computes single order autoregressive model coefficients using Yule-Walker equations for all
+        channels at once and contructs an array made up of the cepstrum coeffcients (-a sub 1 since only
+        first order) for each channel
 
         :param data_input: input samples to compute feature
         :return: scalar feature value
 
         """
 
-        ceps_feature = []
-        for channel in range(8):
-            ar_coefficient_array, noise, reflection = aryule(np.hstack(data_input[:, channel:channel+1]), 1)
-            ar_coefficient = ar_coefficient_array[0]
-            ceps_coefficient = -ar_coefficient
-            ceps_feature.append(ceps_coefficient)
+        return self.extract_window(FeatureWindow(data_input))
+
+    def extract_window(self, window):
+        ar_coefficient_array, noise, reflection = window.aryule(1)
+        ceps_feature = -ar_coefficient_array[0]
 
         return ceps_feature
+
+    def extract_batch(self, batch):
+        ar_coefficient_array, noise, reflection = batch.aryule(1)
+
+        return -ar_coefficient_array[0]
@@ -12,52 +12,79 @@ class FeaturesSelected(object):
 
         self.vie = vie
 
-    def create_instance_list(self, channels=8):
+    @staticmethod
+    def get_window_params():
+        # feature extraction window slide & size in samples, e.g. for use with FeatureExtract.get_features_batch
 
         sample_rate = get_user_config_var('FeatureExtract.sample_rate', 200)
         timestep = get_user_config_var('timestep', 0.02)
         steps_per_window = get_user_config_var('steps_per_window', 10)
 
-        # feature extraction window slide & size in samples
         window_slide = floor(sample_rate * timestep)
         window_size = window_slide * steps_per_window
 
+        return window_size, window_slide
+
+    def create_instance_list(self, channels=8):
+
+        sample_rate = get_user_config_var('FeatureExtract.sample_rate', 200)
+
+        # feature extraction window slide & size in samples
+        window_size, window_slide = self.get_window_params()
+
+        # compare incremental features against a full recomputation each step (for validation, not for speed)
+        self_check = get_user_config_var('FeatureExtract.incremental_self_check', False)
+
         if get_user_config_var("mav", True):
             mav = features.Mav(incremental=get_user_config_var('FeatureExtract.incremental_mav', False),
-                               window_size=window_size, window_slide=window_slide, channels=channels)
+                               window_size=window_size, window_slide=window_slide, channels=channels,
+                               self_check=self_check)
             self.vie.attach_feature(mav)
 
         if get_user_config_var("curve_len", True):
             curve_len = features.CurveLen(incremental=get_user_config_var('FeatureExtract.incremental_curve_len', False),
-                                          window_size=window_size, window_slide=window_slide, channels=channels)
+                                          window_size=window_size, window_slide=window_slide, channels=channels,
+                                          self_check=self_check)
             self.vie.attach_feature(curve_len)
 
         if get_user_config_var("zc", True):
             zc = features.Zc(fs=sample_rate, zc_thresh=get_user_config_var('FeatureExtract.zc_threshold', 0.05),
                              incremental=get_user_config_var('FeatureExtract.incremental_zc', False),
-                             window_size=window_size, window_slide=window_slide, channels=channels)
+                             window_size=window_size, window_slide=window_slide, channels=channels,
+                             self_check=self_check)
             self.vie.attach_feature(zc)
 
         if get_user_config_var("ssc", True):
             ssc = features.Ssc(fs=sample_rate, ssc_thresh=get_user_config_var('FeatureExtract.ssc_threshold', 0.05),
                                incremental=get_user_config_var('FeatureExtract.incremental_ssc', False),
-                               window_size=window_size, window_slide=window_slide, channels=channels)
+                               window_size=window_size, window_slide=window_slide, channels=channels,
+                               self_check=self_check)
             self.vie.attach_feature(ssc)
 
         if get_user_config_var("wamp", False):
-            wamp = features.Wamp(fs=sample_rate, wamp_thresh=get_user_config_var('FeatureExtract.wamp_threshold', 0.05))
+            wamp = features.Wamp(fs=sample_rate, wamp_thresh=get_user_config_var('FeatureExtract.wamp_threshold', 0.05),
+                                 incremental=get_user_config_var('FeatureExtract.incremental_wamp', False),
+                                 window_size=window_size, window_slide=window_slide, channels=channels,
+                                 self_check=self_check)
             self.vie.attach_feature(wamp)
 
         if get_user_config_var("var", False):
-            var = features.Var()
+            var = features.Var(incremental=get_user_config_var('FeatureExtract.incremental_var', False),
+                               window_size=window_size, window_slide=window_slide, channels=channels,
+                               self_check=self_check)
             self.vie.attach_feature(var)
 
         if get_user_config_var("vorder", False):
-            vorder = features.Vorder()
+            vorder = features.Vorder(incremental=get_user_config_var('FeatureExtract.incremental_vorder', False),
+                                     window_size=window_size, window_slide=window_slide, channels=channels,
+                                     self_check=self_check)
             self.vie.attach_feature(vorder)
 
         if get_user_config_var("logdetect", False):
-            logdetect = features.LogDetect()
+            incremental = get_user_config_var('FeatureExtract.incremental_logdetect', False)
+            logdetect = features.LogDetect(incremental=incremental,
+                                           window_size=window_size, window_slide=window_slide, channels=channels,
+                                           self_check=self_check)
             self.vie.attach_feature(logdetect)
 
         if get_user_config_var("emghist", False):
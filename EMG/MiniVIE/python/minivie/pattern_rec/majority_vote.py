@@ -0,0 +1,153 @@
+"""
+Majority vote smoothing of classifier decisions
+
+Keeps a running vote total for every class over the last num_votes decisions.  Each new decision adds its vote and
+the decision falling out of the window removes its vote, so an update is constant time and allocates nothing.
+
+Votes can be weighted (e.g. by the classifier posterior probability of the decision) and exponentially decayed so
+that recent decisions count more.  Decay is applied by growing the weight of new votes rather than shrinking all of
+the totals each step, so it is also constant time.
+
+On ties the current output is kept, which avoids the output flickering between two classes with equal votes.
+
+Usage:
+    from pattern_rec.majority_vote import MajorityVote
+    vote = MajorityVote(num_votes=25)
+    decision_id = vote.update(classifier_decision_id)
+
+"""
+import time
+
+import numpy as np
+
+
+class MajorityVote(object):
+    def __init__(self, num_votes=25, num_classes=1, decay=1.0):
+        """
+        :param num_votes: number of recent decisions in the vote
+        :param num_classes: initial number of class ids.  Grows as larger ids are seen
+        :param decay: weight of a vote relative to the one after it.  1.0 is no decay, 0.9 halves a vote's weight
+            after about 7 steps
+        """
+        self.num_votes = max(int(num_votes), 1)
+        self.decay = float(decay)
+
+        self.ids = np.zeros(self.num_votes, dtype=int)  # circular buffer of recent decisions
+        self.weights = np.zeros(self.num_votes)  # vote weight of each, scaled by __scale
+        self.totals = np.zeros(max(num_classes, 1))  # running vote total of each class, scaled by __scale
+        self.__count = 0  # number of decisions received
+        self.__scale = 1.0  # weight multiplier of the next vote, grows by 1/decay each step
+        self.decision_id = None  # current output
+
+        # Decision latency: time from the input switching to a class until the output follows
+        self.__onset = {}  # class id: time the current run of input decisions of that class started
+        self.__last_input = None
+        self.latency = None  # seconds, of the most recent output change
+
+    def reset(self):
+        self.weights[:] = 0
+        self.totals[:] = 0
+        self.__count = 0
+        self.__scale = 1.0
+        self.decision_id = None
+        self.__onset = {}
+        self.__last_input = None
+
+    def update(self, decision_id, weight=1.0, timestamp=None):
+        """
+        Add a classifier decision to the vote
+
+        :param decision_id: class id of the new decision
+        :param weight: vote weight, e.g. the classifier confidence
+        :param timestamp: time of the decision, for latency.  Defaults to time.monotonic()
+        :return: class id with the most votes
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if decision_id >= len(self.totals):
+            self.totals = np.append(self.totals, np.zeros(decision_id + 1 - len(self.totals)))
+
+        i = self.__count % self.num_votes
+        evicted = None
+        if self.__count >= self.num_votes:
+            # remove the vote leaving the window
+            evicted = self.ids[i]
+            self.totals[evicted] -= self.weights[i]
+
+        if self.decay != 1.0:
+            self.__scale /= self.decay
+            if self.__scale > 1e100:
+                # rescale before the weights overflow.  Only relative totals matter
+                self.totals /= self.__scale
+                self.weights /= self.__scale
+                self.__scale = 1.0
+        self.ids[i] = decision_id
+        self.weights[i] = weight * self.__scale
+        self.totals[decision_id] += self.weights[i]
+        self.__count += 1
+
+        if decision_id != self.__last_input:
+            self.__onset[decision_id] = timestamp
+            self.__last_input = decision_id
+
+        self.__select(decision_id, evicted, timestamp)
+        return self.decision_id
+
+    def __select(self, decision_id, evicted, timestamp):
+        # Update the output.  Only the new vote can overtake the current output, unless the current output lost a
+        # vote (or decay shrank it), in which case all classes are searched
+        current = self.decision_id
+        if current is None:
+            leader = decision_id
+        elif self.totals[decision_id] > self.totals[current]:
+            leader = decision_id
+        else:
+            leader = current
+            if (evicted == current or self.decay != 1.0) and decision_id != current:
+                best = int(self.totals.argmax())
+                if self.totals[best] > self.totals[current]:
+                    leader = best
+
+        if leader != current:
+            self.decision_id = leader
+            if current is not None and leader in self.__onset:
+                self.latency = timestamp - self.__onset[leader]
+
+    def get_status_msg(self):
+        if self.latency is None:
+            return 'Vote Latency: --'
+        return 'Vote Latency: {:.0f}ms'.format(self.latency * 1000)
+
+
+def test_majority_vote():
+    # Offline test code comparing to a Counter over a deque
+    # test with: python3 -c "from pattern_rec.majority_vote import *; test_majority_vote()"
+    import timeit
+    from collections import Counter, deque
+
+    rng = np.random.default_rng(0)
+    num_votes, num_classes = 25, 33
+    decisions = np.repeat(rng.integers(0, num_classes, 400), rng.integers(1, 40, 400))
+    decisions = np.where(rng.random(len(decisions)) < 0.3, rng.integers(0, num_classes, len(decisions)), decisions)
+
+    vote = MajorityVote(num_votes, num_classes)
+    buffer = deque([], num_votes)
+    num_match = 0
+    for step, decision_id in enumerate(decisions):
+        buffer.append(decision_id)
+        counts = Counter(buffer)
+        result = vote.update(decision_id, timestamp=step * 0.02)
+        # equal to a majority unless tied, where the counter picks the first class seen
+        num_match += counts[result] == counts.most_common(1)[0][1]
+    print('Vote is a majority in {} of {} steps, last latency {}'.format(
+        num_match, len(decisions), vote.get_status_msg()))
+
+    n = 10000
+    t_vote = timeit.timeit(lambda: vote.update(3), number=n) / n
+    t_counter = timeit.timeit(lambda: (buffer.append(3), Counter(buffer).most_common(1)), number=n) / n
+    print('MajorityVote: {:.1f} us, Counter: {:.1f} us'.format(t_vote * 1e6, t_counter * 1e6))
+
+    decayed = MajorityVote(num_votes, num_classes, decay=0.8)
+    for decision_id in [1] * 20 + [2] * 5:
+        result = decayed.update(decision_id)
+    print('Decayed vote after 20x class 1 then 5x class 2: {}'.format(result))
@@ -1,5 +1,6 @@
 import csv
 import datetime as dt
+import json
 import logging
 import os
 import threading
@@ -7,10 +8,28 @@ import time
 from shutil import copyfile
 
 import h5py
+import numpy as np
 
 from utilities.user_config import get_user_config_var
 
 
+def _map_dataset(dataset, filename):
+    """
+    Return a hdf5 dataset without reading it, or read it if that isn't possible
+
+    Contiguous, unfiltered datasets of fixed size types are stored as a plain array in the file, and are returned as
+    a read-only numpy memory map.  Chunked (resizable) numeric datasets, as written by TrainingData.save, are returned
+    as the h5py dataset itself, which reads the rows that are sliced from the file (so the file must stay open).
+    Variable length strings are read into memory.
+    """
+    if dataset.chunks is not None:
+        return dataset if dataset.dtype.kind in 'biuf' else dataset[()]
+    offset = dataset.id.get_offset()
+    if offset is None or dataset.dtype.kind not in 'biufS':
+        return dataset[()]
+    return np.memmap(filename, mode='r', dtype=dataset.dtype, shape=dataset.shape, offset=offset)
+
+
 class TrainingData:
     """Python Class for managing machine learning and Myo training operations."""
     def __init__(self):
@@ -53,30 +72,125 @@ class TrainingData:
         # Create lock to control write access to training data
         self.__lock = threading.Lock()
 
+        # Persistence state.  The first __num_saved samples are in the file and later samples are appended on the next
+        # save.  If samples already saved are changed (e.g. by clear) the whole file is rewritten instead
+        self.__save_lock = threading.Lock()
+        self.__save_requested = threading.Event()
+        self.__save_thread = None
+        self.__num_saved = 0
+        self.__rewrite = True
+
         self.num_channels = 0
         # TODO: For now this was missing a split on comma.  Future should get features based on what is enabled
         # self.features = get_user_config_var("features", "Mav,Curve_Len,Zc,Ssc").split()
         self.features = get_user_config_var("features", "Mav,Curve_Len,Zc,Ssc").split(',')
 
-        self.data = []  # List of all feature extracted samples
-        self.id = []  # List of class indices that each sample belongs to
-        self.name = []  # Name of each class
-        self.time_stamp = []
-        self.imu = []
+        # Columnar sample store.  Each column is a preallocated numpy array whose first num_samples rows are in use.
+        # Capacity doubles as samples are added.  Use the data, id, name, time_stamp and imu properties to access
+        #   data: feature extracted samples [capacity, num_features]
+        #   id: class index that each sample belongs to
+        #   name: name of the class of each sample
+        #   time_stamp: time each sample was added
+        #   imu: IMU data as applicable to data source [capacity, num_imu]
+        self.__columns = None
+        self.__names_encoded = False  # name column still holds the undecoded bytes from a lazy load
+        self.__h5 = None  # file of a lazy load, open while columns read from it
+        self.__totals = np.zeros(len(self.motion_names), dtype=int)  # sample count of each class
         self.num_samples = 0
 
         self.reset()
 
+    @property
+    def data(self):
+        """ Feature extracted samples [num_samples, num_features] (view) """
+        return self.__column('data')
+
+    @property
+    def id(self):
+        """ Class index of each sample [num_samples] (view) """
+        return self.__column('id')
+
+    @property
+    def name(self):
+        """ Class name of each sample [num_samples] (view) """
+        with self.__lock:
+            self.__decode_names()
+        return self.__column('name')
+
+    @property
+    def time_stamp(self):
+        """ Time each sample was added [num_samples] (view) """
+        return self.__column('time_stamp')
+
+    @property
+    def imu(self):
+        """ IMU data of each sample [num_samples, num_imu] (view) """
+        return self.__column('imu')
+
+    def __column(self, key):
+        # Columns of a lazy load can be h5py datasets, which are read by the slice
+        if self.__columns is None:
+            return np.zeros(0)
+        return self.__columns[key][:self.num_samples]
+
+    def __close_file(self):
+        # Close the file of a lazy load.  Caller must hold the lock
+        if self.__h5 is not None:
+            self.__h5.close()
+            self.__h5 = None
+
+    def __decode_names(self):
+        # Decode the class names of a lazy load.  Caller must hold the lock
+        if self.__names_encoded:
+            self.__columns['name'] = np.array([val_.decode('utf-8') for val_ in self.__columns['name']], dtype=object)
+            self.__names_encoded = False
+
+    def __materialize(self):
+        # Replace memory mapped (read-only) and hdf5 dataset columns with in-memory copies.  Caller must hold the lock
+        if self.__columns is None:
+            return
+        self.__decode_names()
+        for key, column in self.__columns.items():
+            if not isinstance(column, np.ndarray) or not column.flags.writeable:
+                self.__columns[key] = np.array(column[:self.num_samples])
+        self.__close_file()
+
+    def __allocate(self, capacity, num_features, num_imu):
+        # (Re)allocate all columns with room for capacity samples, keeping any existing samples
+        # Caller must hold the lock
+        self.__decode_names()
+        columns = {'data': np.zeros((capacity, num_features)),
+                   'id': np.zeros(capacity, dtype=int),
+                   'name': np.empty(capacity, dtype=object),
+                   'time_stamp': np.zeros(capacity),
+                   'imu': np.zeros((capacity, num_imu))}
+        if self.__columns is not None:
+            for key, column in columns.items():
+                column[:self.num_samples] = self.__columns[key][:self.num_samples]
+        self.__columns = columns
+        self.__close_file()
+
+    def as_arrays(self):
+        """
+        Return the training samples and labels as numpy arrays without copying
+
+        The arrays are views into the store, so they reflect later changes.  Copy them if they must stay fixed.
+
+        :return: (data [num_samples, num_features], id [num_samples])
+        """
+        with self.__lock:
+            return self.data, self.id
+
     def reset(self):
         # Clear all data and reset the data store
 
         with self.__lock:
-            self.data = []  # List of all feature extracted samples
-            self.id = []  # List of class indices that each sample belongs to
-            self.imu = []  # IMU data as applicable to data source
-            self.name = []  # Name of each class
-            self.time_stamp = []
+            self.__columns = None
+            self.__close_file()
+            self.__names_encoded = False
+            self.__totals[:] = 0
             self.num_samples = 0
+            self.__rewrite = True
 
     def clear(self, motion_id):
         # Remove the class data for the matching index
@@ -84,16 +198,18 @@ class TrainingData:
         #     self.clear(0)
         #
         # Note to clear all data use the reset() method
-        indices = [i for i, x in enumerate(self.id) if x == motion_id]
-
         with self.__lock:
-            for rev in indices[::-1]:
-                del(self.time_stamp[rev])
-                del(self.name[rev])
-                del(self.id[rev])
-                del(self.imu[rev])
-                del(self.data[rev])
-                self.num_samples -= 1
+            if self.num_samples == 0:
+                return
+            self.__materialize()
+            keep = self.id != motion_id
+            num_keep = int(np.count_nonzero(keep))
+            for column in self.__columns.values():
+                column[:num_keep] = column[:self.num_samples][keep]
+            self.num_samples = num_keep
+            if motion_id < len(self.__totals):
+                self.__totals[motion_id] = 0
+            self.__rewrite = True
 
         if self.num_samples == 0:
             self.reset()
@@ -110,35 +226,73 @@ class TrainingData:
         # New Data marked with:
         # time_stamp, name, id, data
         # optionally add IMU data
+        data_ = np.ravel(np.asarray(data_, dtype=float))
+        imu_ = np.ravel(np.asarray(imu_, dtype=float))
+
         with self.__lock:
-            self.time_stamp.append(time.time())
-            self.name.append(name_)
-            self.id.append(id_)
-            self.data.append(data_)
-            self.imu.append(imu_)
-            self.num_samples += 1
+            self.__add_row(data_, id_, name_, imu_, time.time())
+
+    def __add_row(self, data_, id_, name_, imu_, time_stamp_):
+        # Append one sample to the columns.  Caller must hold the lock
+        if self.__columns is None:
+            self.__allocate(16, data_.size, imu_.size)
+        elif data_.size != self.__columns['data'].shape[1]:
+            logging.error('Training sample has {} features, expected {}.  Sample not added'.format(
+                data_.size, self.__columns['data'].shape[1]))
+            return
+        elif self.num_samples == len(self.__columns['id']):
+            self.__allocate(2 * self.num_samples, data_.size, self.__columns['imu'].shape[1])
+
+        i = self.num_samples
+        self.__columns['time_stamp'][i] = time_stamp_
+        self.__columns['name'][i] = name_
+        self.__columns['id'][i] = id_
+        self.__columns['data'][i] = data_
+        if imu_.size == self.__columns['imu'].shape[1]:
+            self.__columns['imu'][i] = imu_
+        else:
+            self.__columns['imu'][i] = np.nan
+        self.num_samples += 1
+
+        if id_ >= len(self.__totals):
+            self.__totals = np.append(self.__totals, np.zeros(id_ + 1 - len(self.__totals), dtype=int))
+        self.__totals[id_] += 1
 
     def get_totals(self, motion_id=None):
         # Return a list of the total sample counts for each class
         # Example:
         #     a.get_totals(10)
         #     a.get_totals()
+        #
+        # Counts are maintained as samples are added and cleared
         num_motions = len(self.motion_names)
 
         if motion_id is None:
             total = [0] * num_motions
-            for c_ in range(num_motions):
-                total[c_] = self.id.count(c_)
-                logging.debug('{} [{}]'.format(self.motion_names[c_],total[c_]))
+            count = min(num_motions, len(self.__totals))
+            total[:count] = self.__totals[:count].tolist()
+        elif motion_id < len(self.__totals):
+            total = int(self.__totals[motion_id])
         else:
-            total = self.id.count(motion_id)
+            total = 0
 
         return total
 
-    def load(self):
+    def load(self, lazy=False):
         # Data loaded with:
         # time_stamp, name, id, data, imu
+        #
+        # Samples left in the journal by an interrupted save are restored after the file is read
+        #
+        # With lazy=True, the data, imu and time_stamp columns are not read on load.  Contiguous datasets (e.g. large
+        # merged files) are memory mapped, and chunked datasets (as written by save) are read from the file, which is
+        # kept open, each time the column is accessed.  Class names are only decoded when first needed.  The columns
+        # are copied into memory when samples are added or cleared, or the file is saved.
+
+        self.__load_file(lazy)
+        self.__replay_journal()
 
+    def __load_file(self, lazy=False):
         if not os.path.isfile(self.filename + self.file_ext):
             logging.info('File Not Found: ' + self.filename + self.file_ext)
             return
@@ -153,32 +307,68 @@ class TrainingData:
             logging.info('Error Loading file: ' + self.filename + self.file_ext)
             return
 
-        # Extract info from hdf5, but don't update object until we verify it's OK data
-
-        id = h5['/data/id'][:].tolist()
-        motion_name = h5['/data/name'][:].tolist()
-        for idx_, val_ in enumerate(motion_name):
-            motion_name[idx_] = val_.decode('utf-8')
-        data = h5['/data/data'][:].tolist()
-        imu = h5['/data/imu'][:].tolist()
-        time_stamp = h5['/data/time_stamp'][:].tolist()
-        num_samples = len(id)
-        # Done with file
-        h5.close()
-
-        # check values.  most common issue would be if labels don't match data
-        if num_samples == len(data) and num_samples == len(motion_name) and num_samples == len(time_stamp):
-            with self.__lock:
-                self.id = id
-                self.name = motion_name
-                self.data = data
-                self.time_stamp = time_stamp
-                self.imu = imu
-                self.num_samples = num_samples
-
-                # self.motion_names = motion_name
+        # check dataset lengths before reading anything.  An append interrupted part way leaves the datasets with
+        # different lengths, and the num_samples attribute (written last) at the count before the append.  Only the
+        # samples in every dataset are read, and any others are restored from the journal
+        try:
+            lengths = [len(h5['/data/' + key]) for key in ('id', 'data', 'name', 'time_stamp', 'imu')]
+        except KeyError:
+            h5.close()
+            logging.error('Invalid training data file with missing datasets')
+            return
+        num_samples = min(lengths + [int(h5['/data'].attrs.get('num_samples', min(lengths)))])
+        truncated = any(length != num_samples for length in lengths)
+        if truncated:
+            logging.warning('Training data datasets have mismatched lengths {}.  Loading the first {} samples'.format(
+                lengths, num_samples))
+        if num_samples == 0:
+            h5.close()
+            self.reset()
+            return
+
+        # Extract info from hdf5
+        f = self.filename + self.file_ext
+        id = h5['/data/id'][:num_samples]
+        if lazy:
+            def map_column(key, ndim):
+                column = _map_dataset(h5['/data/' + key], f)
+                if isinstance(column, h5py.Dataset) and column.ndim == ndim:
+                    return column  # rows past num_samples are never sliced
+                return column[:num_samples].reshape((num_samples, -1)[:ndim])
+            motion_name = map_column('name', 1)
+            data = map_column('data', 2)
+            imu = map_column('imu', 2)
+            time_stamp = map_column('time_stamp', 1)
+            keep_open = any(isinstance(column, h5py.Dataset) for column in (data, imu, time_stamp))
         else:
-            logging.error('Invalid training data with mismatched data lengths')
+            motion_name = np.array([val_.decode('utf-8') for val_ in h5['/data/name'][:num_samples]], dtype=object)
+            data = h5['/data/data'][:num_samples]
+            imu = h5['/data/imu'][:num_samples]
+            time_stamp = h5['/data/time_stamp'][:num_samples]
+            data = data.reshape(num_samples, -1)
+            imu = imu.reshape(num_samples, -1)
+            keep_open = False
+
+        with self.__lock:
+            self.__close_file()
+            if keep_open:
+                self.__h5 = h5
+            else:
+                # Done with file
+                h5.close()
+            self.__columns = {'data': data,
+                              'id': id.astype(int),
+                              'name': motion_name,
+                              'time_stamp': time_stamp,
+                              'imu': imu}
+            self.__names_encoded = lazy
+            self.num_samples = num_samples
+            self.__totals = np.bincount(self.__columns['id'], minlength=len(self.motion_names))
+            self.__num_saved = num_samples
+            # samples past num_samples are dropped from the file at the next save
+            self.__rewrite = truncated
+
+            # self.motion_names = motion_name
 
     def file_saved(self):
         if not os.path.isfile(self.filename + self.file_ext):
@@ -192,23 +382,183 @@ class TrainingData:
         return True
 
     def save(self):
+        """
+        Write the training data to disk
+
+        Samples added since the last save are appended to the file, so the cost of a save does not grow with the
+        session.  The file is rewritten (to a temporary file which then replaces it) only when it does not match the
+        samples already saved, e.g. after clear() or reset(), or when it does not exist yet.
+
+        New samples are written to a journal and synced before the file is modified.  If a save is interrupted, the
+        next load() restores them from the journal.
+        """
+        with self.__save_lock:
+            f = self.filename + self.file_ext
+            can_append = self.__can_append(f)
+
+            # take a consistent copy of the rows to write
+            with self.__lock:
+                rewrite = self.__rewrite or not can_append
+                if rewrite or self.__h5 is not None:
+                    # the file is about to be replaced or appended to, so stop mapping and reading it
+                    self.__materialize()
+                self.__decode_names()
+                start = 0 if rewrite else self.__num_saved
+                num_samples = self.num_samples
+                rows = {key: np.array(self.__column(key)[start:])
+                        for key in ('time_stamp', 'id', 'name', 'data', 'imu')}
+                self.__rewrite = False
+
+            try:
+                if rewrite:
+                    self.__write_file(f, rows)
+                else:
+                    self.__write_journal(start, rows)
+                    self.__append_file(f, rows)
+                self.__delete_journal()
+            except Exception:
+                with self.__lock:
+                    self.__rewrite = True
+                raise
+
+            self.__num_saved = num_samples
+            logging.info('Saved {} ({} samples {})'.format(
+                self.filename, len(rows['id']), 'written' if rewrite else 'appended'))
+
+    def save_async(self):
+        """ Request a save on the background writer thread and return immediately """
+        if self.__save_thread is None or not self.__save_thread.is_alive():
+            self.__save_thread = threading.Thread(target=self.__save_loop, name='TrainingDataSave', daemon=True)
+            self.__save_thread.start()
+        self.__save_requested.set()
+
+    def __save_loop(self):
+        # Background writer.  Requests made while a save is running are merged into one more save
+        while True:
+            self.__save_requested.wait()
+            self.__save_requested.clear()
+            try:
+                self.save()
+            except (IOError, OSError, ValueError) as e:
+                logging.error('Failed to save training data: {}'.format(e))
+
+    def __can_append(self, f):
+        # Return True if the file holds exactly the samples already saved, in resizable datasets
+        if not os.path.isfile(f):
+            return False
+        try:
+            with h5py.File(f, 'r') as h5:
+                group = h5['data']
+                motion_names = [a.decode('utf-8') for a in group['motion_names'][:]]
+                return (group['data'].maxshape[0] is None
+                        and group['data'].ndim == 2
+                        and group['imu'].maxshape[0] is None
+                        and len(group['id']) == self.__num_saved
+                        and motion_names == list(self.motion_names))
+        except (IOError, OSError, KeyError):
+            return False
+
+    def __write_file(self, f, rows):
+        # Write all samples to a new file, then replace the existing one so the file on disk is always complete
         t = dt.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        h5 = h5py.File(self.filename + self.file_ext, 'w')
-        group = h5.create_group('data')
-        group.attrs['description'] = t + 'Myo Armband Raw EMG Data'
-        group.attrs['num_channels'] = self.num_channels
-        group.attrs['num_features'] = len(self.features)
-        group.attrs['num_samples'] = self.num_samples
-        group.attrs['feature_names'] = [a.encode('utf8') for a in self.features]
-        group.create_dataset('time_stamp', data=self.time_stamp)
-        group.create_dataset('id', data=self.id)
-        encoded = [a.encode('utf8') for a in self.name]
-        group.create_dataset('name', data=encoded)
-        group.create_dataset('data', data=self.data)
-        group.create_dataset('imu', data=self.imu)
-        group.create_dataset('motion_names', data=[a.encode('utf8') for a in self.motion_names])  # utf-8
-        h5.close()
-        logging.info('Saved ' + self.filename)
+        num_samples = len(rows['id'])
+        num_features = rows['data'].shape[1] if rows['data'].ndim == 2 else 0
+        num_imu = rows['imu'].shape[1] if rows['imu'].ndim == 2 else 0
+
+        tmp = f + '.tmp'
+        try:
+            with h5py.File(tmp, 'w', libver='latest') as h5:
+                group = h5.create_group('data')
+                group.attrs['description'] = t + 'Myo Armband Raw EMG Data'
+                group.attrs['num_channels'] = self.num_channels
+                group.attrs['num_features'] = len(self.features)
+                group.attrs['num_samples'] = num_samples
+                group.attrs['feature_names'] = [a.encode('utf8') for a in self.features]
+                chunk = 1024
+                group.create_dataset('time_stamp', data=rows['time_stamp'], maxshape=(None,), chunks=(chunk,))
+                group.create_dataset('id', data=rows['id'], maxshape=(None,), chunks=(chunk,))
+                group.create_dataset('name', data=[a.encode('utf8') for a in rows['name']],
+                                     dtype=h5py.string_dtype('utf-8'), maxshape=(None,), chunks=(chunk,))
+                if num_features:
+                    group.create_dataset('data', data=rows['data'], maxshape=(None, num_features),
+                                         chunks=(chunk, num_features))
+                else:
+                    # width is unknown until the first sample is added, so the file will be rewritten then
+                    group.create_dataset('data', data=np.zeros((0, 0)))
+                if num_imu:
+                    group.create_dataset('imu', data=rows['imu'], maxshape=(None, num_imu), chunks=(chunk, num_imu))
+                else:
+                    group.create_dataset('imu', data=np.zeros((num_samples, 0)))
+                group.create_dataset('motion_names', data=[a.encode('utf8') for a in self.motion_names])  # utf-8
+        except Exception:
+            # don't leave a partly written file behind
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+            raise
+        os.replace(tmp, f)
+
+    @staticmethod
+    def __append_file(f, rows):
+        # Extend the resizable datasets with the new samples only
+        with h5py.File(f, 'a', libver='latest') as h5:
+            h5.swmr_mode = True
+            group = h5['data']
+            start = len(group['id'])
+            num_new = len(rows['id'])
+            for key in ('time_stamp', 'id', 'name', 'data', 'imu'):
+                values = rows[key]
+                if key == 'name':
+                    values = [a.encode('utf8') for a in values]
+                group[key].resize(start + num_new, axis=0)
+                group[key][start:] = values
+            # the datasets are written one after another, so commit the new length only once all of them are
+            h5.flush()
+            group.attrs['num_samples'] = start + num_new
+            h5.flush()
+
+    def __journal_file(self):
+        return self.filename + '.journal'
+
+    def __write_journal(self, start, rows):
+        # Append one line per new sample and sync to disk before the hdf5 file is touched
+        if not len(rows['id']):
+            return
+        with open(self.__journal_file(), 'a') as journal:
+            for i in range(len(rows['id'])):
+                record = {'index': int(start + i),
+                          'time_stamp': float(rows['time_stamp'][i]),
+                          'id': int(rows['id'][i]),
+                          'name': rows['name'][i],
+                          'data': rows['data'][i].tolist(),
+                          'imu': rows['imu'][i].tolist()}
+                journal.write(json.dumps(record) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def __delete_journal(self):
+        if os.path.isfile(self.__journal_file()):
+            os.remove(self.__journal_file())
+
+    def __replay_journal(self):
+        # Restore samples that were journaled but may not have reached the file.  Records already in the file are
+        # skipped, as is a partially written last line
+        if not os.path.isfile(self.__journal_file()):
+            return
+        num_restored = 0
+        with open(self.__journal_file(), 'r') as journal:
+            with self.__lock:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record['index'] != self.num_samples:
+                        continue
+                    self.__add_row(np.array(record['data'], dtype=float), record['id'], record['name'],
+                                   np.array(record['imu'], dtype=float), record['time_stamp'])
+                    num_restored += 1
+        if num_restored:
+            logging.warning('Restored {} training samples from journal {}'.format(num_restored, self.__journal_file()))
 
     def copy(self):
         # if a training file exists, copy it to a datestamped name
@@ -225,7 +575,8 @@ class TrainingData:
         src_ = self.filename + self.file_ext
         dst_ = self.filename + '_' + t + self.file_ext
         try:
-            copyfile(src_, dst_)
+            with self.__save_lock:
+                copyfile(src_, dst_)
         except IOError:
             logging.info('Failed to create file backup')
 
@@ -242,7 +593,9 @@ class TrainingData:
             return
 
         try:
-            os.remove(f)
+            with self.__save_lock:
+                os.remove(f)
+                self.__delete_journal()
             logging.info('Deleted ' + self.filename)
         except IOError:
             logging.info('Failed to delete file: ' + f)
@@ -275,4 +628,39 @@ class TrainingData:
 
         # Pull mapped image name corresponding to motion name
         image_name = mapped_image_names[mapped_motion_names.index(motion_name)]
-        return image_name
\ No newline at end of file
+        return image_name
+
+def test_training_data():
+    # Offline test code saving, reloading and appending to training data in a temporary folder
+    # test with: python3 -c "from pattern_rec.training_data import *; test_training_data()"
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as folder:
+        td = TrainingData()
+        td.filename = os.path.join(folder, 'TRAINING_DATA')
+        f = td.filename + td.file_ext
+
+        # an empty set (e.g. after Cmd:ClearAll) saves and reloads as empty
+        td.reset()
+        td.save()
+        td = TrainingData()
+        td.filename = os.path.join(folder, 'TRAINING_DATA')
+        td.load()
+        assert td.num_samples == 0, 'Empty set reloaded with {} samples'.format(td.num_samples)
+        assert not os.path.isfile(f + '.tmp'), 'Temporary file left after save'
+
+        # samples added to the reloaded empty set are written, then appended
+        for i in range(5):
+            td.add_data(np.full(8, i), i % 2, td.motion_names[i % 2], imu_=np.arange(4))
+        td.save()
+        for i in range(3):
+            td.add_data(np.full(8, i), 1, td.motion_names[1])
+        td.save()
+
+        reloaded = TrainingData()
+        reloaded.filename = td.filename
+        reloaded.load()
+        assert reloaded.num_samples == 8, 'Reloaded {} of 8 samples'.format(reloaded.num_samples)
+        assert np.array_equal(reloaded.data, td.data)
+        assert reloaded.get_totals()[:2] == [3, 5]
+        print('Saved, reloaded and appended {} samples'.format(reloaded.num_samples))
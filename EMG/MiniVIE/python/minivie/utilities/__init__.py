@@ -1,35 +1,38 @@
-import time
 from urllib.parse import urlparse
 
+from utilities.scheduler import FixedRateScheduler
+
 
 class FixedRateLoop(object):
     """
     A class for creating a fixed rate loop that compensates for function execution time.
 
+    Iterations start on fixed deadlines; timing statistics are available from self.scheduler
+
     Revisions:
         2018FEB16 Armiger: Created
     """
 
-    def __init__(self, dt):
+    def __init__(self, dt, overrun='skip'):
         self.dt = dt
         self.enabled = True
+        self.scheduler = FixedRateScheduler(dt, overrun=overrun)
 
     def loop(self, loop_function):
         """Runs the function provided at fixed rate. This is a blocking call"""
 
         time_elapsed = 0.0
+        self.scheduler.dt = self.dt
+        self.scheduler.start()
         while self.enabled:
             try:
-                # Fixed rate loop.  get start time, run model, get end time; delay for duration
-                time_begin = time.time()
+                # Fixed rate loop.  run function, then delay until the next deadline
+                self.scheduler.begin()
 
                 # run the fixed rate function
                 loop_function()
 
-                time_end = time.time()
-                time_elapsed = time_end - time_begin
-                if self.dt > time_elapsed:
-                    time.sleep(self.dt - time_elapsed)
+                time_elapsed = self.scheduler.wait()
 
                 # print('{0} dt={1:6.3f}'.format(output['decision'], time_elapsed))
 
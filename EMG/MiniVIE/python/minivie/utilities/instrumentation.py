@@ -0,0 +1,171 @@
+"""
+Low overhead timing probes for the control loop
+
+A probe times a block of code or a function call.  The last `window` durations of each probe are kept in a
+preallocated array for rolling statistics, and every duration is also counted in a scheduler.TimingHistogram, so the
+probes can be reported as the stages of a FixedRateScheduler.  The self time (excluding nested probes) of every call
+stack is summed so that a flame graph can be drawn from a run.
+
+Usage:
+    from utilities import instrumentation
+
+    @instrumentation.probe('classify')
+    def predict(self, features):
+        ...
+
+    with instrumentation.probe('sink'):
+        sink.send_joint_angles(position, velocity)
+
+    print(instrumentation.get_status_msg())
+    scheduler.stages = instrumentation.get_histograms(['classify', 'sink'])
+    instrumentation.dump_folded('trace.folded')  # view with flamegraph.pl or https://www.speedscope.app
+
+Set instrumentation.enabled = False to turn off all probes.
+
+"""
+import functools
+import logging
+import threading
+import time
+
+import numpy as np
+
+from utilities.scheduler import TimingHistogram
+
+logger = logging.getLogger(__name__)
+
+enabled = True  # when False, probes do nothing
+
+_probes = {}  # name: Probe
+_folded = {}  # call stack (tuple of probe names): total self time, seconds
+_local = threading.local()  # stack of open probes per thread
+
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+class Probe(object):
+    """ Named timer usable as a context manager or function decorator """
+
+    def __init__(self, name, window=500):
+        """
+        :param name: probe name, used as the frame name in traces
+        :param window: number of recent durations kept for rolling statistics
+        """
+        self.name = name
+        self.durations = np.zeros(window)
+        self.histogram = TimingHistogram()
+        self.count = 0  # total calls
+        self.total = 0.0  # total time, seconds
+        self.max = 0.0
+
+    def __enter__(self):
+        if enabled:
+            # frame is [probe, start time, time spent in nested probes]
+            _stack().append([self, time.perf_counter(), 0.0])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stack = _stack()
+        if not stack or stack[-1][0] is not self:
+            # entered while disabled
+            return False
+        now = time.perf_counter()
+        names = tuple(frame[0].name for frame in stack)
+        _, start, child_time = stack.pop()
+        if not enabled:
+            # disabled part way through this probe.  The frame is dropped without recording
+            return False
+        duration = now - start
+        if stack:
+            stack[-1][2] += duration
+        _folded[names] = _folded.get(names, 0.0) + duration - child_time
+        self.record(duration)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+    def record(self, duration):
+        self.durations[self.count % len(self.durations)] = duration
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.histogram.add(duration)
+
+    def get_stats(self):
+        """ Mean, p50, p99 and max (seconds) over the rolling window, and the total call count """
+        recent = self.durations[:min(self.count, len(self.durations))]
+        if not len(recent):
+            return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        p50, p99 = np.percentile(recent, [50, 99])
+        return {'count': self.count, 'mean': float(recent.mean()), 'p50': float(p50), 'p99': float(p99),
+                'max': float(recent.max())}
+
+
+def probe(name):
+    """ Return the probe with the given name, creating it if needed """
+    try:
+        return _probes[name]
+    except KeyError:
+        _probes[name] = Probe(name)
+        return _probes[name]
+
+
+def get_stats():
+    """ Rolling statistics of every probe, {name: {'count', 'mean', 'p50', 'p99', 'max'}} """
+    return {name: p.get_stats() for name, p in _probes.items()}
+
+
+def get_histograms(names):
+    """
+    Duration histograms of the named probes, creating the probes if needed
+
+    :param names: probe names
+    :return: {name: TimingHistogram}, e.g. to set as FixedRateScheduler.stages
+    """
+    return {name: probe(name).histogram for name in names}
+
+
+def get_status_msg():
+    """ One line summary of each probe: mean/p99 in ms """
+    msg = []
+    for name, stats in get_stats().items():
+        if stats['count']:
+            msg.append('{} {:.2f}/{:.2f}'.format(name, stats['mean'] * 1000, stats['p99'] * 1000))
+    return 'Probe mean/p99 (ms): ' + ', '.join(msg)
+
+
+def dump_folded(filename):
+    """
+    Write the accumulated call stacks in folded (collapsed stack) format for flame graph tools
+
+    Each line is the stack of probe names separated by ';' followed by the self time in microseconds
+
+    :param filename: output file name
+    """
+    with open(filename, 'w') as f:
+        for names, self_time in sorted(_folded.items()):
+            f.write('{} {}\n'.format(';'.join(names), int(round(self_time * 1e6))))
+    logger.info('Wrote timing trace {} ({} stacks)'.format(filename, len(_folded)))
+
+
+def reset():
+    """ Clear all statistics and traces """
+    _folded.clear()
+    for p in _probes.values():
+        p.durations[:] = 0
+        p.count = 0
+        p.total = 0.0
+        p.max = 0.0
+        p.histogram.reset()
@@ -0,0 +1,184 @@
+"""
+Fixed rate loop scheduling with timing statistics
+
+FixedRateScheduler runs a loop on absolute deadlines (start + n * dt) of a monotonic clock, so the time spent in each
+iteration, and any error in sleep, does not accumulate as drift.  When an iteration overruns its deadline the
+scheduler either skips the missed deadlines and waits for the next one ('skip'), or runs the missed iterations back
+to back ('catchup', limited to max_catchup iterations).
+
+Timing is recorded in fixed bin histograms, so recording is constant time and allocates nothing:
+    jitter      lateness of the start of each iteration relative to its deadline
+    step        duration of each iteration
+    <stage>     duration of each named stage of an iteration, from mark() or from histograms set in stages (e.g. the
+                instrumentation probes of each stage)
+
+Usage:
+    scheduler = FixedRateScheduler(0.02)
+    scheduler.start()
+    while True:
+        scheduler.begin()
+        get_features()
+        scheduler.mark('features')
+        classify()
+        scheduler.mark('classify')
+        scheduler.wait()
+
+"""
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class TimingHistogram(object):
+    """ Histogram of durations with fixed bins.  Values beyond max_time are counted in the last bin """
+
+    def __init__(self, max_time=0.1, resolution=1e-4):
+        """
+        :param max_time: largest duration resolved, seconds
+        :param resolution: bin width, seconds
+        """
+        self.resolution = resolution
+        self.counts = np.zeros(int(round(max_time / resolution)) + 1, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        i = int(value / self.resolution)
+        self.counts[min(max(i, 0), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """ Upper edge of the bin containing the p-th percentile (0-100) """
+        if not self.count:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.counts), p / 100.0 * self.count))
+        return min((i + 1) * self.resolution, self.max)
+
+
+class FixedRateScheduler(object):
+    def __init__(self, dt, overrun='skip', max_catchup=5, clock=time.perf_counter, sleep=time.sleep):
+        """
+        :param dt: loop period, seconds
+        :param overrun: 'skip' to drop missed deadlines, or 'catchup' to run missed iterations back to back
+        :param max_catchup: most iterations run back to back before skipping the rest
+        :param clock: monotonic clock function returning seconds
+        :param sleep: function that sleeps for a number of seconds
+        """
+        if overrun not in ('skip', 'catchup'):
+            raise ValueError('Invalid overrun mode "{}", expected "skip" or "catchup"'.format(overrun))
+        self.dt = dt
+        self.overrun = overrun
+        self.max_catchup = max_catchup
+        self.clock = clock
+        self.sleep = sleep
+
+        self.deadline = None  # start time of the current iteration
+        self.iterations = 0
+        self.overruns = 0  # iterations that ended after the next deadline
+        self.skipped = 0  # deadlines skipped after overruns
+        self.step_last = 0.0  # duration of the last iteration
+
+        self.jitter = TimingHistogram()
+        self.step = TimingHistogram()
+        self.stages = {}  # stage name: TimingHistogram
+        self.__begin_time = None
+        self.__mark_time = None
+
+    def start(self):
+        """ Set the first deadline to now """
+        self.deadline = self.clock()
+
+    def reset_stats(self):
+        self.iterations = self.overruns = self.skipped = 0
+        self.jitter.reset()
+        self.step.reset()
+        for histogram in self.stages.values():
+            histogram.reset()
+
+    def begin(self):
+        """ Call at the start of each iteration """
+        now = self.clock()
+        if self.deadline is None:
+            self.deadline = now
+        self.jitter.add(now - self.deadline)
+        self.__begin_time = self.__mark_time = now
+
+    def mark(self, stage):
+        """ Record the time since the previous mark (or begin) as the duration of a stage """
+        now = self.clock()
+        if self.__mark_time is None:
+            self.__mark_time = now
+            return
+        try:
+            histogram = self.stages[stage]
+        except KeyError:
+            histogram = self.stages[stage] = TimingHistogram()
+        histogram.add(now - self.__mark_time)
+        self.__mark_time = now
+
+    def wait(self):
+        """
+        Call at the end of each iteration.  Sleeps until the next deadline
+
+        :return: duration of the iteration, seconds
+        """
+        now = self.clock()
+        if self.deadline is None:
+            self.deadline = now
+        if self.__begin_time is not None:
+            self.step_last = now - self.__begin_time
+            self.step.add(self.step_last)
+        self.__begin_time = self.__mark_time = None
+        self.iterations += 1
+
+        self.deadline += self.dt
+        if now > self.deadline:
+            self.overruns += 1
+            behind = int((now - self.deadline) // self.dt)  # whole periods missed beyond the next deadline
+            if self.overrun == 'skip':
+                behind += 1
+            else:
+                behind = max(behind - self.max_catchup, 0)
+            self.deadline += behind * self.dt
+            self.skipped += behind
+            logger.warning('Timing Overload: {:.1f}ms'.format(self.step_last * 1000))
+
+        if self.deadline > now:
+            self.sleep(self.deadline - now)
+        return self.step_last
+
+    def get_status_msg(self):
+        """ Jitter and step time percentiles, and the stage with the largest p99 """
+        msg = 'Step p50/p99/max: {:.1f}/{:.1f}/{:.1f}ms'.format(
+            self.step.percentile(50) * 1000, self.step.percentile(99) * 1000, self.step.max * 1000)
+        msg += ' Jitter p50/p99/max: {:.1f}/{:.1f}/{:.1f}ms'.format(
+            self.jitter.percentile(50) * 1000, self.jitter.percentile(99) * 1000, self.jitter.max * 1000)
+        msg += ' Overruns: {}'.format(self.overruns)
+        if self.stages:
+            name, histogram = max(self.stages.items(), key=lambda item: item[1].percentile(99))
+            msg += ' Slowest: {} {:.1f}ms p99'.format(name, histogram.percentile(99) * 1000)
+        return msg
+
+    def get_stage_table(self):
+        """ Multi-line table of the timing percentiles of each stage, ms """
+        lines = ['{:<12} {:>8} {:>8} {:>8} {:>8}'.format('stage', 'mean', 'p50', 'p99', 'max')]
+        for name, histogram in [('jitter', self.jitter), ('step', self.step)] + list(self.stages.items()):
+            lines.append('{:<12} {:8.2f} {:8.2f} {:8.2f} {:8.2f}'.format(
+                name, histogram.mean * 1000, histogram.percentile(50) * 1000, histogram.percentile(99) * 1000,
+                histogram.max * 1000))
+        return '\n'.join(lines)
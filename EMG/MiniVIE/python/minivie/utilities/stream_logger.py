@@ -0,0 +1,185 @@
+"""
+Background HDF5 logger for streamed data
+
+Blocks of data (e.g. raw serial bytes) are handed to log() from the acquisition thread, which only places them on a
+bounded queue.  A writer thread appends them to resizable, chunked datasets in a single open file and flushes on a
+timer, so logging does not stall acquisition.  If the writer falls behind and the queue fills, blocks are dropped
+and counted rather than blocking the caller.
+
+The file is opened by start(), so a file that can't be created raises there, in the caller's thread.  If a write
+fails later, the writer stops, error holds the reason, and log() drops every new block.
+
+File layout:
+    data            all logged values, concatenated in arrival order
+    block_offset    index into data of the first value of each block
+    block_time      time.monotonic() timestamp of each block
+    attrs           'start_time' (wall clock when the logger started) and 'dropped_blocks'
+
+Usage:
+    from utilities.stream_logger import StreamLogger
+    log = StreamLogger('2023-01-01_00-00-00_CPCH_RAWBYTES.hdf5', dtype=np.uint8)
+    log.start()  # raises OSError if the file can't be opened
+    log.log(raw_bytes)
+    log.close()
+
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+import h5py
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class StreamLogger(threading.Thread):
+    def __init__(self, filename, dtype=np.uint8, queue_size=1000, chunk_size=65536, flush_interval=1.0):
+        """
+        Append-mode HDF5 logger with a bounded queue and a background writer thread
+
+        If the file already exists, new data is appended to its datasets.
+
+        :param filename: hdf5 file name
+        :param dtype: numpy data type of the logged values
+        :param queue_size: maximum number of blocks waiting to be written before new blocks are dropped
+        :param chunk_size: hdf5 chunk size (number of values) of the data dataset
+        :param flush_interval: seconds between writes to disk
+        """
+        threading.Thread.__init__(self)
+        self.name = 'StreamLogger'
+        self.daemon = True
+
+        self.filename = filename
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+
+        self.dropped_blocks = 0
+        self.logged_blocks = 0
+        self._dropped_written = 0  # dropped_blocks already recorded in the file
+        self.error = None  # reason the writer stopped, if a write failed
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._h5file = None
+
+    def log(self, block, timestamp=None):
+        """
+        Queue a block of data to be written.  Never blocks
+
+        :param block: array-like of values to log
+        :param timestamp: monotonic time of the block.  Defaults to time.monotonic()
+        :return: False if the block was dropped (the queue was full or the writer stopped)
+        """
+        if self.error is not None:
+            self.dropped_blocks += 1
+            return False
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if isinstance(block, (bytes, bytearray, memoryview)):
+            block = np.frombuffer(bytes(block), dtype=self.dtype)
+        try:
+            self._queue.put_nowait((np.asarray(block, dtype=self.dtype).ravel(), timestamp))
+        except queue.Full:
+            self.dropped_blocks += 1
+            return False
+        return True
+
+    def start(self):
+        """
+        Open the file and start the writer thread
+
+        :raises OSError: if the file can't be opened or created
+        """
+        self._h5file = self._open()
+        threading.Thread.start(self)
+
+    def close(self):
+        """ Write any queued blocks, then stop the writer thread and close the file """
+        if not self.is_alive():
+            if self._h5file is not None and self.ident is None:
+                # opened but never started
+                self._h5file.close()
+                self._h5file = None
+            return
+        self._queue.put(None)  # wake the writer and tell it to finish
+        self.join()
+        if self.dropped_blocks:
+            logger.warning('{}: dropped {} of {} blocks'.format(
+                self.filename, self.dropped_blocks, self.dropped_blocks + self.logged_blocks))
+
+    def get_status_msg(self):
+        if self.error is not None:
+            return f'Log: stopped ({self.error}), {self.dropped_blocks} dropped'
+        return f'Log: {self.logged_blocks} blocks, {self.dropped_blocks} dropped'
+
+    def _open(self):
+        h5file = h5py.File(self.filename, 'a', libver='latest')
+        if 'data' not in h5file:
+            h5file.create_dataset('data', shape=(0,), maxshape=(None,), dtype=self.dtype,
+                                  chunks=(self.chunk_size,))
+            h5file.create_dataset('block_offset', shape=(0,), maxshape=(None,), dtype=np.int64, chunks=(1024,))
+            h5file.create_dataset('block_time', shape=(0,), maxshape=(None,), dtype=np.float64, chunks=(1024,))
+            h5file.attrs['start_time'] = str(datetime.now())
+            h5file.attrs['dropped_blocks'] = 0
+        # single writer / multiple reader mode keeps the file readable while logging and after an unclean exit
+        h5file.swmr_mode = True
+        return h5file
+
+    @staticmethod
+    def _append(dataset, values):
+        start = dataset.shape[0]
+        dataset.resize((start + len(values),))
+        dataset[start:] = values
+        return start
+
+    def _write(self, h5file, pending):
+        # append all pending blocks in one resize per dataset
+        if pending:
+            blocks = [block for block, _ in pending]
+            offsets = np.cumsum([0] + [len(block) for block in blocks[:-1]], dtype=np.int64)
+            start = self._append(h5file['data'], np.concatenate(blocks))
+            self._append(h5file['block_offset'], offsets + start)
+            self._append(h5file['block_time'], [t for _, t in pending])
+        h5file.attrs['dropped_blocks'] = h5file.attrs['dropped_blocks'] + self.dropped_blocks - self._dropped_written
+        self._dropped_written = self.dropped_blocks
+        h5file.flush()
+        self.logged_blocks += len(pending)
+
+    def run(self):
+        """ Writer thread.  Collects queued blocks and appends them to the file every flush_interval """
+        try:
+            self._run(self._h5file)
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            logger.error('{}: logging stopped: {}'.format(self.filename, self.error))
+        finally:
+            try:
+                self._h5file.close()
+            except Exception:
+                pass
+            self._h5file = None
+
+    def _run(self, h5file):
+        # Collect queued blocks and append them every flush_interval, until close() queues None
+        pending = []
+        running = True
+        next_flush = time.monotonic() + self.flush_interval
+        while running:
+            try:
+                block = self._queue.get(timeout=max(next_flush - time.monotonic(), 0.0))
+                if block is None:
+                    running = False
+                else:
+                    pending.append(block)
+            except queue.Empty:
+                pass
+
+            if running and time.monotonic() < next_flush:
+                continue
+            if pending or not running:
+                self._write(h5file, pending)
+                pending = []
+            next_flush = time.monotonic() + self.flush_interval
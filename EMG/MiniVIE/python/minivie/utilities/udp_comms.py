@@ -1,8 +1,96 @@
 import logging
+import os
+import selectors
 import socket
 import threading
 import time
 
+from utilities.user_config import get_user_config_var
+
+
+class UdpSelector(threading.Thread):
+    """
+        Receives data for every registered Udp endpoint on a single thread
+
+        Sockets are multiplexed with the platform selector (epoll on linux).  On each wakeup every readable socket is
+        drained of all queued datagrams (up to max_drain) which are passed to the endpoint's message handlers, so
+        several endpoints need one thread and one wakeup per burst of packets rather than a thread and a context switch
+        per packet (see Udp.receive_pending).  Receive timeouts of each endpoint are checked at least every
+        wakeup_interval seconds.
+
+        Use get_selector() to get the shared instance for this process
+    """
+
+    def __init__(self, wakeup_interval=0.5, max_drain=256):
+        threading.Thread.__init__(self, name='UdpSelector', daemon=True)
+        self.wakeup_interval = wakeup_interval
+        self.max_drain = max_drain
+        self.pid = os.getpid()
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self._endpoints = set()
+
+        # socket pair used to wake the selector when endpoints are added
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self.selector.register(self._wakeup_recv, selectors.EVENT_READ, None)
+
+    def register(self, udp):
+        udp.sock.setblocking(False)
+        with self.lock:
+            self.selector.register(udp.sock, selectors.EVENT_READ, udp)
+            self._endpoints.add(udp)
+        self._wakeup_send.send(b'\0')
+
+    def unregister(self, udp):
+        with self.lock:
+            if udp not in self._endpoints:
+                return
+            self._endpoints.discard(udp)
+            try:
+                self.selector.unregister(udp.sock)
+            except (KeyError, ValueError):
+                # socket already closed
+                pass
+
+    def run(self):
+        while True:
+            events = self.selector.select(self.wakeup_interval)
+            now = time.monotonic()
+            for key, _ in events:
+                udp = key.data
+                if udp is None:
+                    try:
+                        self._wakeup_recv.recv(1024)
+                    except BlockingIOError:
+                        pass
+                    continue
+                try:
+                    udp.receive_pending(self.max_drain)
+                except Exception:
+                    # keep serving the other endpoints
+                    logging.exception(f'Error handling data from Udp "{udp.name}"')
+
+            with self.lock:
+                endpoints = list(self._endpoints)
+            for udp in endpoints:
+                udp.check_timeout(now)
+
+
+_selector = None
+_selector_lock = threading.Lock()
+
+
+def get_selector():
+    """ Return the UdpSelector of this process, starting it if needed """
+    global _selector
+    with _selector_lock:
+        # a forked child process inherits the object but not the thread, so it needs its own
+        if _selector is None or _selector.pid != os.getpid():
+            _selector = UdpSelector()
+            _selector.start()
+        return _selector
+
 
 class Udp(threading.Thread):
     def __init__(self, local_address=None, remote_address=None):
@@ -14,6 +102,13 @@ class Udp(threading.Thread):
             Once created and connected, user can use send() to transmit data.  Receiving data involves adding a
             message_handler function to process incoming data
 
+            Each wakeup receives every datagram queued on the socket (up to max_batch).  Message handlers are called
+            for each datagram, and batch handlers once with the list of datagrams, e.g. to buffer a batch of samples
+            in one write or decode only the newest of a batch of status messages
+
+
+            If use_selector is set, the socket is served by the shared UdpSelector thread of the process rather than
+            a thread of its own.  Handlers are then called on the selector thread, so should return quickly
 
         @param local_address: tuple of ('IP_ADDRESS', Port)
         @param remote_address: tuple of ('IP_ADDRESS', Port)
@@ -30,6 +125,9 @@ class Udp(threading.Thread):
         self._is_data_received = False  # This is True when packets are actively coming in without timout
         self._is_connected = False  # This is True once socket open, but no guarantee of data incoming
         self.timeout = 3.0
+        self.use_selector = get_user_config_var('Udp.use_selector', False)
+        self._last_receive = 0.0  # time of the last packet, or of the last timeout, with use_selector
+        self.max_batch = 256  # most datagrams received per wakeup
 
         # store some rate counting parameters
         self._packet_count = 0
@@ -39,6 +137,7 @@ class Udp(threading.Thread):
 
         # store functions to be called on for incoming data
         self._message_handlers = []
+        self._batch_handlers = []
 
     def data_received(self):
         return self._is_data_received
@@ -48,6 +147,12 @@ class Udp(threading.Thread):
         if message_handler not in self._message_handlers:
             self._message_handlers.append(message_handler)
 
+    def add_batch_handler(self, batch_handler):
+        # attach a function to subscribe to batches of messages.  It is passed a list of the message bytes of each
+        # wakeup, oldest first
+        if batch_handler not in self._batch_handlers:
+            self._batch_handlers.append(batch_handler)
+
     def connect(self):
 
         logging.info(f"Udp local address: {self.local_addr}, remote address: {self.remote_addr}")
@@ -55,9 +160,14 @@ class Udp(threading.Thread):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)  # Enable broadcasting
         self.sock.bind(self.local_addr)
-        self.sock.settimeout(self.timeout)
+        self.sock.setblocking(False)  # wait for data with a selector, then drain the socket without blocking
         self._is_connected = True
 
+        if self.use_selector:
+            self._last_receive = time.monotonic()
+            get_selector().register(self)
+            return
+
         # Create a thread for processing new data
         if not self.is_alive():
             logging.info('Starting thread: {}'.format(self.name))
@@ -67,6 +177,8 @@ class Udp(threading.Thread):
         logging.info(f'Terminating receive thread: {self.name}')
         self._run_control = False
         self._is_connected = False
+        if self.use_selector and _selector is not None:
+            _selector.unregister(self)
 
     def on_connection_lost(self):
         logging.warning(f'Udp "{self.name}" timed out during recvfrom() on address: {self.local_addr}')
@@ -88,40 +200,76 @@ class Udp(threading.Thread):
 
         self._run_control = True
 
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
         while self._run_control:
-            # Blocking call until data received
             try:
-                # receive call will error if socket closed externally (i.e. on exit)
-                # blocks until timeout or socket closed
-                data_bytes, address = self.sock.recvfrom(self.read_buffer_size)
-
-                # if the above function returns (without error) it means we have a connection
-                if not self._is_data_received:
-                    logging.info('Connection is Active: Data received')
-                    self._is_data_received = True
-
-                # Count new packets
-                self._packet_count += 1
+                # blocks until data received or timeout
+                ready = selector.select(self.timeout)
+            except (OSError, ValueError):
+                # The connection has been closed
+                # RSA: Disabling Thread stop on error since this can happen on startup as well if the
+                # UDP transmitter goes away temporarily. This seems mor robust to keep retrying.
+                continue
 
-                # Execute the callback function assigned to __message_handlers
-                for message_handler in self._message_handlers:
-                    message_handler(data_bytes)
+            if not self._run_control:
+                break
 
-            except socket.timeout:
+            if not ready:
                 # the data stream has stopped.  don't break the thread, just continue to wait
                 self._is_data_received = False
                 self.on_connection_lost()
                 continue
 
-            except socket.error:
-                # The connection has been closed
-                #logging.info(f"Socket Closed at {self.local_addr}")
-                # break so that the thread can terminate
-                #self._run_control = False
-                #break
-                # RSA: Disabling Thread stop on error since this can happen on startup as well if the
-                # UDP transmitter goes away temporarily. This seems mor robust to keep retrying.
-                continue
+            self.receive_pending(self.max_batch)
+        selector.close()
+
+    def receive_pending(self, max_count=256):
+        """
+        Receive every packet queued on the (non-blocking) socket and pass them to the handlers
+
+        @param max_count: most packets received before returning, so other endpoints are not starved
+        @return: number of packets received
+        """
+        packets = []
+        for _ in range(max_count):
+            try:
+                data_bytes, address = self.sock.recvfrom(self.read_buffer_size)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # socket closed, or an error reported by the remote host.  Keep waiting for more data
+                break
+            packets.append(data_bytes)
+
+        if packets:
+            self._last_receive = time.monotonic()
+            self.on_data(packets)
+        return len(packets)
+
+    def on_data(self, packets):
+        # Handle a batch of received packets
+        if not self._is_data_received:
+            logging.info('Connection is Active: Data received')
+            self._is_data_received = True
+
+        # Count new packets
+        self._packet_count += len(packets)
+
+        # Execute the callback functions assigned to __message_handlers, then the batch handlers
+        if self._message_handlers:
+            for data_bytes in packets:
+                for message_handler in self._message_handlers:
+                    message_handler(data_bytes)
+        for batch_handler in self._batch_handlers:
+            batch_handler(packets)
+
+    def check_timeout(self, now):
+        # Report the data stream stopping, every timeout seconds without data, as a blocking recvfrom() would
+        if now - self._last_receive > self.timeout:
+            self._last_receive = now
+            self._is_data_received = False
+            self.on_connection_lost()
 
     def send(self, msg_bytes, address=None):
         """
@@ -147,6 +295,30 @@ class Udp(threading.Thread):
         else:
             logging.warning('Socket disconnected')
 
+    def send_batch(self, packets):
+        """
+        Send several messages, e.g. the same message to several hosts
+
+        :param packets:
+            list of (msg_bytes, address) tuples.  An address of None uses the remote address
+        :return:
+            number of messages sent
+        """
+        if not self._is_connected:
+            logging.warning('Socket disconnected')
+            return 0
+
+        sendto = self.sock.sendto
+        num_sent = 0
+        try:
+            for msg_bytes, address in packets:
+                sendto(msg_bytes, address if address is not None else self.remote_addr)
+                num_sent += 1
+        except Exception as e:
+            # This exception is only expected in the transient case where the socket disconnects during sendto()
+            logging.error(e)
+        return num_sent
+
     def get_packet_data_rate(self):
         # Return the packet data rate
 
@@ -177,7 +349,9 @@ class Udp(threading.Thread):
         if self.sock is not None:
             logging.info(f"Closing Socket Address {self.local_addr} --> {self.remote_addr}")
             self.sock.close()
-        self.join()
+        if self.ident is not None:
+            # receive thread was started
+            self.join()
 
 
 def main():
@@ -247,5 +421,60 @@ def main():
     pass
 
 
+def test_udp_selector():
+    # Receive on several endpoints, with a thread per endpoint and then with the shared selector
+    # test with: python3 -c "from utilities.udp_comms import *; test_udp_selector()"
+    num_endpoints, num_packets = 4, 5000
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    for use_selector in (False, True):
+        threads_before = threading.active_count()
+        received = [0] * num_endpoints
+        batches = [0] * num_endpoints
+        endpoints = []
+        for i in range(num_endpoints):
+            udp = Udp(local_address=('127.0.0.1', 0))
+            udp.use_selector = use_selector
+            udp.name = f'Endpoint{i}'
+
+            def count(packets, i=i):
+                received[i] += len(packets)
+                batches[i] += 1
+
+            udp.add_batch_handler(count)
+            udp.connect()
+            endpoints.append(udp)
+        num_threads = threading.active_count() - threads_before
+
+        t = time.perf_counter()
+        for n in range(num_packets):
+            for udp in endpoints:
+                sender.sendto(b'x' * 64, udp.sock.getsockname())
+            if n % 100 == 99:
+                # bursts of 100 packets per endpoint, within the default socket receive buffer
+                time.sleep(0.001)
+        while sum(received) < num_packets * num_endpoints and time.perf_counter() - t < 5.0:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - t
+
+        for udp in endpoints:
+            udp.close()
+        print(f'use_selector={use_selector}: {num_threads} new threads, received {sum(received)} of '
+              f'{num_packets * num_endpoints} packets in {sum(batches)} batches in {elapsed * 1000:.0f} ms')
+
+    # fan out one message to every endpoint
+    received = []
+    endpoints = [Udp(local_address=('127.0.0.1', 0)) for _ in range(num_endpoints)]
+    for udp in endpoints:
+        udp.add_message_handler(received.append)
+        udp.connect()
+    endpoints[0].send_batch([(b'fan out', udp.sock.getsockname()) for udp in endpoints])
+    time.sleep(0.1)
+    for udp in endpoints:
+        udp.close()
+    print(f'send_batch delivered {len(received)} of {num_endpoints} messages')
+    sender.close()
+
+
 if __name__ == '__main__':
     main()
@@ -11,6 +11,7 @@ Revisions:
 
 """
 import os
+import time
 from datetime import datetime
 import xml.etree.cElementTree as xmlTree
 import logging
@@ -20,6 +21,58 @@ xml_tree = None
 xml_file = None
 xml_force_default = True  # If there is a problem with the xml, revert to just returning config value defaults
 
+# The xml entries are indexed by key when the file is read, and converted values are cached by key and type, so a
+# lookup is a dictionary access rather than a scan of the xml
+xml_index = {}  # key: value string
+value_cache = {}  # (key, type of default value): converted value
+xml_mtime = None  # modification time of xml_file when it was read
+_failed_mtime = None  # modification time of a version of xml_file that failed to parse, to log the failure once
+
+# Cached in place of a value for keys that aren't in the xml (or have an unhandled type), so the default is returned
+_DEFAULT = object()
+
+# The file is re-read if it changes on disk.  Seconds between checks of the modification time, 0 to disable
+reload_interval = 1.0
+_next_reload_check = 0.0
+
+# Functions called with the set of changed keys when values are set or the file is reloaded
+_listeners = []
+
+
+def add_listener(callback):
+    """
+    Register a function to be notified of config changes
+
+    :param callback: function called as callback(changed_keys) after set_user_config_var() or a reload of the file
+    """
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def _notify(changed_keys):
+    if not changed_keys:
+        return
+    for callback in list(_listeners):
+        try:
+            callback(changed_keys)
+        except Exception as e:
+            logging.error('User config listener {} failed: {}'.format(callback, e))
+
+
+def _build_index(root):
+    # first entry wins if a key is repeated, as when searching the xml in order
+    index = {}
+    for element in root.findall('add'):
+        key = element.get('key')
+        if key not in index:
+            index[key] = element.get('value')
+    return index
+
 
 def read_user_config_file(file='../../user_config.xml', reload=False):
     # function to read in xml file and store as dictionary
@@ -29,21 +82,89 @@ def read_user_config_file(file='../../user_config.xml', reload=False):
     #
     # Use the reload command to just re-read the xml file and not change the filename
 
-    global xml_file, xml_root, xml_tree, xml_force_default
+    global xml_file, xml_root, xml_tree, xml_force_default, xml_index, value_cache, xml_mtime, _failed_mtime
     if not reload:
         xml_file = file
     logging.info('Reading xml config file: {}'.format(xml_file))
+    old_index = xml_index
     try:
-        xml_tree = xmlTree.parse(xml_file)
-        xml_root = xml_tree.getroot()
-        xml_force_default = False
-    except FileNotFoundError:
+        mtime = os.path.getmtime(xml_file)
+        tree = xmlTree.parse(xml_file)
+    except (OSError, xmlTree.ParseError) as e:
+        if reload and xml_root is not None:
+            # Likely caught mid-write.  Keep serving the values already read, and retry at the next check
+            failed_mtime = _get_mtime(xml_file)
+            if failed_mtime != _failed_mtime:
+                logging.error('Failed to reload {}: {}. Previous values will be used.'.format(xml_file, e))
+                _failed_mtime = failed_mtime
+            return
         xml_force_default = True
-        logging.error('Failed to find file {} in {}. Param defaults will be used.'.format(xml_file, os.getcwd()))
+        if isinstance(e, FileNotFoundError):
+            logging.error('Failed to find file {} in {}. Param defaults will be used.'.format(xml_file, os.getcwd()))
+        else:
+            logging.error('Failed to read file {}: {}. Param defaults will be used.'.format(xml_file, e))
+        return
+
+    xml_tree = tree
+    xml_root = xml_tree.getroot()
+    xml_index = _build_index(xml_root)
+    value_cache = {}
+    xml_mtime = mtime
+    _failed_mtime = None
+    xml_force_default = False
+
+    if reload:
+        changed = {key for key in set(old_index) | set(xml_index) if old_index.get(key) != xml_index.get(key)}
+        _notify(changed)
+
+
+def _get_mtime(file):
+    # Modification time of a file, or None if it can't be read
+    try:
+        return os.path.getmtime(file)
+    except OSError:
+        return None
+
+
+def _check_reload():
+    # Re-read the file if it was modified since it was read.  Checked at most every reload_interval seconds
+    global _next_reload_check
+    now = time.monotonic()
+    if now < _next_reload_check:
+        return
+    _next_reload_check = now + reload_interval
+    mtime = _get_mtime(xml_file)
+    if mtime is not None and mtime != xml_mtime:
+        logging.info('User config file {} changed on disk'.format(xml_file))
+        read_user_config_file(reload=True)
+
+
+def _convert(key, str_value, default_value):
+    # Convert the xml string to the type of the default value
+    if type(default_value) is str:
+        return str_value
+    elif type(default_value) is int:
+        return int(str_value, 0)  # specify 0 as the base in order to accept decimal and hex 0xFF format
+    elif type(default_value) is float:
+        return float(str_value)
+    elif type(default_value) is bool:
+        # accept strings 'True'|'False' and '0' '1'
+        try:
+            str_value = int(str_value)
+        except ValueError:
+            if str(str_value).lower().startswith('true'):
+                str_value = True
+            else:
+                str_value = False
+        return bool(str_value)
+    elif type(default_value) is tuple:
+        return tuple(float(i) for i in str_value.split(','))
+    else:
+        raise TypeError('Unhandled type [{}] for default value for key = {}'.format(type(default_value), key))
 
 
 def get_user_config_var(key, default_value):
-    # Look through XML document root for matching key value and return entry as a string
+    # Look up the key in the xml and return the entry converted to the type of the default value
     # Note the second argument is the a default value in the event the key or xml file is not found
     #
 
@@ -55,41 +176,35 @@ def get_user_config_var(key, default_value):
     if xml_root is None:
         logging.info('xml_root is unset')
         read_user_config_file()
+        if xml_force_default:
+            return default_value
+    elif reload_interval > 0:
+        _check_reload()
+
+    cache_key = (key, type(default_value))
+    value = value_cache.get(cache_key)
+    if value is _DEFAULT:
+        return default_value
+    elif value is not None:
+        return value
+
+    str_value = xml_index.get(key)
+    if str_value is None:
+        # Unmatched isn't a problem, parameter just happens to not be in xml, so use default
+        logging.info('%s : %s (default)', key, default_value)
+        value_cache[cache_key] = _DEFAULT
+        return default_value
 
-    for element in xml_root.findall('add'):
-        # child is an element, has tag and attributes
-        xml_key = element.get('key')
-
-        if xml_key == key:
-            str_value = element.get('value')
-            logging.info(key + ' : ' + str_value)
-
-            if type(default_value) is str:
-                return str_value
-            elif type(default_value) is int:
-                return int(str_value, 0)  # specify 0 as the base in order to accept decimal and hex 0xFF format
-            elif type(default_value) is float:
-                return float(str_value)
-            elif type(default_value) is bool:
-                # accept strings 'True'|'False' and '0' '1'
-                try:
-                    str_value = int(str_value)
-                except ValueError:
-                    if str(str_value).lower().startswith('true'):
-                        str_value = True
-                    else:
-                        str_value = False
-                return bool(str_value)
-            elif type(default_value) is tuple:
-                return tuple(float(i) for i in str_value.split(','))
-            else:
-                logging.warning('Unhandled type [{}] for default value for key = {}'.format(type(default_value), key))
-
-    # Unmatched isn't a problem, parameter just happens to not be in xml, so use default
-    # logging.warning(key + ' : UNMATCHED')
-
-    logging.info(key + ' : ' + str(default_value) + ' (default)')
-    return default_value
+    logging.info('%s : %s', key, str_value)
+    try:
+        value = _convert(key, str_value, default_value)
+    except TypeError as e:
+        logging.warning(str(e))
+        logging.info('%s : %s (default)', key, default_value)
+        value_cache[cache_key] = _DEFAULT
+        return default_value
+    value_cache[cache_key] = value
+    return value
 
 
 def set_user_config_var(key, value):
@@ -129,12 +244,21 @@ def set_user_config_var(key, value):
         new_element = xmlTree.fromstring('<add key="{}" value="{}"/>'.format(key, str_value))
         xml_root.append(new_element)
 
+    # Update the index and drop cached conversions of the old value
+    xml_index[key] = str_value
+    for cache_key in [k for k in value_cache if k[0] == key]:
+        del value_cache[cache_key]
+
     logging.info(key + ' : ' + old_str_value + ' (original)')
     logging.info(key + ' : ' + str_value + ' (new)')
 
+    if old_str_value != str_value:
+        _notify({key})
+
 
 def save(file='../../user_config.xml'):
     # Save out xml
+    global xml_mtime
 
     if xml_root is None:
         logging.info('xml_root is unset')
@@ -152,6 +276,10 @@ def save(file='../../user_config.xml'):
     indent(xml_root)  # Pretties up the writing
     xml_tree.write(file, encoding='utf-8', xml_declaration=True, default_namespace=None, method='xml')
 
+    if xml_file is not None and os.path.abspath(file) == os.path.abspath(xml_file):
+        # already up to date with what was just written, so don't reload it
+        xml_mtime = os.path.getmtime(file)
+
 
 def setup_file_logging(prefix=None, log_level=logging.INFO):
     ######################